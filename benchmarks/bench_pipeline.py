@@ -0,0 +1,349 @@
+"""
+Офлайн бенчмарк конвеєра обробки трансферів (без мережі)
+
+Відповіді TronGrid / Tronscan беруться з benchmarks/fixtures і розмножуються
+до потрібної кількості трансферів. Для кожного етапу міряється швидкість
+(записів/с) і пам'ять на запис (tracemalloc на вибірці, посторінково: пік
+обробки однієї сторінки / PAGE_SIZE і приріст пам'яті після всієї вибірки):
+
+    normalize - JSON сторінки -> формат відповіді -> Transfer
+    is_usdt / amount - PaymentMonitor.is_usdt() / get_amount_usdt()
+    dedup     - DedupCache.seen() + add()
+    filter    - PaymentMonitor.process_transactions() (dedup, адреси, токен, сума)
+    render    - PaymentMonitor.format_message()
+
+    python benchmarks/bench_pipeline.py                          - 1k, 100k, 1M трансферів
+    python benchmarks/bench_pipeline.py --sizes 1000,100000
+    python benchmarks/bench_pipeline.py --output new.json --compare old.json
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Виправлення кодування для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, ROOT)
+# Логи кожного платежу спотворили б заміри
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import config
+from bot import PaymentMonitor
+from dedup import DedupCache
+from schemas import detect_schema
+from transfer import Transfer
+
+# Трансферів на сторінці (як PAGE_SIZE при опитуванні)
+PAGE_SIZE = 50
+# Трансфери генеруються і обробляються частинами, щоб 1M не тримати в пам'яті
+CHUNK_SIZE = 50_000
+# Різних сторінок для normalize (далі повторюються - вартість розбору та сама)
+PAGE_POOL = 200
+# Записів для заміру пам'яті
+ALLOC_SAMPLE = 10_000
+# Малі розміри повторюються (береться найкращий час), поки разом не набереться стільки записів
+REPEAT_RECORDS = 200_000
+MAX_REPEATS = 5
+# Кожен DUPLICATE_EVERY-й трансфер повторює один з попередніх (перевірка дублікатів)
+DUPLICATE_EVERY = 10
+BASE_TIMESTAMP = 1729245600000
+
+
+def load_fixtures():
+    """{назва файлу: відповідь API}"""
+    fixtures = {}
+    for filename in sorted(os.listdir(FIXTURES)):
+        if filename.endswith(".json"):
+            with open(os.path.join(FIXTURES, filename), encoding="utf-8") as f:
+                fixtures[filename[:-5]] = json.load(f)
+    return fixtures
+
+
+def fixture_records(data):
+    """(ключ зі списком трансферів, список записів)"""
+    schema = detect_schema(data)
+    return schema.container, schema.items(data)
+
+
+def build_pages(data, count):
+    """count сторінок JSON (bytes) з унікальними хешами на основі записів фікстури"""
+    container, records = fixture_records(data)
+    hash_field = next(field for field in ("transaction_id", "transactionHash", "hash") if field in records[0])
+    pages = []
+    index = 0
+    for _ in range(count):
+        page = []
+        for _ in range(PAGE_SIZE):
+            record = dict(records[index % len(records)])
+            record[hash_field] = f"{index:064x}"
+            page.append(record)
+            index += 1
+        pages.append(json.dumps({**data, container: page}).encode("utf-8"))
+    return pages
+
+
+def generate_transfers(templates, start, count):
+    """Трансфери від нових до старих; частина з них - повтори попередніх хешів"""
+    transfers = []
+    for i in range(start, start + count):
+        template = templates[i % len(templates)]
+        key = i - DUPLICATE_EVERY // 2 if i % DUPLICATE_EVERY == DUPLICATE_EVERY - 1 else i
+        transfers.append(Transfer(
+            f"{key:064x}", BASE_TIMESTAMP - key * 1000, template.from_address, template.to_address,
+            template.amount, template.contract, template.symbol, template.name
+        ))
+    return transfers
+
+
+def normalize(pages):
+    count = 0
+    for page in pages:
+        data = json.loads(page)
+        schema = detect_schema(data)
+        count += len(schema.extract(data))
+    return count
+
+
+def make_stages(monitor):
+    """Етапи: назва -> (підготовка стану, функція(transfers))"""
+    state = {}
+
+    def reset_dedup():
+        state["cache"] = DedupCache(config.DEDUP_HORIZON * 1000)
+
+    def dedup(transfers):
+        cache = state["cache"]
+        for txn in transfers:
+            if not cache.seen(txn.hash, txn.timestamp):
+                cache.add(txn.hash, txn.timestamp)
+
+    def reset_filter():
+        # Без журналу: міряємо обробку в пам'яті, а не SQLite
+        monitor.processed_txns = DedupCache(config.DEDUP_HORIZON * 1000)
+        monitor.txn_sources.clear()
+
+    def process(transfers):
+        monitor.process_transactions(transfers, source="bench")
+        monitor.txn_sources.clear()
+
+    def is_usdt(transfers):
+        check = monitor.is_usdt
+        for txn in transfers:
+            check(txn)
+
+    def amount(transfers):
+        get_amount = monitor.get_amount_usdt
+        for txn in transfers:
+            get_amount(txn)
+
+    def render(transfers):
+        format_message = monitor.format_message
+        for txn in transfers:
+            format_message(txn)
+
+    return {
+        "is_usdt": (None, is_usdt),
+        "amount": (None, amount),
+        "dedup": (reset_dedup, dedup),
+        "filter": (reset_filter, process),
+        "render": (None, render),
+    }
+
+
+def measure_alloc(func, batches):
+    """Пам'ять на запис, байти: (пік під час обробки однієї сторінки / записів на ній,
+    пам'ять, що залишилась після всіх сторінок / всіх записів).
+    batches - [(аргумент func, кількість записів)], по сторінці на виклик: конвеєр
+    обробляє трансфери посторінково, тож пік на всій вибірці поділений на її розмір
+    занижував би пам'ять на запис"""
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    peak = 0.0
+    records = 0
+    for batch, count in batches:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func(batch)
+        _, batch_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, (batch_peak - before) / count)
+        records += count
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, (current - start) / max(1, records)
+
+
+def repeats(size):
+    return max(1, min(MAX_REPEATS, REPEAT_RECORDS // size))
+
+
+def result_row(fixture, stage, records, seconds, alloc):
+    peak, retained = alloc
+    return {
+        "fixture": fixture,
+        "stage": stage,
+        "records": records,
+        "seconds": round(seconds, 4),
+        "records_per_sec": round(records / seconds) if seconds > 0 else None,
+        "peak_bytes_per_record": round(peak, 1),
+        "retained_bytes_per_record": round(retained, 1),
+    }
+
+
+def bench_normalize(name, data, size):
+    pool = build_pages(data, min(PAGE_POOL, max(1, size // PAGE_SIZE)))
+    page_count = max(1, size // PAGE_SIZE)
+    pages = [pool[i % len(pool)] for i in range(page_count)]
+    records = page_count * PAGE_SIZE
+
+    alloc = measure_alloc(normalize, [([page], PAGE_SIZE) for page in pages[:max(1, ALLOC_SAMPLE // PAGE_SIZE)]])
+    best = None
+    for _ in range(repeats(size)):
+        gc.collect()
+        started = time.perf_counter()
+        normalize(pages)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result_row(name, "normalize", records, best, alloc)
+
+
+def bench_stage(stage, setup, func, templates, size):
+    if setup:
+        setup()
+    sample = generate_transfers(templates, 0, min(size, ALLOC_SAMPLE))
+    alloc = measure_alloc(func, [
+        (sample[start:start + PAGE_SIZE], len(sample[start:start + PAGE_SIZE]))
+        for start in range(0, len(sample), PAGE_SIZE)
+    ])
+    del sample
+    best = None
+    for _ in range(repeats(size)):
+        if setup:
+            setup()
+        elapsed = 0.0
+        for start in range(0, size, CHUNK_SIZE):
+            transfers = generate_transfers(templates, start, min(CHUNK_SIZE, size - start))
+            gc.collect()
+            started = time.perf_counter()
+            func(transfers)
+            elapsed += time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result_row("all", stage, size, best, alloc)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Порівнює швидкість з попереднім файлом результатів, повертає кількість регресій"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["fixture"], r["stage"], r["records"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n📊 Порівняння з {baseline_path} ({baseline['meta'].get('git') or '?'})")
+    for row in results:
+        old = previous.get((row["fixture"], row["stage"], row["records"]))
+        if not old or not old["records_per_sec"] or not row["records_per_sec"]:
+            continue
+        ratio = row["records_per_sec"] / old["records_per_sec"]
+        mark = "✅"
+        if ratio < 1 - threshold:
+            mark = "❌"
+            regressions += 1
+        print(f"{mark} {row['fixture']:<26} {row['stage']:<10} {row['records']:>8}: {ratio:6.2f}x")
+    return regressions
+
+
+def run(fixtures, templates, sizes, only):
+    """Всі заміри; PaymentMonitor створює журнал у поточній директорії"""
+    # Всі трансфери фікстур новіші за "запуск бота"
+    monitor = PaymentMonitor(start_time=0)
+    stages = make_stages(monitor)
+
+    results = []
+    try:
+        for size in sizes:
+            print(f"\n🔍 {size} трансферів")
+            if not only or "normalize" in only:
+                for name, data in fixtures.items():
+                    row = bench_normalize(name, data, size)
+                    results.append(row)
+                    print(f"   {name:<26} normalize  {row['records_per_sec'] or 0:>12,} зап/с  {row['peak_bytes_per_record']:>8} Б/зап")
+            for stage, (setup, func) in stages.items():
+                if only and stage not in only:
+                    continue
+                row = bench_stage(stage, setup, func, templates, size)
+                results.append(row)
+                print(f"   {'all':<26} {stage:<10} {row['records_per_sec'] or 0:>12,} зап/с  {row['peak_bytes_per_record']:>8} Б/зап")
+    finally:
+        monitor.ledger.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн бенчмарк обробки трансферів")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="кількості трансферів через кому")
+    parser.add_argument("--stages", default="", help="лише ці етапи (через кому)")
+    parser.add_argument("--output", default="bench_results.json", help="файл з результатами (JSON)")
+    parser.add_argument("--compare", help="попередній файл результатів для порівняння")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустиме падіння швидкості (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    only = {stage for stage in args.stages.split(",") if stage}
+    fixtures = load_fixtures()
+    templates = []
+    for data in fixtures.values():
+        templates.extend(detect_schema(data).extract(data))
+
+    # Журнал бота - у тимчасовій директорії, що видаляється після замірів
+    output = os.path.abspath(args.output)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        os.chdir(workdir)
+        try:
+            results = run(fixtures, templates, sizes, only)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "page_size": PAGE_SIZE,
+            "alloc_sample": ALLOC_SAMPLE,
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Результати: {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"❌ Регресій: {regressions}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,167 @@
+import argparse
 import asyncio
+import logging
 import time
-import requests
 import json
 import os
 from datetime import datetime, timezone, timedelta
+import httpx
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.request import HTTPXRequest
+from telegram.error import TelegramError, InvalidToken, Forbidden
 import config
+from http_client import HttpClient
+from watchlist import Watchlist, PollScheduler
+from watermark import Watermark
+from pagination import FetchResult, reached_since
+from providers import ProviderRegistry, default_endpoints, lane_name
+from storage import Ledger, OUTBOX_PENDING, OUTBOX_SENT, OUTBOX_FAILED
+from dedup import DedupCache
+from schemas import detect_schema, is_empty_page
+from transfer import Transfer
+from notifier import Notifier
+from routing import RoutingTable
+from push import PushReceiver
+from polling import PollController
+from log import setup_logging, get_logger
+from metrics import Registry, COUNT_BUCKETS
+from http_server import HttpServer
+from latency import LatencyTracker
+from response_cache import ResponseCache
+from ratelimit import parse_retry_after
+from keypool import MAX_PARK_WAIT, KeyPool, parse_keys
+from replay import Replayer, read_transfers, open_sink
+
+logger = get_logger("bot")
 
 class PaymentMonitor:
-    def __init__(self):
-        self.bot = Bot(token=config.TELEGRAM_BOT_TOKEN)
-        # Зберігаємо адресу в оригінальному форматі для API
-        self.tron_address_original = config.TRON_ADDRESS
+    def __init__(self, start_time=None):
+        """start_time - з якого моменту (мс) трансфери вважаються новими; None - час
+        запуску бота з журналу або поточний (перший запуск). Задається для --replay"""
+        setup_logging(config.LOG_LEVEL, config.LOG_FORMAT)
+        # Пул з'єднань на кілька запитів одночасно: кожен чат відправляється
+        # своїм воркером, і повільний чат не блокує з'єднання для інших
+        self.bot = Bot(
+            token=config.TELEGRAM_BOT_TOKEN,
+            base_url=config.TELEGRAM_API_URL.rstrip("/") + "/bot",
+            request=HTTPXRequest(
+                connection_pool_size=config.TELEGRAM_POOL_SIZE,
+                connect_timeout=config.TELEGRAM_CONNECT_TIMEOUT,
+                read_timeout=config.TELEGRAM_READ_TIMEOUT,
+                write_timeout=config.TELEGRAM_READ_TIMEOUT,
+                pool_timeout=config.TELEGRAM_READ_TIMEOUT
+            )
+        )
+        # Спільний асинхронний HTTP клієнт для всіх запитів до TronGrid / Tronscan
+        self.http = HttpClient()
+        # Список адрес для моніторингу (TRON_ADDRESSES / WATCHLIST_FILE або одна TRON_ADDRESS)
+        self.watchlist = Watchlist.load(
+            addresses_env=config.TRON_ADDRESSES,
+            watchlist_file=config.WATCHLIST_FILE,
+            default_address=config.TRON_ADDRESS
+        )
+        # Пул API ключів: запити розходяться по ключах, вичерпані ключі чекають скидання квоти
+        self.key_pool = KeyPool(
+            {
+                "tronscan": parse_keys(config.TRONSCAN_API_TOKEN, config.TRONSCAN_API_KEYS),
+                "trongrid": parse_keys(config.TRONGRID_API_KEYS),
+            },
+            rate=config.PROVIDER_KEY_RATE,
+            cooldown=config.PROVIDER_COOLDOWN,
+            max_cooldown=config.PROVIDER_MAX_COOLDOWN
+        )
+        # Розподіляє запити до провайдерів по адресах в межах бюджету (за секунду і за хвилину)
+        # (ліміти задані на один ключ - з кількома ключами бюджет пропорційно більший)
+        self.scheduler = PollScheduler(
+            config.POLL_RATE_LIMIT * self.key_pool.capacity(),
+            config.POLL_CONCURRENCY,
+            per_minute=config.POLL_REQUEST_BUDGET * self.key_pool.capacity()
+        )
+        # Основна адреса: зберігаємо в оригінальному форматі для API
+        self.tron_address_original = self.watchlist.primary.address
         # Для порівняння використовуємо upper case
-        self.tron_address = config.TRON_ADDRESS.upper()
-        self.api_token = config.TRONSCAN_API_TOKEN
+        self.tron_address = self.watchlist.primary.key
         self.channel_id = config.TELEGRAM_CHANNEL_ID
+        # Додаткові чати для платежів за адресою / сумою / токеном
+        self.routes = RoutingTable.load(config.ROUTES, config.ROUTES_FILE)
         self.processed_txns_file = "processed_transactions.json"
-        self.processed_txns, saved_start_time = self.load_processed_txns()
+        self.ledger, saved_start_time, saved_watermarks = self.load_processed_txns()
         self.usdt_contract = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+        # Endpoint'и TronGrid / Tronscan з рейтингом за затримкою та успішністю
+        self.providers = ProviderRegistry(
+            default_endpoints(self.key_pool.providers(), config.TRONGRID_URL.rstrip("/"), config.TRONSCAN_URL.rstrip("/")),
+            base_cooldown=config.PROVIDER_COOLDOWN,
+            max_cooldown=config.PROVIDER_MAX_COOLDOWN,
+            host_rate=config.PROVIDER_HOST_RATE,
+            breaker_threshold=config.PROVIDER_BREAKER_THRESHOLD,
+            probe_timeout=config.HTTP_TOTAL_TIMEOUT
+        )
+        self.provider_stats_file = "provider_stats.json"
+        # Черга відправки платежів з лімітами Telegram (на чат і глобальним)
+        self.notifier = Notifier(
+            self.deliver, self.format_message, self.format_digest,
+            global_rate=config.TELEGRAM_GLOBAL_RATE,
+            chat_rate=config.TELEGRAM_CHAT_RATE / 60,
+            digest_threshold=config.TELEGRAM_DIGEST_THRESHOLD,
+            digest_max=config.TELEGRAM_DIGEST_MAX,
+            on_result=self.on_delivery_result
+        )
+        # Прийом push-подій (PUSH_ENABLED), створюється в start()
+        self.push = None
+        # Фонові підтвердження push-подій провайдером
+        self.push_checks = set()
+        # Попередження про затримку, що відправляються в LATENCY_ALERT_CHAT
+        self.alert_tasks = set()
+        # З push-подіями опитування лише звіряє пропущене, тому рідше
+        self.check_interval = config.RECONCILE_INTERVAL if config.PUSH_ENABLED else config.CHECK_INTERVAL
+        # Пауза між перевірками залежить від активності та бюджету запитів
+        self.poll = PollController(
+            self.check_interval,
+            min_interval=config.POLL_MIN_INTERVAL,
+            max_interval=max(config.POLL_MAX_INTERVAL, self.check_interval),
+            active_window=config.POLL_ACTIVE_WINDOW,
+            budget=config.POLL_REQUEST_BUDGET * self.key_pool.capacity(),
+            adaptive=config.POLL_ADAPTIVE
+        )
+        # Однакові запити до API в межах кількох секунд (і паралельні) - один запит.
+        # TTL менший за мінімальний інтервал, щоб наступна перевірка не отримала стару відповідь
+        self.response_cache = ResponseCache(min(config.RESPONSE_CACHE_TTL, self.poll.min_interval / 2))
+        # Дозволяє перервати паузу (наприклад, коли очікується платіж)
+        self.wake = asyncio.Event()
+        # Повідомлення outbox, передані в чергу відправки: (tx_hash, chat_id)
+        self.outbox_inflight = set()
+        # Під час перевірки бота при запуску платежі лише записуються в outbox
+        self.outbox_paused = False
+        # Відправлені / остаточно невдалі, стан яких ще не записано в БД
+        self.outbox_settled = []
+        # Підсумок останньої перевірки для рядка логу
+        self.last_poll = {}
+        # Час останньої успішної перевірки (time.time()); до першої - час запуску процесу,
+        # щоб бот, який жодного разу не отримав транзакцій, теж потрапляв під алерт
+        self.last_poll_success = 0.0
+        self.started_at = time.time()
+        # Трансферів, розібраних за поточну перевірку
+        self.poll_transfers = 0
+        # Затримка від block_timestamp до відправки в Telegram, по адресах і провайдерах
+        self.latency = LatencyTracker(
+            slo=config.LATENCY_SLO,
+            window=config.LATENCY_WINDOW,
+            min_samples=config.LATENCY_MIN_SAMPLES,
+            alert_cooldown=config.LATENCY_ALERT_COOLDOWN
+        )
+        # Провайдер, від якого дізнались про новий платіж (hash -> назва), до dispatch()
+        self.txn_sources = {}
+        # Найновіший трансфер з останньої відповіді API по адресах (для show_last_transaction)
+        self.latest_transfers = {}
+        # Метрики для /metrics (METRICS_ENABLED), сервер створюється в start()
+        self.metrics = self.create_metrics()
+        self.metrics_server = None
         
         # Встановлюємо час запуску бота (timestamp в мілісекундах)
-        if saved_start_time:
+        if start_time is not None:
+            # Відтворення / бенчмарк: без повідомлень про запуск і без збереження часу
+            self.bot_start_time = start_time
+        elif saved_start_time:
             self.bot_start_time = saved_start_time
             print(f"⏰ Бот був запущений: {self.format_timestamp(saved_start_time)}")
         else:
@@ -30,6 +169,128 @@ class PaymentMonitor:
             self.bot_start_time = int(time.time() * 1000)
             print(f"⏰ Перший запуск бота: {self.format_timestamp(self.bot_start_time)}")
             print(f"📝 Всі транзакції до цього моменту будуть ігноруватися")
+        self.is_first_run = start_time is None and not saved_start_time
+        
+        # Курсори опитування по адресах (upper case адреса -> Watermark).
+        # Для нової адреси курсор починається з поточного моменту, а якщо курсорів
+        # ще не було зовсім (перший запуск / старий формат файлу) - з часу запуску бота
+        self.watermarks = saved_watermarks if saved_watermarks is not None else {}
+        default_timestamp = int(time.time() * 1000) if saved_watermarks is not None else self.bot_start_time
+        for entry in self.watchlist:
+            if entry.key not in self.watermarks:
+                self.watermarks[entry.key] = Watermark(default_timestamp)
+        self.state_dirty = False
+        
+        # В пам'яті - лише хеші в межах DEDUP_HORIZON від курсорів, старіші
+        # перевіряються за журналом (тільки якщо такий трансфер трапиться знову)
+        self.processed_txns = DedupCache(config.DEDUP_HORIZON * 1000, journal=self.ledger)
+        self.processed_txns.evict(self.dedup_reference())
+        self.processed_txns.warm_up(self.ledger.recent(self.processed_txns.cutoff))
+    
+    def create_metrics(self):
+        """Метрики опитування, провайдерів і відправки (формат Prometheus)"""
+        registry = Registry("payment_monitor_")
+        self.fetch_duration = registry.histogram(
+            "fetch_duration_seconds", "Тривалість запиту до endpoint'а TronGrid / Tronscan", ["endpoint"])
+        self.fetch_attempts = registry.counter(
+            "fetch_attempts_total", "Запити до endpoint'ів", ["endpoint"])
+        self.fetch_failures = registry.counter(
+            "fetch_failures_total", "Невдалі запити за статусом відповіді / типом помилки", ["endpoint", "status"])
+        self.poll_duration = registry.histogram(
+            "poll_duration_seconds", "Тривалість перевірки всіх адрес")
+        self.poll_errors = registry.counter(
+            "poll_errors_total", "Адреси, транзакції яких не вдалося отримати під час перевірки")
+        self.poll_transfers_hist = registry.histogram(
+            "poll_transfers", "Трансферів, розібраних за перевірку", buckets=COUNT_BUCKETS)
+        self.payments_detected = registry.counter(
+            "payments_detected_total", "Нові платежі за джерелом (poll / push)", ["source"])
+        self.send_duration = registry.histogram(
+            "telegram_send_duration_seconds", "Тривалість sendMessage", ["result"])
+        self.payment_latency = registry.histogram(
+            "payment_latency_seconds", "Від block_timestamp трансферу до відправки повідомлення", ["provider"],
+            buckets=(5, 10, 20, 30, 60, 120, 300, 600, 1800))
+        registry.gauge(
+            "payment_latency_p95_seconds", "p95 затримки платежів за останні заміри", ["provider"],
+            collect=lambda: {name: window.percentile(95) for name, window in self.latency.by_provider.items()})
+        registry.counter(
+            "payment_latency_slo_breaches_total", "Перевищення LATENCY_SLO (з попередженням)",
+            collect=lambda: self.latency.breaches)
+        registry.gauge(
+            "payment_latency_inflight", "Знайдені платежі, повідомлення про які ще не відправлено",
+            collect=lambda: len(self.latency.inflight))
+        registry.counter(
+            "telegram_retry_after_total", "Відповіді RetryAfter від Telegram",
+            collect=lambda: self.notifier.retry_after)
+        registry.counter(
+            "telegram_sent_total", "Відправлені платежі (з дайджестами)",
+            collect=lambda: self.notifier.sent)
+        registry.counter(
+            "telegram_digests_total", "Відправлені дайджести (кілька платежів одним повідомленням)",
+            collect=lambda: self.notifier.digests)
+        registry.counter(
+            "telegram_retries_total", "Повторні спроби відправки після помилки Telegram",
+            collect=lambda: self.notifier.retries)
+        registry.counter(
+            "telegram_dropped_total", "Платежі, які не вдалося відправити (остаточна помилка)",
+            collect=lambda: self.notifier.dropped)
+        registry.gauge(
+            "telegram_queue_size", "Платежі в черзі на відправку",
+            collect=self.notifier.pending)
+        registry.counter(
+            "push_events_total", "Push-запити: received - прийняті трансфери, rejected - відхилені запити", ["result"],
+            collect=lambda: {"received": self.push.received, "rejected": self.push.rejected} if self.push else {})
+        registry.gauge(
+            "outbox_messages", "Повідомлення outbox за станами", ["state"],
+            collect=self.ledger.outbox_counts)
+        registry.gauge(
+            "processed_txns", "Хеші в кеші дедуплікації",
+            collect=lambda: len(self.processed_txns))
+        registry.counter(
+            "dedup_journal_lookups_total", "Перевірки дедуплікації за журналом",
+            collect=lambda: self.processed_txns.journal_lookups)
+        registry.gauge(
+            "provider_circuit_open", "Запити до напрямку (хост + ключ) призупинено запобіжником", ["lane"],
+            collect=lambda: {name: int(breaker.blocked()) for name, breaker in self.providers.circuits().items()})
+        registry.counter(
+            "provider_circuit_trips_total", "Скільки разів запобіжник напрямку відкривався", ["lane"],
+            collect=lambda: {name: breaker.trips for name, breaker in self.providers.circuits().items()})
+        registry.counter(
+            "api_key_requests_total", "Запити з ключем з пулу", ["key"],
+            collect=lambda: {key.name: key.requests for key in self.key_pool.all()})
+        registry.counter(
+            "api_key_throttled_total", "Відповіді 429 на запити з ключем", ["key"],
+            collect=lambda: {key.name: key.throttled for key in self.key_pool.all()})
+        registry.gauge(
+            "api_key_quota_remaining", "Залишок квоти ключа з X-RateLimit-Remaining", ["key"],
+            collect=lambda: {key.name: key.remaining for key in self.key_pool.all() if key.remaining is not None})
+        registry.gauge(
+            "api_key_quota_limit", "Розмір квоти ключа з X-RateLimit-Limit", ["key"],
+            collect=lambda: {key.name: key.limit for key in self.key_pool.all() if key.limit is not None})
+        registry.gauge(
+            "api_key_parked", "Ключ відкладено до скидання квоти", ["key"],
+            collect=lambda: {key.name: int(key.parked()) for key in self.key_pool.all()})
+        registry.counter(
+            "response_cache_requests_total", "Запити до API через кеш відповідей: hit, coalesced, miss", ["result"],
+            collect=self.response_cache.stats)
+        registry.gauge(
+            "response_cache_entries", "Відповіді в кеші (включно з простроченими, ще не видаленими)",
+            collect=lambda: len(self.response_cache))
+        registry.gauge(
+            "seconds_since_last_poll", "Секунд від останньої успішної перевірки",
+            collect=lambda: round(time.time() - (self.last_poll_success or self.started_at), 3))
+        registry.gauge(
+            "poll_requests_last_minute", "Запити до API за останні 60 с (ліміт POLL_REQUEST_BUDGET)",
+            collect=lambda: self.scheduler.minute_budget.used() if self.scheduler.minute_budget.limit > 0 else None)
+        registry.gauge(
+            "poll_interval_seconds", "Поточна пауза між перевірками",
+            collect=lambda: self.poll.interval)
+        registry.gauge(
+            "poll_interval_reason", "Чому вибрано поточну паузу (1 для поточної причини)", ["reason"],
+            collect=lambda: {self.poll.mode: 1})
+        registry.gauge(
+            "endpoint_score", "Оцінка endpoint'а в рейтингу провайдерів", ["endpoint"],
+            collect=lambda: {endpoint.name: round(endpoint.score, 4) for endpoint in self.providers.endpoints})
+        return registry
     
     def format_timestamp(self, timestamp_ms):
         """Форматує timestamp в UTC+2 (Київський час)"""
@@ -45,476 +306,547 @@ class PaymentMonitor:
             return "Невідомо"
     
     def load_processed_txns(self):
-        """Завантажує список оброблених транзакцій"""
-        if os.path.exists(self.processed_txns_file):
-            try:
-                with open(self.processed_txns_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return set(data.get("txns", [])), data.get("bot_start_time")
-            except Exception as e:
-                print(f"⚠️  Помилка завантаження: {e}")
-        return set(), None
+        """Відкриває журнал оброблених транзакцій (з одноразовим переносом зі старого JSON)"""
+        ledger = Ledger(config.LEDGER_FILE)
+        try:
+            # Тимчасовий журнал (:memory:, наприклад для --replay) не чіпає старий JSON
+            if config.LEDGER_FILE != ":memory:":
+                ledger.migrate_from_json(self.processed_txns_file)
+        except Exception as e:
+            logger.warning("⚠️  Помилка переносу %s: %s", self.processed_txns_file, e)
+        return ledger, ledger.get_meta("bot_start_time"), ledger.load_watermarks()
+    
+    def dedup_reference(self):
+        """Момент, від якого відраховується горизонт дедуплікації: найновіший
+        курсор (або початок найстарішого незаповненого пропуску)"""
+        reference = max((w.timestamp for w in self.watermarks.values()), default=0) or int(time.time() * 1000)
+        gaps = [w.gap[0] for w in self.watermarks.values() if w.gap]
+        return min([reference] + gaps)
     
     def save_processed_txns(self):
-        """Зберігає список оброблених транзакцій"""
+        """Зберігає нові оброблені транзакції та курсори однією транзакцією БД"""
         try:
-            data = {
-                "txns": list(self.processed_txns),
-                "last_update": datetime.now().isoformat(),
-                "bot_start_time": self.bot_start_time
-            }
-            with open(self.processed_txns_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self.ledger.set_meta("bot_start_time", self.bot_start_time)
+            self.ledger.commit(self.watermarks)
+            self.state_dirty = False
+            # Відправлені повідомлення вже позначені в БД - більше не відстежуємо
+            for key in self.outbox_settled:
+                self.outbox_inflight.discard(key)
+            self.outbox_settled.clear()
         except Exception as e:
-            print(f"⚠️  Помилка збереження: {e}")
-    
-    def get_transactions_trongrid(self):
-        """Альтернативний метод через TronGrid API"""
-        # Спробуємо спочатку з фільтром по USDT, потім без фільтра
-        variants = [
-            {"contract_address": self.usdt_contract, "name": "з фільтром USDT"},
-            {"name": "без фільтра (всі TRC20)"}
-        ]
+            logger.error("⚠️  Помилка збереження: %s", e)
+    
+    def extract_transfers(self, endpoint, data):
+        """Сторінка відповіді -> список Transfer (None - невірний формат).
+
+        Формат визначається один раз і кешується в endpoint'і; далі лише
+        перевіряється, що відповідь досі в ньому (ключ списку + поле першого запису).
+        """
+        schema = endpoint.schema
+        if schema is not None and schema.matches(data):
+            return schema.extract(data)
+        if is_empty_page(data):
+            return []
         
-        for variant in variants:
+        detected = detect_schema(data)
+        if detected is None:
+            keys = list(data.keys()) if isinstance(data, dict) else type(data).__name__
+            logger.warning("⚠️  %s: не знайдено списку трансферів. Ключі: %s", endpoint.name, keys)
+            return None
+        if schema is None:
+            logger.info("🧩 %s: формат відповіді %s", endpoint.name, detected.name)
+        else:
+            logger.warning("⚠️  %s: формат відповіді змінився %s -> %s", endpoint.name, schema.name, detected.name)
+        endpoint.schema = detected
+        return detected.extract(data)
+    
+    async def fetch_next_pages(self, endpoint, url, params, data, transfers, since):
+        """Догружає наступні сторінки до курсора: TronGrid - meta.fingerprint,
+        Tronscan - зсув start.
+
+        Повертає (всі трансфери, кількість сторінок, чи зупинились не дійшовши до курсора).
+        """
+        page = transfers
+        transfers = list(transfers)
+        pages = 1
+        
+        def next_fingerprint(data):
+            return (data.get("meta") or {}).get("fingerprint") if isinstance(data, dict) else None
+        
+        fingerprint = next_fingerprint(data)
+        while len(page) >= params["limit"] and not reached_since(page, since):
+            if endpoint.paging == "fingerprint":
+                if not fingerprint:
+                    break
+                page_params = {**params, "fingerprint": fingerprint}
+            else:
+                page_params = {**params, "start": pages * params["limit"]}
+            
+            if pages >= config.MAX_PAGES:
+                logger.warning("⚠️  %s: досягнуто ліміту %d сторінок, не дійшли до курсора", endpoint.name, config.MAX_PAGES)
+                return transfers, pages, True
+            
+            # Помилка на наступній сторінці не скасовує вже отримані: решту
+            # до курсора дозавантажить backfill (truncated)
+            self.fetch_attempts.inc(endpoint=endpoint.name)
             try:
-                url = f"https://api.trongrid.io/v1/accounts/{self.tron_address_original}/transactions/trc20"
-                params = {
-                    "limit": 50,
-                    "only_confirmed": True
-                }
-                if "contract_address" in variant:
-                    params["contract_address"] = variant["contract_address"]
-                
-                print(f"\n📡 TronGrid API ({variant['name']}): {url}")
-                print(f"📋 Параметри: {params}")
-                
-                response = requests.get(url, params=params, timeout=15)
-                
+                response, latency = await self.api_get(endpoint, url, page_params)
+            except (asyncio.TimeoutError, httpx.TimeoutException):
+                logger.warning("❌ Таймаут запиту до %s на сторінці %d", endpoint.name, pages + 1)
+                self.fetch_failures.inc(endpoint=endpoint.name, status="timeout")
+                return transfers, pages, True
+            except httpx.HTTPError as e:
+                logger.warning("❌ Помилка мережі (%s) на сторінці %d: %s", endpoint.name, pages + 1, e)
+                self.fetch_failures.inc(endpoint=endpoint.name, status="network")
+                return transfers, pages, True
+            if response is None:
+                return transfers, pages, True
+            self.fetch_duration.observe(latency, endpoint=endpoint.name)
+            self.record_response(endpoint, response)
+            if response.status_code != 200:
+                logger.warning("⚠️  %s: помилка %s на сторінці %d", endpoint.name, response.status_code, pages + 1)
+                self.fetch_failures.inc(endpoint=endpoint.name, status=response.status_code)
+                return transfers, pages, True
+            
+            try:
+                data = response.json()
+            except json.JSONDecodeError as e:
+                logger.warning("❌ %s: помилка парсингу JSON на сторінці %d: %s", endpoint.name, pages + 1, e)
+                self.fetch_failures.inc(endpoint=endpoint.name, status="invalid_json")
+                return transfers, pages, True
+            page = self.extract_transfers(endpoint, data)
+            if page is None:
+                self.fetch_failures.inc(endpoint=endpoint.name, status="unknown_format")
+                return transfers, pages, True
+            pages += 1
+            transfers.extend(page)
+            fingerprint = next_fingerprint(data)
+        
+        return transfers, pages, False
+    
+    async def fetch_endpoint(self, endpoint, address, since=None, until=None):
+        """Один запит до endpoint'а з урахуванням статистики.
+
+        Повертає FetchResult (може бути порожнім) або None при помилці.
+        Однакові запити (endpoint + параметри) обслуговуються з кешу відповідей.
+        """
+        url, params = endpoint.build(address, self.usdt_contract, since, until, config.PAGE_SIZE)
+        key = (endpoint.name, url, tuple(sorted(params.items())))
+        return await self.response_cache.get(key, lambda: self.request_endpoint(endpoint, url, params, since, address))
+    
+    async def request_endpoint(self, endpoint, url, params, since=None, address=None):
+        """Запит до API для fetch_endpoint (без кешу)"""
+        if not self.providers.allow(endpoint):
+            logger.debug("⛔ %s: запити до %s призупинено", endpoint.name, lane_name(endpoint.lane))
+            return None
+        # Діагностика запиту - лише на рівні DEBUG
+        logger.debug("📡 %s %s params=%s headers=%s", endpoint.name, url, params, list(endpoint.headers))
+        
+        self.fetch_attempts.inc(endpoint=endpoint.name)
+        started = time.monotonic()
+        try:
+            response, latency = await self.api_get(endpoint, url, params)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            logger.warning("❌ Таймаут запиту до %s", endpoint.name)
+            self.providers.record_failure(endpoint, time.monotonic() - started)
+            self.fetch_failures.inc(endpoint=endpoint.name, status="timeout")
+            return None
+        except httpx.HTTPError as e:
+            logger.warning("❌ Помилка мережі (%s): %s", endpoint.name, e)
+            self.providers.record_failure(endpoint)
+            self.fetch_failures.inc(endpoint=endpoint.name, status="network")
+            return None
+        if response is None:
+            logger.warning("🔑 %s: всі ключі %s вичерпали квоту", endpoint.name, endpoint.provider)
+            return None
+        self.fetch_duration.observe(latency, endpoint=endpoint.name)
+        logger.debug("📊 Статус відповіді: %s (%.2f с)", response.status_code, latency)
+        self.record_response(endpoint, response)
+        
+        if response.status_code != 200:
+            if response.status_code == 400:
+                logger.warning("⚠️  %s: помилка 400 (Bad Request) - перевірте параметри", endpoint.name)
+            elif response.status_code == 401:
+                logger.warning("⚠️  %s: помилка 401 (Unauthorized) - можливо невірний API ключ", endpoint.name)
+            elif response.status_code == 404:
+                logger.warning("⚠️  %s: помилка 404 (Not Found) - endpoint не знайдено", endpoint.name)
+            elif response.status_code == 429:
+                logger.warning("⚠️  %s: помилка 429 (Too Many Requests) - перевищено ліміт запитів", endpoint.name)
+            else:
+                logger.warning("❌ %s: помилка API %s", endpoint.name, response.status_code)
+            if response.status_code != 404:
+                logger.debug("Відповідь: %s", response.text[:500])
+            self.providers.record_failure(endpoint, latency, response.status_code)
+            self.fetch_failures.inc(endpoint=endpoint.name, status=response.status_code)
+            return None
+        
+        try:
+            data = response.json()
+        except json.JSONDecodeError as e:
+            logger.warning("❌ %s: помилка парсингу JSON: %s", endpoint.name, e)
+            logger.debug("Відповідь (перші 500 символів): %s", response.text[:500])
+            self.providers.record_failure(endpoint, latency, response.status_code)
+            self.fetch_failures.inc(endpoint=endpoint.name, status="invalid_json")
+            return None
+        
+        # Детальна діагностика структури відповіді: серіалізація всієї відповіді
+        # дорога, тому виконується лише коли увімкнено DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            if isinstance(data, dict):
+                logger.debug("📊 Ключі в відповіді: %s", list(data.keys()))
+                logger.debug("📄 Приклад даних: %s...", json.dumps(data, indent=2, ensure_ascii=False)[:800])
+            elif isinstance(data, list) and data:
+                logger.debug("📄 Приклад першого елемента: %s...", json.dumps(data[0], indent=2, ensure_ascii=False)[:400])
+        
+        transfers = self.extract_transfers(endpoint, data)
+        if transfers is None:
+            logger.warning("⚠️  %s: трансфери не знайдено або невірний формат", endpoint.name)
+            self.providers.record_failure(endpoint, latency, response.status_code)
+            self.fetch_failures.inc(endpoint=endpoint.name, status="unknown_format")
+            return None
+        
+        if not transfers:
+            # Для запиту з курсором порожня відповідь - норма (нових трансферів немає),
+            # але лише від endpoint'а, що вже повертав USDT трансфери цієї адреси;
+            # інакше вважаємо її ознакою того, що endpoint не бачить наших даних
+            trusted = bool(since) and endpoint.accept_empty(address, config.PROVIDER_CROSS_CHECK)
+            self.providers.record_success(endpoint, latency, empty=not trusted)
+            if since:
+                logger.debug("ℹ️  Нових трансферів немає (%s%s)", endpoint.name, "" if trusted else ", потрібна перевірка")
+            else:
+                logger.warning("⚠️  Отримано порожній список трансферів з %s", endpoint.name)
+            return FetchResult(source=endpoint.provider, trusted=trusted)
+        
+        pages, truncated = 1, False
+        if since:
+            transfers, pages, truncated = await self.fetch_next_pages(endpoint, url, params, data, transfers, since)
+        self.providers.record_success(endpoint, latency)
+        if any(self.is_usdt(txn) for txn in transfers):
+            endpoint.record_data(address)
+        
+        logger.debug("✅ Отримано %d трансферів з %s, перший: %r", len(transfers), endpoint.name, transfers[0])
+        return FetchResult(transfers, pages, truncated, source=endpoint.provider)
+    
+    async def api_get(self, endpoint, url, params):
+        """GET до провайдера в межах лімітів. Для endpoint'ів з ключем ключ береться
+        з пулу; якщо ключ отримав 429, він паркується і запит повторюється з наступним.
+        Повертає (відповідь або None, якщо вільних ключів немає; час самого запиту
+        без очікування лімітів)"""
+        response, latency = None, 0.0
+        attempts = max(1, self.key_pool.size(endpoint.provider)) if endpoint.keyed else 1
+        for _ in range(attempts):
+            await self.scheduler.acquire()
+            headers = endpoint.headers
+            key = None
+            if endpoint.keyed:
+                key = await self.key_pool.acquire(endpoint.provider)
+                if key is None:
+                    break
+                headers = {**headers, "TRON-PRO-API-KEY": key.value}
+            else:
+                await self.providers.acquire(endpoint)
+            started = time.monotonic()
+            response = await self.http.get(url, params=params, headers=headers)
+            latency = time.monotonic() - started
+            if key is None:
+                break
+            pause = self.key_pool.record(key, response.status_code, response.headers)
+            if pause is not None:
                 if response.status_code == 200:
-                    data = response.json()
-                    print(f"📊 TronGrid відповідь: тип={type(data)}, ключі={list(data.keys()) if isinstance(data, dict) else 'N/A'}")
-                    
-                    if "data" in data and isinstance(data["data"], list):
-                        transfers = data["data"]
-                        print(f"📊 TronGrid: знайдено {len(transfers)} транзакцій")
-                        
-                        if len(transfers) > 0:
-                            print(f"✅ TronGrid: Отримано {len(transfers)} транзакцій")
-                            # Показуємо приклад
-                            first = transfers[0]
-                            print(f"🔍 Приклад: transaction_id={first.get('transaction_id', 'N/A')[:32]}...")
-                            print(f"   to={first.get('to', 'N/A')}")
-                            print(f"   token={first.get('token_info', {}).get('symbol', 'N/A')}")
-                            
-                            # Конвертуємо формат TronGrid в формат, який очікує наш код
-                            converted = []
-                            for tx in transfers:
-                                token_info = tx.get("token_info", {})
-                                converted.append({
-                                    "hash": tx.get("transaction_id", ""),
-                                    "transactionHash": tx.get("transaction_id", ""),
-                                    "toAddress": tx.get("to", ""),
-                                    "fromAddress": tx.get("from", ""),
-                                    "amount": tx.get("value", "0"),
-                                    "timestamp": tx.get("block_timestamp", 0),
-                                    "contractAddress": token_info.get("address", ""),
-                                    "contract_address": token_info.get("address", ""),
-                                    "tokenSymbol": token_info.get("symbol", ""),
-                                    "token_symbol": token_info.get("symbol", ""),
-                                    "tokenName": token_info.get("name", ""),
-                                    "token_name": token_info.get("name", "")
-                                })
-                            return converted
-                        else:
-                            print("⚠️  TronGrid: порожній список транзакцій")
+                    logger.debug("🔑 Квоту ключа %s вичерпано, наступні запити - іншими ключами (%.0f с)", key.name, pause)
+                elif pause <= MAX_PARK_WAIT:
+                    # Коротке вікно квоти - звичайна ротація, не проблема
+                    logger.debug("🔑 Ключ %s: помилка %s, відкладено на %.0f с", key.name, response.status_code, pause)
                 else:
-                    print(f"⚠️  TronGrid API помилка: {response.status_code}")
-                    print(f"Відповідь: {response.text[:300]}")
+                    logger.warning("🔑 Ключ %s: помилка %s, відкладено на %.0f с", key.name, response.status_code, pause)
+            if response.status_code != 429:
+                break
+        return response, latency
+    
+    def record_response(self, endpoint, response):
+        """Стан запобіжника напрямку (хост з ключем / без) за відповіддю: 429 / 5xx - перевантаження,
+        Retry-After - точна пауза"""
+        status = response.status_code
+        if status == 429 and endpoint.keyed:
+            # Ліміт конкретного ключа - його вже відклав пул ключів
+            return
+        retry_after = None
+        if status == 429 or status >= 500:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if self.providers.record_response(endpoint, status, retry_after):
+            breaker = self.providers.breaker(endpoint)
+            logger.warning(
+                "⛔ %s: перевантаження (%s), запити призупинено на %.0f с",
+                lane_name(endpoint.lane), status, breaker.open_until - time.time()
+            )
+    
+    async def get_transactions(self, address=None, since=None, until=None):
+        """Отримує останні TRC20 трансфери (TronGrid / Tronscan API).
+
+        Endpoint'и перебираються в порядку рейтингу реєстру провайдерів:
+        у стабільному режимі це один запит до найкращого endpoint'а.
+        Повертає FetchResult зі списком трансферів ([] - нових немає) або None,
+        якщо жоден з провайдерів не відповів. З since сторінки догружаються
+        до курсора (не більше MAX_PAGES).
+        """
+        address = address or self.tron_address_original
+        logger.debug("🔍 Пошук транзакцій для адреси: %s", address)
+        
+        if config.HEDGE_ENABLED:
+            return await self.get_transactions_hedged(address, since, until)
+        
+        endpoints = self.available_endpoints()
+        if not endpoints:
+            logger.warning("⛔ Запити до всіх провайдерів призупинено після перевантаження, перевірку пропущено")
+            return None
+        
+        attempt = 0
+        got_response = False
+        # Endpoint'и, що порожньо відповіли на запит з курсором, але без довіри
+        empty = []
+        # Напрямки (хост + ключ), що відповіли 429 / 5xx: інші їх варіанти впруться в той самий ліміт
+        overloaded = set()
+        while endpoints:
+            endpoint = endpoints.pop(0)
+            if endpoint.lane in overloaded:
+                continue
+            attempt += 1
+            try:
+                result = await self.fetch_endpoint(endpoint, address, since, until)
             except Exception as e:
-                print(f"⚠️  TronGrid API помилка ({variant['name']}): {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Несподівана помилка (%s): %s", endpoint.name, e)
+                self.providers.record_failure(endpoint)
+                continue
+            
+            if result is None:
+                if self.overloaded(endpoint):
+                    overloaded.add(endpoint.lane)
+                continue  # Спробуємо наступний варіант
+            got_response = True
+            if result:
+                self.distrust_empty(empty, address, result)
+                return result
+            if since and self.confirmed_empty(endpoint, result, empty):
+                return result
+            if empty:
+                # Порожню відповідь перевіряємо насамперед іншим провайдером
+                unconfirmed = {e.provider for e in empty}
+                endpoints.sort(key=lambda e: e.provider in unconfirmed)
         
-        return None
-    
-    def get_transactions(self):
-        """Отримує останні TRC20 трансфери з Tronscan API"""
-        print(f"\n🔍 Пошук транзакцій для адреси: {self.tron_address_original}")
+        if got_response:
+            return FetchResult()
         
-        # Спочатку спробуємо TronGrid API
-        trongrid_result = self.get_transactions_trongrid()
-        if trongrid_result:
-            return trongrid_result
+        if overloaded:
+            logger.warning("⛔ Провайдери перевантажені (429 / 5xx): %s", ", ".join(sorted(lane_name(lane) for lane in overloaded)))
+            return None
         
-        # Спробуємо різні варіанти headers (згідно з документацією Tronscan API)
-        headers_variants = [
-            {"TRON-PRO-API-KEY": self.api_token} if self.api_token else {},
-            {"TRON-PRO-API-KEY": self.api_token, "Content-Type": "application/json"} if self.api_token else {},
-            {}  # Без API ключа
+        # Якщо всі варіанти не спрацювали
+        logger.error(
+            "❌ Всі %d спроб не спрацювали. Перевірте: 1) чи правильна адреса %s; "
+            "2) чи є транзакції на цій адресі (tronscan.org); 3) чи правильний API ключ",
+            attempt, address
+        )
+        return None
+    
+    def confirmed_empty(self, endpoint, result, empty):
+        """Порожня відповідь з курсором означає "нових трансферів немає", якщо endpoint
+        вже повертав трансфери цієї адреси або порожньо відповіли два різні провайдери"""
+        if result.trusted:
+            return True
+        empty.append(endpoint)
+        return len({e.provider for e in empty}) > 1
+    
+    def distrust_empty(self, empty, address, result):
+        """Інший endpoint знайшов USDT трансфери, яких не побачили ті, що відповіли порожньо"""
+        if any(self.is_usdt(txn) for txn in result):
+            for endpoint in empty:
+                endpoint.distrust(address)
+    
+    def available_endpoints(self):
+        """Endpoint'и за рейтингом без призупинених напрямків і тих, кому бракує вільного ключа"""
+        return [
+            endpoint for endpoint in self.providers.available()
+            if not endpoint.keyed or self.key_pool.ready(endpoint.provider)
         ]
+    
+    def overloaded(self, endpoint):
+        """Endpoint щойно відповів 429 / 5xx або його напрямок призупинено"""
+        status = endpoint.last_status
+        if endpoint.keyed and not self.key_pool.ready(endpoint.provider):
+            return True
+        if status == 429 and endpoint.keyed:
+            # Інші ключі ще вільні
+            return False
+        return (isinstance(status, int) and (status == 429 or status >= 500)) or self.providers.breaker(endpoint).blocked()
+    
+    def hedge_delay(self, endpoint):
+        """Скільки чекати відповіді endpoint'а перед паралельним запитом до наступного"""
+        if len(endpoint.latency_samples) >= config.HEDGE_MIN_SAMPLES:
+            return min(endpoint.latency_percentile(config.HEDGE_PERCENTILE), config.HEDGE_DELAY)
+        return config.HEDGE_DELAY
+    
+    async def get_transactions_hedged(self, address, since=None, until=None):
+        """Hedging: якщо endpoint не відповів за свій p95 (не більше HEDGE_DELAY),
+        паралельно запитуємо наступний за рейтингом (переважно в іншого провайдера).
+        Перемагає перша валідна непорожня відповідь, решта запитів скасовується.
+        """
+        remaining = self.available_endpoints()
+        if not remaining:
+            logger.warning("⛔ Запити до всіх провайдерів призупинено після перевантаження, перевірку пропущено")
+            return None
+        pending = {}
+        launched = 0
+        got_response = False
+        empty = []
+        # Порожню відповідь з курсором підтверджено (приймаємо, коли вже не чекаємо на інші)
+        settled = False
         
-        # Endpoints згідно з офіційною документацією Tronscan API
-        # https://docs.tronscan.org/api-endpoints/transactions-and-transfers
-        endpoints_to_try = [
-            # Варіант 1: Get trc20&721 transfers list - з фільтром по USDT та toAddress
-            {
-                "url": "https://apilist.tronscanapi.com/api/transfer",
-                "params": {
-                    "toAddress": self.tron_address_original,
-                    "contract_address": self.usdt_contract,
-                    "start": 0,
-                    "limit": 50,
-                    "confirm": "true"  # Тільки підтверджені транзакції
-                },
-                "name": "TRC20 transfers (toAddress + USDT contract)"
-            },
-            # Варіант 2: Get trc20&721 transfers list - з relatedAddress та USDT
-            {
-                "url": "https://apilist.tronscanapi.com/api/transfer",
-                "params": {
-                    "relatedAddress": self.tron_address_original,
-                    "contract_address": self.usdt_contract,
-                    "start": 0,
-                    "limit": 50,
-                    "confirm": "true"
-                },
-                "name": "TRC20 transfers (relatedAddress + USDT contract)"
-            },
-            # Варіант 3: Get trc20&721 transfers list - тільки toAddress (всі TRC20)
-            {
-                "url": "https://apilist.tronscanapi.com/api/transfer",
-                "params": {
-                    "toAddress": self.tron_address_original,
-                    "start": 0,
-                    "limit": 50,
-                    "confirm": "true"
-                },
-                "name": "TRC20 transfers (toAddress, всі токени)"
-            },
-            # Варіант 4: Get account's transaction datas - з фільтром USDT
-            {
-                "url": f"https://apilist.tronscanapi.com/api/account/{self.tron_address_original}/transactions/trc20",
-                "params": {
-                    "address": self.tron_address_original,
-                    "trc20Id": self.usdt_contract,
-                    "direction": 2,  # 2 = transfer-in (вхідні)
-                    "start": 0,
-                    "limit": 50,
-                    "reverse": "true"  # Сортування за часом створення
-                },
-                "name": "Account TRC20 transactions (USDT, transfer-in)"
-            },
-            # Варіант 5: Get account's transaction datas - всі TRC20
-            {
-                "url": f"https://apilist.tronscanapi.com/api/account/{self.tron_address_original}/transactions/trc20",
-                "params": {
-                    "address": self.tron_address_original,
-                    "direction": 2,  # 2 = transfer-in
-                    "start": 0,
-                    "limit": 50,
-                    "reverse": "true"
-                },
-                "name": "Account TRC20 transactions (всі токени, transfer-in)"
-            },
-            # Варіант 6: Get trc20&721 transfers list - relatedAddress (всі TRC20)
-            {
-                "url": "https://apilist.tronscanapi.com/api/transfer",
-                "params": {
-                    "relatedAddress": self.tron_address_original,
-                    "start": 0,
-                    "limit": 50,
-                    "confirm": "true"
-                },
-                "name": "TRC20 transfers (relatedAddress, всі токени)"
-            }
-        ]
+        def launch():
+            nonlocal launched
+            # Страхувальний запит має сенс до іншого провайдера, ніж ті, що вже "зависли"
+            # (а для перевірки порожньої відповіді - до іншого, ніж той, що її дав)
+            busy = {endpoint.provider for endpoint in [*pending.values(), *empty]}
+            endpoint = next((e for e in remaining if e.provider not in busy), remaining[0])
+            remaining.remove(endpoint)
+            launched += 1
+            task = asyncio.create_task(self.fetch_endpoint(endpoint, address, since, until))
+            pending[task] = endpoint
+            return endpoint
         
-        attempt = 0
-        for headers in headers_variants:
-            for endpoint_config in endpoints_to_try:
-                attempt += 1
-                url = endpoint_config["url"]
-                params = endpoint_config["params"]
-                endpoint_name = endpoint_config.get("name", "Unknown")
+        last_launched = launch()
+        try:
+            while pending:
+                can_hedge = remaining and len(pending) < config.HEDGE_MAX_PARALLEL
+                timeout = self.hedge_delay(last_launched) if can_hedge else None
+                done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # Endpoint відповідає повільніше за звичайне - страхуємось наступним
+                    logger.info("⏱️  %s не відповів за %.2f с, паралельний запит", last_launched.name, timeout)
+                    last_launched = launch()
+                    continue
                 
-                try:
-                    print(f"\n📡 Спроба {attempt}: {endpoint_name}")
-                    print(f"🔗 URL: {url}")
-                    print(f"📋 Параметри: {params}")
-                    if headers:
-                        print(f"🔑 Headers: {list(headers.keys())}")
+                for task in done:
+                    endpoint = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error("❌ Несподівана помилка (%s): %s", endpoint.name, e)
+                        self.providers.record_failure(endpoint)
+                        result = None
                     
-                    response = requests.get(url, headers=headers, params=params, timeout=15)
-                    print(f"📊 Статус відповіді: {response.status_code}")
-            
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                        except json.JSONDecodeError as e:
-                            print(f"❌ Помилка парсингу JSON: {e}")
-                            print(f"Відповідь (перші 500 символів): {response.text[:500]}")
-                            continue
-                        
-                        # Детальна діагностика структури відповіді
-                        print(f"📊 Тип відповіді: {type(data)}")
-                        if isinstance(data, dict):
-                            print(f"📊 Ключі в відповіді: {list(data.keys())}")
-                            # Показуємо перші 800 символів JSON для діагностики
-                            json_str = json.dumps(data, indent=2, ensure_ascii=False)
-                            print(f"📄 Приклад даних: {json_str[:800]}...")
-                        elif isinstance(data, list):
-                            print(f"📊 Отримано список з {len(data)} елементів")
-                            if len(data) > 0:
-                                print(f"📄 Приклад першого елемента: {json.dumps(data[0], indent=2, ensure_ascii=False)[:400]}...")
-                        
-                        # Отримуємо список трансферів згідно з документацією Tronscan API
-                        transfers = []
-                        if isinstance(data, dict):
-                            # Згідно з документацією, endpoint /api/transfer повертає {"data": [...]}
-                            # А endpoint /api/account/{address}/transactions/trc20 також повертає {"data": [...]}
-                            if "data" in data:
-                                transfers = data["data"]
-                                if isinstance(transfers, list):
-                                    print(f"✅ Знайдено ключ 'data' з {len(transfers)} елементів")
-                                else:
-                                    print(f"⚠️  Ключ 'data' не є списком (тип: {type(transfers)})")
-                            else:
-                                print(f"⚠️  Не знайдено ключа 'data'. Всі ключі: {list(data.keys())}")
-                                # Спробуємо знайти будь-який список в словнику
-                                for key, value in data.items():
-                                    if isinstance(value, list) and len(value) > 0:
-                                        # Перевіримо чи це виглядає як список транзакцій
-                                        first_item = value[0] if value else {}
-                                        if isinstance(first_item, dict):
-                                            # Перевіряємо наявність полів транзакції
-                                            tx_fields = ['hash', 'transactionHash', 'toAddress', 'fromAddress', 'to', 'from', 'transaction_id']
-                                            if any(k in first_item for k in tx_fields):
-                                                transfers = value
-                                                print(f"✅ Знайдено список транзакцій в ключі '{key}' з {len(transfers)} елементів")
-                                                break
-                        elif isinstance(data, list):
-                            transfers = data
-                            print(f"✅ Відповідь є списком з {len(transfers)} елементів")
-                        
-                        if transfers and isinstance(transfers, list) and len(transfers) > 0:
-                            print(f"✅ УСПІХ! Отримано {len(transfers)} трансферів з {endpoint_name}")
-                            # Показуємо приклад першої транзакції
-                            first = transfers[0]
-                            print(f"🔍 Приклад першої транзакції:")
-                            print(f"   Hash: {first.get('hash', first.get('transactionHash', first.get('transaction_id', 'N/A')))[:32]}...")
-                            print(f"   To: {first.get('toAddress', first.get('to', 'N/A'))}")
-                            print(f"   From: {first.get('fromAddress', first.get('from', 'N/A'))}")
-                            print(f"   Amount: {first.get('amount', first.get('value', 'N/A'))}")
-                            print(f"   Token: {first.get('tokenInfo', {}).get('symbol', first.get('tokenSymbol', 'N/A'))}")
-                            return transfers
-                        else:
-                            if isinstance(transfers, list) and len(transfers) == 0:
-                                print(f"⚠️  Отримано порожній список трансферів з {endpoint_name}")
-                            else:
-                                print(f"⚠️  Трансфери не знайдено або невірний формат (тип: {type(transfers)})")
-                            continue  # Спробуємо наступний варіант
-                    elif response.status_code == 400:
-                        print(f"⚠️  Помилка 400 (Bad Request) - перевірте параметри")
-                        print(f"Відповідь: {response.text[:500]}")
+                    if result is None:
+                        if self.overloaded(endpoint):
+                            remaining[:] = [e for e in remaining if e.lane != endpoint.lane]
                         continue
-                    elif response.status_code == 401:
-                        print(f"⚠️  Помилка 401 (Unauthorized) - можливо невірний API ключ")
-                        print(f"Відповідь: {response.text[:500]}")
-                        continue
-                    elif response.status_code == 404:
-                        print(f"⚠️  Помилка 404 (Not Found) - endpoint не знайдено")
-                        continue
-                    else:
-                        print(f"❌ Помилка API: {response.status_code}")
-                        print(f"Відповідь: {response.text[:500]}")
-                        continue
-                except requests.exceptions.Timeout:
-                    print(f"❌ Таймаут запиту до {endpoint_name}")
-                    continue
-                except requests.exceptions.RequestException as e:
-                    print(f"❌ Помилка мережі: {e}")
-                    continue
-                except Exception as e:
-                    print(f"❌ Несподівана помилка: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    got_response = True
+                    if result:
+                        self.distrust_empty(empty, address, result)
+                        return result
+                    if since and self.confirmed_empty(endpoint, result, empty):
+                        settled = True
+                
+                if pending:
                     continue
+                if settled:
+                    return FetchResult()
+                # Помилка або непідтверджена порожня відповідь - одразу наступний endpoint
+                if remaining:
+                    last_launched = launch()
+        finally:
+            for task in pending:
+                task.cancel()
         
-        # Якщо всі варіанти не спрацювали
-        print(f"\n❌ Всі {attempt} спроб не спрацювали")
-        print(f"💡 Перевірте:")
-        print(f"   1. Чи правильна адреса: {self.tron_address_original}")
-        print(f"   2. Чи є транзакції на цій адресі (перевірте на tronscan.org)")
-        print(f"   3. Чи правильний API ключ (якщо використовується)")
-        return []
+        if got_response:
+            return FetchResult()
+        logger.error("❌ Жоден з %d endpoint'ів не відповів", launched)
+        return None
     
     def is_usdt(self, txn):
         """Перевіряє чи це USDT TRC20 транзакція"""
-        # Перевірка contract address (різні формати)
-        contract = (
-            txn.get("contractAddress") or 
-            txn.get("contract_address") or 
-            txn.get("tokenContractAddress") or 
-            ""
-        )
-        
-        # Перевірка через tokenInfo (формат Tronscan API)
-        token_info = txn.get("tokenInfo") or txn.get("token_info") or {}
-        if isinstance(token_info, dict):
-            contract_from_info = token_info.get("address") or token_info.get("contractAddress") or ""
-            if contract_from_info:
-                contract = contract or contract_from_info
-        
-        if contract and contract.upper() == self.usdt_contract.upper():
+        if txn.contract and txn.contract.upper() == self.usdt_contract.upper():
             return True
-        
         # Перевірка по символу та назві
-        symbol = (
-            txn.get("tokenSymbol") or 
-            txn.get("token_symbol") or 
-            txn.get("symbol") or 
-            ""
-        )
-        
-        # Перевірка символу в tokenInfo
-        if isinstance(token_info, dict):
-            symbol = symbol or token_info.get("symbol") or token_info.get("tokenAbbr") or ""
-        
-        name = (
-            txn.get("tokenName") or 
-            txn.get("token_name") or 
-            txn.get("name") or 
-            ""
-        )
-        
-        # Перевірка назви в tokenInfo
-        if isinstance(token_info, dict):
-            name = name or token_info.get("name") or token_info.get("tokenName") or ""
-        
-        symbol = symbol.upper()
-        name = name.upper()
-        
-        if "USDT" in symbol or "USDT" in name:
-            return True
-        
-        return False
+        return "USDT" in txn.symbol.upper() or "USDT" in txn.name.upper()
     
     def get_amount_usdt(self, txn):
         """Обчислює суму транзакції в USDT"""
-        try:
-            # Отримуємо суму в різних форматах
-            amount_raw = (
-                txn.get("amount") or 
-                txn.get("quant") or 
-                txn.get("value") or 
-                txn.get("amount_str") or 
-                0
-            )
-            
-            # Конвертуємо в число
-            try:
-                if isinstance(amount_raw, str):
-                    amount_raw = float(amount_raw)
-                else:
-                    amount_raw = float(amount_raw) if amount_raw else 0
-            except:
-                amount_raw = 0
-            
-            if amount_raw <= 0:
-                return 0
-            
-            # USDT TRC20 має 6 десяткових знаків
-            # amount_raw в найменших одиницях (1 USDT = 1,000,000)
-            amount = amount_raw / 1000000
-            
-            return amount
-        except Exception as e:
-            print(f"⚠️  Помилка обчислення суми: {e}")
-            return 0
+        return txn.amount_usdt if txn.amount > 0 else 0
+    
+    def get_channel_id(self, txn):
+        """Канал для платежу: канал адреси зі списку або канал за замовчуванням"""
+        entry = self.watchlist.get(txn.to_address)
+        if entry and entry.channel_id:
+            return entry.channel_id
+        return self.channel_id
     
-    def process_transactions(self, transactions):
-        """Обробляє транзакції та повертає нові"""
+    def get_destinations(self, txn):
+        """Всі чати для платежу: канал адреси (або за замовчуванням) + чати з маршрутизації"""
+        return self.routes.destinations(txn, self.get_amount_usdt(txn), default=[self.get_channel_id(txn)])
+    
+    def process_transactions(self, transactions, watermark=None, source=""):
+        """Обробляє транзакції та повертає нові.
+
+        Якщо передано watermark, транзакції вважаються відсортованими від нових
+        до старих: сканування зупиняється на першій вже переглянутій, а після
+        обробки watermark пересувається на найновіший трансфер.
+        source - провайдер, з якого отримано транзакції (для статистики затримки).
+        """
         new_txns = []
         old_txns_count = 0
+        # (timestamp, hash) переглянутих трансферів для пересування курсора
+        scanned = []
         
-        print(f"\n🔍 Обробка {len(transactions)} транзакцій...")
+        logger.debug("🔍 Обробка %d транзакцій", len(transactions))
+        self.poll_transfers += len(transactions)
         
         for i, txn in enumerate(transactions):
             try:
-                # Отримуємо hash (різні формати)
-                txn_hash = (
-                    txn.get("hash") or 
-                    txn.get("transactionHash") or 
-                    txn.get("transaction_id") or 
-                    txn.get("txID") or 
-                    ""
-                )
-                
+                txn_hash = txn.hash
                 if not txn_hash:
                     if i < 5:  # Логуємо тільки перші 5 для діагностики
-                        print(f"  ⚠️  Транзакція без hash, ключі: {list(txn.keys())[:5]}")
-                    continue
-                
-                # Перевіряємо чи вже оброблена
-                if txn_hash in self.processed_txns:
+                        logger.debug("⚠️  Транзакція без hash: %r", txn)
                     continue
                 
                 # Перевіряємо timestamp транзакції - ігноруємо старі транзакції
-                txn_timestamp = (
-                    txn.get("timestamp") or 
-                    txn.get("block_timestamp") or 
-                    txn.get("time") or 
-                    0
-                )
+                txn_timestamp = txn.timestamp
                 
-                try:
-                    txn_timestamp = float(txn_timestamp)
-                    # Якщо транзакція старіша за час запуску бота - ігноруємо її
-                    if txn_timestamp > 0 and txn_timestamp < self.bot_start_time:
-                        # Автоматично додаємо стару транзакцію в processed_txns
-                        self.processed_txns.add(txn_hash)
-                        old_txns_count += 1
-                        if old_txns_count <= 3:  # Логуємо перші 3 для інформації
-                            txn_date = self.format_timestamp(txn_timestamp)
-                            print(f"  ⏭️  Ігноруємо стару транзакцію: {txn_hash[:16]}... ({txn_date})")
-                        continue
-                except (ValueError, TypeError):
-                    # Якщо не вдалося отримати timestamp, продовжуємо обробку
-                    pass
+                # Порівнюємо з курсором: все, що далі на сторінці, вже переглянуто
+                if watermark is not None:
+                    if txn_timestamp > 0:
+                        if watermark.is_older(txn_timestamp):
+                            break
+                        if watermark.is_seen(txn_timestamp, txn_hash):
+                            continue
+                        scanned.append((txn_timestamp, txn_hash))
                 
-                # Отримуємо адресу отримувача (різні формати)
-                to_addr = (
-                    txn.get("toAddress") or 
-                    txn.get("transferToAddress") or 
-                    txn.get("to") or 
-                    txn.get("to_address") or 
-                    ""
-                )
+                # Якщо транзакція старіша за час запуску бота - ігноруємо її
+                # (за timestamp, тому в processed_txns її не додаємо)
+                if txn_timestamp > 0 and txn_timestamp < self.bot_start_time:
+                    old_txns_count += 1
+                    if old_txns_count <= 3:  # Логуємо перші 3 для інформації
+                        logger.debug("⏭️  Ігноруємо стару транзакцію: %.16s... (%s)", txn_hash, txn_timestamp)
+                    continue
+                
+                # Перевіряємо чи вже оброблена
+                if self.processed_txns.seen(txn_hash, txn_timestamp):
+                    continue
                 
-                # Для Tronscan API може бути toAddressList
-                if not to_addr and "toAddressList" in txn:
-                    to_address_list = txn.get("toAddressList", [])
-                    if isinstance(to_address_list, list) and len(to_address_list) > 0:
-                        to_addr = to_address_list[0]
+                to_addr = txn.to_address
                 
-                if to_addr:
-                    to_addr = to_addr.upper()
-                else:
+                if not to_addr:
                     if i < 5:
-                        print(f"  ⚠️  Транзакція {txn_hash[:16]}... без адреси отримувача")
+                        logger.debug("⚠️  Транзакція %.16s... без адреси отримувача", txn_hash)
                     continue
                 
-                # Перевіряємо чи на нашу адресу
-                if to_addr != self.tron_address:
+                # Перевіряємо чи на одну з наших адрес (O(1) пошук в індексі)
+                if to_addr not in self.watchlist:
                     continue
                 
                 # Перевіряємо чи це USDT
                 if not self.is_usdt(txn):
                     if i < 5:
-                        symbol = txn.get("tokenSymbol") or txn.get("token_symbol") or "N/A"
-                        contract = txn.get("contractAddress") or txn.get("contract_address") or "N/A"
-                        print(f"  ⚠️  Не USDT: {txn_hash[:16]}... symbol={symbol}, contract={contract[:20]}...")
+                        logger.debug("⚠️  Не USDT: %.16s... symbol=%s, contract=%s", txn_hash, txn.symbol, txn.contract)
                     continue
                 
                 # Обчислюємо суму
@@ -522,74 +854,38 @@ class PaymentMonitor:
                 
                 # Перевіряємо суму >= 1 USDT
                 if amount_usdt < 1.0:
-                    print(f"  ⚠️  Пропущено: {txn_hash[:16]}... сума {amount_usdt:.2f} USDT < 1 USDT")
-                    # Позначаємо як оброблену
-                    self.processed_txns.add(txn_hash)
+                    logger.debug("⚠️  Пропущено: %.16s... сума %.2f USDT < 1 USDT", txn_hash, amount_usdt)
+                    # Позначаємо як оброблену (лише в пам'яті, в журнал не пишемо)
+                    self.processed_txns.add(txn_hash, txn_timestamp, journal=False)
                     continue
                 
                 # Знайдено нову транзакцію!
-                print(f"  ✅ Нова транзакція: {txn_hash[:16]}... сума {amount_usdt:.2f} USDT")
+                logger.info("✅ Нова транзакція: %.16s... сума %.2f USDT", txn_hash, amount_usdt)
                 new_txns.append(txn)
-                self.processed_txns.add(txn_hash)
+                self.processed_txns.add(txn_hash, txn_timestamp)
+                self.txn_sources[txn_hash] = source
             except Exception as e:
-                print(f"  ❌ Помилка обробки транзакції: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Помилка обробки транзакції: %s", e)
                 continue
         
+        if watermark is not None:
+            for txn_timestamp, txn_hash in scanned:
+                if watermark.advance(txn_timestamp, txn_hash):
+                    self.state_dirty = True
+        
         if old_txns_count > 0:
-            print(f"⏭️  Проігноровано {old_txns_count} старих транзакцій (до запуску бота)")
-        print(f"📊 Знайдено {len(new_txns)} нових транзакцій >= 1 USDT\n")
+            logger.debug("⏭️  Проігноровано %d старих транзакцій (до запуску бота)", old_txns_count)
+        logger.debug("📊 Знайдено %d нових транзакцій >= 1 USDT", len(new_txns))
         return new_txns
     
     def format_message(self, txn):
         """Форматує повідомлення про транзакцію"""
         try:
-            # Отримуємо дані (підтримка різних форматів)
-            txn_hash = (
-                txn.get("hash") or 
-                txn.get("transactionHash") or 
-                txn.get("transaction_id") or 
-                txn.get("txID") or 
-                ""
-            )
-            
+            txn_hash = txn.hash
             amount_usdt = self.get_amount_usdt(txn)
-            
-            from_addr = (
-                txn.get("fromAddress") or 
-                txn.get("transferFromAddress") or 
-                txn.get("from") or 
-                txn.get("from_address") or 
-                txn.get("ownerAddress") or  # Формат Tronscan API
-                "Невідомо"
-            )
-            
-            to_addr = (
-                txn.get("toAddress") or 
-                txn.get("transferToAddress") or 
-                txn.get("to") or 
-                txn.get("to_address") or 
-                ""
-            )
-            
-            # Для Tronscan API може бути toAddressList
-            if not to_addr and "toAddressList" in txn:
-                to_address_list = txn.get("toAddressList", [])
-                if isinstance(to_address_list, list) and len(to_address_list) > 0:
-                    to_addr = to_address_list[0]
-            
-            if not to_addr:
-                to_addr = self.tron_address
-            
-            timestamp = (
-                txn.get("timestamp") or 
-                txn.get("block_timestamp") or 
-                txn.get("time") or 
-                0
-            )
-            
-            date_str = self.format_timestamp(timestamp)
+            from_addr = txn.from_address or "Невідомо"
+            to_addr = txn.to_address or self.tron_address
+            date_str = self.format_timestamp(txn.timestamp)
             
             # Формуємо повідомлення
             message = f"💰 <b>Нова оплата отримана!</b>\n\n"
@@ -603,152 +899,343 @@ class PaymentMonitor:
             
             return message
         except Exception as e:
-            print(f"⚠️  Помилка форматування: {e}")
+            logger.error("⚠️  Помилка форматування: %s", e)
             return None
     
-    async def send_message(self, text):
+    def format_digest(self, txns):
+        """Одне повідомлення про кілька платежів (коли черга відправки накопичилась)"""
+        total = sum(self.get_amount_usdt(txn) for txn in txns)
+        message = f"💰 <b>Нові оплати: {len(txns)}</b>\n"
+        message += f"📊 <b>Разом:</b> {total:.2f} USDT\n\n"
+        for txn in txns:
+            line = f"• <b>{self.get_amount_usdt(txn):.2f} USDT</b> з <code>{txn.from_address or 'Невідомо'}</code>"
+            if len(self.watchlist) > 1:
+                line += f" на <code>{txn.to_address}</code>"
+            line += f" ({self.format_timestamp(txn.timestamp)})"
+            if txn.hash:
+                line += f" <a href='https://tronscan.org/#/transaction/{txn.hash}'>🔗</a>"
+            message += line + "\n"
+        return message
+    
+    async def deliver(self, text, chat_id):
+        """Відправка з черги: RetryAfter та інші помилки обробляє Notifier"""
+        started = time.monotonic()
+        result = "error"
+        try:
+            await self.bot.send_message(
+                chat_id=chat_id,
+                text=text,
+                parse_mode="HTML",
+                disable_web_page_preview=False
+            )
+            result = "ok"
+        finally:
+            self.send_duration.observe(time.monotonic() - started, result=result)
+    
+    async def send_message(self, text, chat_id=None):
         """Відправляє повідомлення в канал"""
+        chat_id = chat_id or self.channel_id
         try:
-            if not self.channel_id:
-                print("⚠️  Channel ID не встановлено!")
+            if not chat_id:
+                logger.warning("⚠️  Channel ID не встановлено!")
                 return False
             
             await self.bot.send_message(
-                chat_id=self.channel_id,
+                chat_id=chat_id,
                 text=text,
                 parse_mode="HTML",
                 disable_web_page_preview=False
             )
             return True
         except TelegramError as e:
-            print(f"❌ Помилка відправки: {e}")
+            logger.error("❌ Помилка відправки: %s", e)
             return False
     
+    async def backfill_gap(self, entry, watermark):
+        """Дозавантажує пропуск між курсором і найстарішою отриманою сторінкою"""
+        start, end = watermark.gap
+        logger.info("⏪ Дозавантаження пропуску %s: %s - %s", entry.address, self.format_timestamp(start), self.format_timestamp(end))
+        transactions = await self.get_transactions(entry.address, since=start, until=end)
+        if transactions is None:
+            return []
+        
+        # Пропуск старіший за курсор, тому дублікати відсікаються лише через processed_txns
+        new_txns = self.process_transactions(transactions, source=transactions.source)
+        if transactions.truncated and transactions.oldest_timestamp:
+            watermark.gap = (start, transactions.oldest_timestamp)
+        else:
+            watermark.gap = None
+            logger.info("✅ Пропуск %s заповнено", entry.address)
+        watermark.dirty = True
+        self.state_dirty = True
+        return new_txns
+    
+    async def check_address(self, entry):
+        """Отримує та обробляє транзакції однієї адреси, повертає нові платежі
+        або None, якщо жоден провайдер не віддав транзакції"""
+        watermark = self.watermarks.setdefault(entry.key, Watermark(int(time.time() * 1000)))
+        since = watermark.timestamp
+        transactions = await self.get_transactions(entry.address, since=since)
+        
+        if transactions is None:
+            logger.warning("⚠️  Транзакції не отримано (%s)", entry.address)
+            return None
+        
+        new_txns = []
+        if transactions:
+            self.latest_transfers[entry.key] = transactions[0]
+            if transactions.backfilled:
+                logger.info("⏪ %s: дозавантажено %d сторінок (%d трансферів)", entry.address, transactions.pages, len(transactions))
+            new_txns = self.process_transactions(transactions, watermark, transactions.source)
+            # Не дійшли до курсора - запам'ятовуємо пропуск для наступних перевірок
+            if transactions.truncated and transactions.oldest_timestamp:
+                watermark.add_gap(since, transactions.oldest_timestamp)
+                self.state_dirty = True
+                logger.warning("⚠️  %s: пропуск до %s буде дозавантажено", entry.address, self.format_timestamp(transactions.oldest_timestamp))
+        
+        if watermark.gap:
+            new_txns.extend(await self.backfill_gap(entry, watermark))
+        
+        return new_txns
+    
     async def check_payments(self):
-        """Перевіряє нові платежі"""
-        print(f"\n{'='*60}")
-        print(f"🔍 Перевірка платежів - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*60}")
+        """Перевіряє нові платежі, повертає їх кількість.
+        Підсумок перевірки - в self.last_poll (для рядка логу з основного циклу)"""
+        started = time.monotonic()
+        self.poll_transfers = 0
         
-        # Отримуємо транзакції
-        transactions = self.get_transactions()
+        # Перевіряємо всі адреси в межах бюджету запитів
+        entries = list(self.watchlist)
+        results = await self.scheduler.run(entries, self.check_address)
         
-        if not transactions:
-            print("⚠️  Транзакції не отримано")
-            return
+        new_txns = []
+        # Адреси з винятком або без відповіді провайдерів
+        errors = 0
+        for entry, result in zip(entries, results):
+            if isinstance(result, Exception):
+                logger.error("❌ Помилка перевірки %s: %s", entry.address, result)
+            if isinstance(result, Exception) or result is None:
+                errors += 1
+                continue
+            new_txns.extend(result)
         
-        # Обробляємо транзакції
-        new_txns = self.process_transactions(transactions)
+        # Поточний рейтинг endpoint'ів для provider_stats.py
+        self.providers.save(self.provider_stats_file)
+        
+        # Хеші, що вийшли за горизонт від курсорів, більше не тримаємо в пам'яті
+        self.processed_txns.evict(self.dedup_reference())
         
         if new_txns:
-            print(f"✅ Відправка {len(new_txns)} повідомлень...\n")
-            
-            for txn in new_txns:
-                message = self.format_message(txn)
-                if message:
-                    success = await self.send_message(message)
-                    if success:
-                        print(f"✅ Повідомлення відправлено")
-                    await asyncio.sleep(1)
-            
-            # Зберігаємо оброблені транзакції
-            self.save_processed_txns()
+            self.dispatch(new_txns)
         else:
-            print("ℹ️  Нових платежів не знайдено")
+            # Зберігаємо курсори та стани outbox, якщо вони змінилися
+            if self.state_dirty:
+                self.save_processed_txns()
+            self.resume_outbox()
+        
+        # Успішна перевірка - хоча б одну адресу справді отримано від провайдера
+        if errors < len(entries):
+            self.last_poll_success = time.time()
+        self.poll_errors.inc(errors)
+        self.poll_duration.observe(time.monotonic() - started)
+        self.poll_transfers_hist.observe(self.poll_transfers)
+        self.payments_detected.inc(len(new_txns), source="poll")
+        
+        stats = self.processed_txns.stats()
+        self.last_poll = {
+            "addresses": len(entries),
+            "errors": errors,
+            "transfers": self.poll_transfers,
+            "new": len(new_txns),
+            "duration_ms": round((time.monotonic() - started) * 1000),
+            "dedup_size": stats["size"],
+            "dedup_evictions": stats["evictions"],
+            "journal_lookups": stats["journal_lookups"],
+            "cache_hits": self.response_cache.hits + self.response_cache.coalesced,
+            "keys_parked": sum(key.parked() for key in self.key_pool.all()),
+            "queued": self.notifier.pending(),
+            "latency_p95": self.latency.overall.summary()["p95"],
+        }
+        return len(new_txns)
+    
+    def dispatch(self, new_txns):
+        """Записує нові платежі в outbox і передає їх на відправку"""
+        # Платежі спершу пишуться в outbox разом з хешами та курсорами
+        # (одна транзакція БД), а відправляються вже з нього.
+        # Час виявлення і провайдер зберігаються разом з платежем - для
+        # заміру затримки навіть після перезапуску
+        detected_at = round(time.time(), 3)
+        for txn in new_txns:
+            source = self.txn_sources.pop(txn.hash, "")
+            destinations = self.get_destinations(txn)
+            if not destinations:
+                logger.warning("⚠️  Channel ID не встановлено!")
+                continue
+            payload = {**txn.to_dict(), "detected_at": detected_at, "source": source}
+            # Окремий запис на кожен чат - кожен відправляється своїм воркером
+            for chat_id in destinations:
+                self.ledger.outbox_add(txn.hash, chat_id, payload)
+        
+        # Зберігаємо оброблені транзакції
+        self.save_processed_txns()
+        self.resume_outbox()
+    
+    async def handle_push(self, transfers):
+        """Трансфери з push-подій: той самий конвеєр, що й для опитування.
+        Тіло запиту не є доказом платежу, тому з PUSH_VERIFY в обробку йдуть записи
+        провайдера з тими самими хешами (підтвердження - у фоні).
+        Дублікати з наступним опитуванням відсікаються через processed_txns."""
+        relevant = [txn for txn in transfers if txn.to_address in self.watchlist]
+        logger.info("📥 Push: отримано %d трансферів, на наші адреси: %d", len(transfers), len(relevant))
+        if not relevant:
+            return 0
+        if not config.PUSH_VERIFY:
+            self.process_push(relevant)
+            return len(relevant)
+        task = asyncio.create_task(self.confirm_push(relevant))
+        self.push_checks.add(task)
+        task.add_done_callback(self.push_checks.discard)
+        return len(relevant)
+    
+    def process_push(self, transfers):
+        transfers.sort(key=lambda txn: txn.timestamp, reverse=True)
+        new_txns = self.process_transactions(transfers, source="push")
+        self.payments_detected.inc(len(new_txns), source="push")
+        if new_txns:
+            self.dispatch(new_txns)
+        return len(new_txns)
+    
+    async def confirm_push(self, transfers):
+        """Чекає (не довше PUSH_VERIFY_TIMEOUT), поки провайдер побачить транзакції
+        з push-подій, і обробляє його записи. Непідтверджені лишаються звірці"""
+        pending = {txn.hash: txn for txn in transfers}
+        deadline = time.monotonic() + config.PUSH_VERIFY_TIMEOUT
+        while True:
+            by_address = {}
+            for txn in pending.values():
+                by_address.setdefault(self.watchlist.get(txn.to_address).address, []).append(txn)
+            for address, txns in by_address.items():
+                earliest = min((txn.timestamp for txn in txns if txn.timestamp > 0), default=0)
+                since = (earliest or int(time.time() * 1000)) - 60 * 1000
+                result = await self.get_transactions(address, since=since)
+                confirmed = [txn for txn in result or () if txn.hash in pending]
+                for txn in confirmed:
+                    del pending[txn.hash]
+                if confirmed:
+                    self.process_push(confirmed)
+            if not pending or time.monotonic() >= deadline:
+                break
+            # Повтор - після того, як закешована відповідь застаріє
+            await asyncio.sleep(max(5.0, self.response_cache.ttl))
+        if pending:
+            logger.warning(
+                "⚠️  Push: провайдер не підтвердив %d трансферів (%s), їх перевірить звірка",
+                len(pending), ", ".join(list(pending)[:3])
+            )
+    
+    def resume_outbox(self):
+        """Передає на відправку всі невідправлені повідомлення outbox (нові,
+        залишені після перезапуску, та ті, що не вдалося відправити раніше)"""
+        if self.outbox_paused:
+            return
+        queued = 0
+        for tx_hash, chat_id, payload in self.ledger.outbox_pending():
+            key = (tx_hash, chat_id)
+            if key in self.outbox_inflight:
+                continue
+            self.outbox_inflight.add(key)
+            detected_at = payload.pop("detected_at", None) or time.time()
+            source = payload.pop("source", "")
+            txn = Transfer(**payload)
+            self.latency.track(key, txn.timestamp, detected_at, txn.to_address, source)
+            self.notifier.enqueue(chat_id, txn)
+            queued += 1
+        if queued:
+            # Відправка йде у фоні в межах лімітів Telegram, перевірки не чекають на неї
+            logger.info("📨 В черзі на відправку: %d платежів", self.notifier.pending())
+    
+    def on_delivery_result(self, chat_id, txns, state, error=None):
+        """Записує результат відправки в outbox (збережеться разом з наступним commit)"""
+        for txn in txns:
+            key = (txn.hash, str(chat_id))
+            self.ledger.outbox_update(txn.hash, chat_id, state, error)
+            if state == OUTBOX_PENDING:
+                # Залишається в outbox - буде повторено на наступній перевірці
+                self.outbox_inflight.discard(key)
+            else:
+                self.outbox_settled.append(key)
+            if state == OUTBOX_SENT:
+                self.record_latency(key)
+            elif state == OUTBOX_FAILED:
+                self.latency.discard(key)
+        self.state_dirty = True
+        self.check_latency_slo()
+    
+    def record_latency(self, key):
+        """Затримка відправленого платежу: від block_timestamp до відповіді Telegram"""
+        result = self.latency.complete(key)
+        if result is None:
+            return
+        latency, provider = result
+        self.payment_latency.observe(latency, provider=provider)
+        logger.debug("⏱️  Затримка платежу %.16s...: %.1f с (%s)", key[0], latency, provider)
+    
+    def check_latency_slo(self):
+        """Попередження, якщо p95 затримки перевищив LATENCY_SLO"""
+        for scope, name, p95 in self.latency.check_slo():
+            logger.warning(
+                "🐢 p95 затримки платежів %.0f с > SLO %s с (%s: %s)", p95, config.LATENCY_SLO, scope, name,
+                extra={"fields": {"scope": scope, "name": name, "p95": round(p95, 1), "slo": config.LATENCY_SLO}}
+            )
+            if config.LATENCY_ALERT_CHAT:
+                text = (
+                    f"🐢 <b>Затримка сповіщень</b>\n\n"
+                    f"p95: {p95:.0f} с (SLO {config.LATENCY_SLO} с)\n"
+                    f"{scope}: <code>{name}</code>"
+                )
+                task = asyncio.create_task(self.send_message(text, config.LATENCY_ALERT_CHAT))
+                self.alert_tasks.add(task)
+                task.add_done_callback(self.alert_sent)
+    
+    def alert_sent(self, task):
+        self.alert_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("❌ Не вдалося відправити попередження про затримку: %s", task.exception())
     
     def show_last_transaction(self):
-        """Показує останню транзакцію для перевірки"""
+        """Показує останню транзакцію основної адреси з першої перевірки (SHOW_LAST_TRANSACTION)"""
         print("\n" + "="*60)
         print("🔍 ТЕСТОВА ПЕРЕВІРКА: Остання транзакція")
         print("="*60)
         
-        transactions = self.get_transactions()
-        
-        if not transactions or len(transactions) == 0:
-            print("⚠️  Транзакції не отримано")
+        # Окремого запиту немає: перша перевірка запитує трансфери після курсора
+        last_txn = self.latest_transfers.get(self.tron_address)
+        if last_txn is None:
+            print("⚠️  Нових трансферів після курсора немає")
             print("="*60 + "\n")
             return
         
-        # Беремо першу (останню) транзакцію
-        last_txn = transactions[0]
-        
-        txn_hash = (
-            last_txn.get("hash") or 
-            last_txn.get("transactionHash") or 
-            last_txn.get("txID") or 
-            "N/A"
-        )
-        
-        to_addr = (
-            last_txn.get("toAddress") or 
-            last_txn.get("transferToAddress") or 
-            last_txn.get("to") or 
-            last_txn.get("to_address") or 
-            "N/A"
-        )
-        
-        from_addr = (
-            last_txn.get("fromAddress") or 
-            last_txn.get("transferFromAddress") or 
-            last_txn.get("from") or 
-            last_txn.get("from_address") or 
-            "N/A"
-        )
-        
-        amount_raw = (
-            last_txn.get("amount") or 
-            last_txn.get("quant") or 
-            last_txn.get("value") or 
-            last_txn.get("amount_str") or 
-            0
-        )
-        
-        token_symbol = (
-            last_txn.get("tokenSymbol") or 
-            last_txn.get("token_symbol") or 
-            last_txn.get("symbol") or 
-            "N/A"
-        )
-        
-        token_name = (
-            last_txn.get("tokenName") or 
-            last_txn.get("token_name") or 
-            last_txn.get("name") or 
-            "N/A"
-        )
-        
-        contract = (
-            last_txn.get("contractAddress") or 
-            last_txn.get("contract_address") or 
-            last_txn.get("tokenContractAddress") or 
-            "N/A"
-        )
-        
-        timestamp = (
-            last_txn.get("timestamp") or 
-            last_txn.get("block_timestamp") or 
-            last_txn.get("time") or 
-            0
-        )
+        txn_hash = last_txn.hash or "N/A"
+        to_addr = last_txn.to_address or "N/A"
         
         # Обчислюємо суму в USDT
         amount_usdt = self.get_amount_usdt(last_txn)
         is_usdt_txn = self.is_usdt(last_txn)
         
         # Форматуємо дату
-        date_str = self.format_timestamp(timestamp)
+        date_str = self.format_timestamp(last_txn.timestamp)
         
         print(f"📋 Hash: {txn_hash}")
         print(f"📥 To: {to_addr}")
-        print(f"📤 From: {from_addr}")
-        print(f"💰 Amount (raw): {amount_raw}")
+        print(f"📤 From: {last_txn.from_address or 'N/A'}")
+        print(f"💰 Amount (raw): {last_txn.amount}")
         print(f"💰 Amount (USDT): {amount_usdt:.6f} USDT")
-        print(f"🪙 Token: {token_name} ({token_symbol})")
-        print(f"📄 Contract: {contract}")
-        print(f"🕐 Timestamp: {timestamp}")
+        print(f"🪙 Token: {last_txn.name or 'N/A'} ({last_txn.symbol or 'N/A'})")
+        print(f"📄 Contract: {last_txn.contract or 'N/A'}")
+        print(f"🕐 Timestamp: {last_txn.timestamp}")
         print(f"📅 Date: {date_str}")
         print(f"✅ Is USDT: {is_usdt_txn}")
-        print(f"✅ To our address: {to_addr.upper() == self.tron_address}")
+        print(f"✅ To our address: {to_addr in self.watchlist}")
         print(f"✅ Amount >= 1 USDT: {amount_usdt >= 1.0}")
         print(f"✅ Already processed: {txn_hash in self.processed_txns}")
         
@@ -763,85 +1250,198 @@ class PaymentMonitor:
         print("🚀 Бот запущено!")
         print("="*60)
         print(f"📍 Адреса: {self.tron_address}")
-        print(f"⏱️  Інтервал: {config.CHECK_INTERVAL} сек")
-        print(f"📝 Оброблено: {len(self.processed_txns)} транзакцій")
+        if len(self.watchlist) > 1:
+            print(f"📋 Адрес у списку: {len(self.watchlist)}")
+        if len(self.routes):
+            print(f"🔀 Правил маршрутизації: {len(self.routes)}")
+        print(f"⏱️  Інтервал: {self.check_interval} сек" + (" (звірка, основне джерело - push)" if config.PUSH_ENABLED else ""))
+        if config.POLL_ADAPTIVE:
+            print(f"⏱️  Адаптивний інтервал: {self.poll.min_interval}-{self.poll.max_interval} сек, бюджет {self.poll.budget or '∞'} запитів/хв")
+        print(f"📝 Оброблено: {len(self.ledger)} транзакцій (в пам'яті: {len(self.processed_txns)})")
+        outbox_pending = self.ledger.outbox_counts().get(OUTBOX_PENDING, 0)
+        if outbox_pending:
+            print(f"📨 Невідправлених повідомлень: {outbox_pending} (будуть відправлені)")
         print("="*60)
         
-        # Перевірка бота
-        try:
-            bot_info = await self.bot.get_me()
-            print(f"🤖 Бот: @{bot_info.username}\n")
-        except Exception as e:
-            print(f"❌ Помилка бота: {e}\n")
-            return
-        
-        # Перевірка каналу
-        if self.channel_id:
-            try:
-                chat = await self.bot.get_chat(chat_id=self.channel_id)
-                print(f"📢 Канал: {chat.title}")
-                print(f"✅ Доступ підтверджено\n")
-            except Exception as e:
-                print(f"⚠️  Помилка каналу: {e}\n")
+        # Курсори опитування замінюють первинне заповнення processed_txns:
+        # все, що раніше курсора (часу запуску для нових адрес), не запитується
+        if self.is_first_run:
+            self.save_processed_txns()
+            print(f"💾 Збережено час запуску бота для майбутніх перевірок\n")
         
-        # При першому запуску автоматично додаємо всі існуючі транзакції в processed_txns
-        # Перевіряємо чи це перший запуск (файл не існує або bot_start_time щойно встановлений)
-        is_first_run = not os.path.exists(self.processed_txns_file) or len(self.processed_txns) == 0
+        # Push-події обробляються паралельно з циклом опитування
+        if config.PUSH_ENABLED:
+            self.push = PushReceiver(
+                self.handle_push,
+                host=config.PUSH_HOST,
+                port=config.PUSH_PORT,
+                path=config.PUSH_PATH,
+                secret=config.PUSH_SECRET,
+                expect=self.expect_payment
+            )
+            await self.push.start()
+        if config.METRICS_ENABLED:
+            await self.start_metrics()
         
-        if is_first_run:
-            print("🔄 Перший запуск: обробка існуючих транзакцій...")
-            print("   (Всі транзакції до цього моменту будуть ігноруватися)\n")
-            
-            # Отримуємо всі транзакції
-            existing_transactions = self.get_transactions()
-            if existing_transactions:
-                print(f"📥 Знайдено {len(existing_transactions)} існуючих транзакцій")
-                added_count = 0
-                # Обробляємо їх, щоб додати в processed_txns (але не відправляємо повідомлення)
-                for txn in existing_transactions:
-                    txn_hash = (
-                        txn.get("hash") or 
-                        txn.get("transactionHash") or 
-                        txn.get("transaction_id") or 
-                        txn.get("txID") or 
-                        ""
-                    )
-                    if txn_hash:
-                        self.processed_txns.add(txn_hash)
-                        added_count += 1
-                
-                # Зберігаємо оброблені транзакції та bot_start_time
-                self.save_processed_txns()
-                print(f"✅ Додано {added_count} існуючих транзакцій в список оброблених")
-                print(f"💾 Збережено час запуску бота для майбутніх перевірок\n")
+        # Перевірки бота і каналів (основний + канали окремих адрес + маршрутизація)
+        # незалежні від першої перевірки платежів - все за один раунд запитів.
+        # Знайдені платежі відправляються лише після перевірки токена, інакше
+        # з невірним токеном вони були б позначені як невідправні
+        self.outbox_paused = True
+        channels = ({self.channel_id} if self.channel_id else set()) | self.watchlist.channels() | self.routes.chats()
+        bot_ok, _, (new_count, requests) = await asyncio.gather(
+            self.check_bot(),
+            asyncio.gather(*(self.check_channel(channel_id) for channel_id in channels)),
+            self.poll_once()
+        )
+        if not bot_ok:
+            return
         
-        # ТЕСТОВА ПЕРЕВІРКА: показуємо останню транзакцію
-        self.show_last_transaction()
+        if config.SHOW_LAST_TRANSACTION:
+            self.show_last_transaction()
         
         # Відправляємо повідомлення про запуск
         startup_msg = (
             f"✅ <b>Бот запущено!</b>\n\n"
             f"📍 <b>Адреса:</b> <code>{self.tron_address}</code>\n"
-            f"⏱️  <b>Інтервал:</b> {config.CHECK_INTERVAL} сек\n"
+            + (f"📋 <b>Адрес у списку:</b> {len(self.watchlist)}\n" if len(self.watchlist) > 1 else "")
+            + f"⏱️  <b>Інтервал:</b> {self.check_interval} сек\n"
             f"🕐 <b>Час:</b> {datetime.now(timezone(timedelta(hours=2))).strftime('%Y-%m-%d %H:%M:%S')}\n"
             f"🔗 <a href='https://tronscan.org/#/address/{self.tron_address}/transfers'>Переглянути транзакції</a>"
         )
         await self.send_message(startup_msg)
+        self.outbox_paused = False
+        self.resume_outbox()
         
-        # Основний цикл
+        # Основний цикл (перша перевірка вже виконана)
         while True:
+            self.poll.record_poll(new_count, requests)
+            interval = self.poll.next_interval()
+            # Один компактний рядок на перевірку (в JSON форматі - один JSON об'єкт)
+            logger.info("poll", extra={"fields": {
+                **self.last_poll,
+                "requests": requests,
+                "next_interval": interval,
+                "reason": self.poll.reason,
+            }})
+            self.wake.clear()
             try:
-                await self.check_payments()
-            except Exception as e:
-                print(f"❌ Помилка: {e}")
-                import traceback
-                traceback.print_exc()
-            
-            await asyncio.sleep(config.CHECK_INTERVAL)
+                await asyncio.wait_for(self.wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            new_count, requests = await self.poll_once()
+    
+    async def check_bot(self):
+        """Перевіряє токен бота; False - працювати далі немає сенсу"""
+        try:
+            bot_info = await self.bot.get_me()
+            print(f"🤖 Бот: @{bot_info.username}\n")
+        except (InvalidToken, Forbidden) as e:
+            print(f"❌ Помилка бота: {e}\n")
+            return False
+        except Exception as e:
+            # Тимчасова помилка (мережа, 429) - не причина зупиняти моніторинг
+            print(f"⚠️  Бот недоступний: {e}\n")
+        return True
+    
+    async def check_channel(self, channel_id):
+        try:
+            chat = await self.bot.get_chat(chat_id=channel_id)
+            print(f"📢 Канал: {chat.title}")
+            print(f"✅ Доступ підтверджено\n")
+        except Exception as e:
+            print(f"⚠️  Помилка каналу {channel_id}: {e}\n")
+    
+    async def poll_once(self):
+        """Одна перевірка платежів, повертає (нових платежів, запитів до API)"""
+        requests_before = self.scheduler.requests
+        new_count = 0
+        try:
+            new_count = await self.check_payments()
+        except Exception as e:
+            logger.exception("❌ Помилка: %s", e)
+        return new_count, self.scheduler.requests - requests_before
+    
+    async def start_metrics(self):
+        """GET /metrics: на сервері push-подій, якщо порт той самий, інакше окремий сервер"""
+        if self.push is not None and self.push.server.port == config.METRICS_PORT:
+            server = self.push.server
+        else:
+            server = self.metrics_server = HttpServer(config.PUSH_HOST, config.METRICS_PORT)
+            await server.start()
+        server.route("GET", config.METRICS_PATH, self.metrics.handle)
+        print(f"📈 Метрики: http://{server.host}:{server.port}{config.METRICS_PATH}")
+    
+    def expect_payment(self, seconds):
+        """Очікується платіж: частіші перевірки протягом seconds секунд, починаючи з негайної"""
+        self.poll.expect(seconds)
+        logger.info("🧾 Очікується платіж - частіші перевірки %d с", seconds)
+        self.wake.set()
+
+    async def close(self):
+        """Досилає чергу повідомлень, закриває HTTP з'єднання та журнал"""
+        if self.push is not None:
+            await self.push.close()
+        for task in self.push_checks:
+            task.cancel()
+        if self.alert_tasks:
+            await asyncio.wait(self.alert_tasks, timeout=config.TELEGRAM_READ_TIMEOUT)
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        await self.notifier.close()
+        await self.http.close()
+        self.ledger.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Моніторинг платежів USDT TRC20 з повідомленнями в Telegram")
+    parser.add_argument("--fake-server", metavar="URL",
+                        help="використовувати fake_server.py замість TronGrid / Tronscan / Telegram")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="відтворити історію трансферів з JSONL файлу (без мережі, див. replay.py)")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="швидкість відтворення: 0 - максимальна, N - у N разів швидше реального часу")
+    parser.add_argument("--sink", default="null",
+                        help="куди писати повідомлення при відтворенні: null, файл JSONL або - (stdout)")
+    parser.add_argument("--batch-interval", type=float, default=config.CHECK_INTERVAL,
+                        help="секунд історії на одну перевірку при відтворенні")
+    return parser.parse_args()
+
+async def run_replay(args):
+    """Відтворення історії: тимчасовий журнал, повідомлення - в sink замість Telegram"""
+    # Журнал і курсори робочого бота не змінюються
+    config.LEDGER_FILE = ":memory:"
+    # Без окремого рядка логу на кожен платіж (якщо LOG_LEVEL не задано явно)
+    if not os.getenv("LOG_LEVEL"):
+        config.LOG_LEVEL = "WARNING"
+    # Вся історія з файлу вважається новою (а не "до запуску бота")
+    monitor = PaymentMonitor(start_time=0)
+    monitor.processed_txns = DedupCache(config.DEDUP_HORIZON * 1000, journal=monitor.ledger)
+    
+    sink = open_sink(args.sink)
+    replayer = Replayer(monitor, sink, speed=args.speed, batch_interval=args.batch_interval)
+    print(f"⏯️  Відтворення {args.replay} (швидкість: {args.speed or 'максимальна'})")
+    try:
+        elapsed = await replayer.run(read_transfers(args.replay))
+    finally:
+        sink.close()
+        await monitor.close()
+    summary = replayer.summary(elapsed)
+    print(f"✅ Трансферів: {summary['transfers']}, перевірок: {summary['batches']}, "
+          f"платежів: {summary['payments']}, повідомлень: {summary['messages']}")
+    print(f"⏱️  {summary['seconds']} с ({summary['transfers_per_sec']} трансферів/с)")
 
 async def main():
+    args = parse_args()
+    if args.replay:
+        await run_replay(args)
+        return
+    if args.fake_server:
+        config.TRONGRID_URL = config.TRONSCAN_URL = config.TELEGRAM_API_URL = args.fake_server
     monitor = PaymentMonitor()
-    await monitor.start()
+    try:
+        await monitor.start()
+    finally:
+        await monitor.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
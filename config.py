@@ -9,8 +9,104 @@ TELEGRAM_CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID", "@payment_trc20_001")  #
 
 # Tronscan API Configuration
 TRONSCAN_API_TOKEN = os.getenv("TRONSCAN_API_TOKEN", "3bfa787b-22a1-4c79-a2f5-b46dc062ee9f")
+TRONSCAN_API_KEYS = os.getenv("TRONSCAN_API_KEYS", "")  # додаткові ключі Tronscan через кому (разом з TRONSCAN_API_TOKEN)
+TRONGRID_API_KEYS = os.getenv("TRONGRID_API_KEYS", "")  # ключі TronGrid через кому (без ключів - анонімні ліміти)
 TRON_ADDRESS = os.getenv("TRON_ADDRESS", "TCKV8GCJcEzQWYi8c3yFGPvMa1UkUDYZ57")
 
 # Monitoring Configuration
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "30"))  # секунди між перевірками
+SHOW_LAST_TRANSACTION = os.getenv("SHOW_LAST_TRANSACTION", "false").lower() in ("1", "true", "yes")  # діагностика: останній трансфер після першої перевірки
 
+
+# HTTP Client Configuration
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))  # таймаут на фазу запиту (читання/запис), секунди
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # таймаут підключення, секунди
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "20"))  # загальний час на весь запит, секунди
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))  # максимум з'єднань у пулі
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))  # максимум keep-alive з'єднань
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))  # час життя простою з'єднання, секунди
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "2"))  # скільки секунд повторний такий самий запит береться з кешу (0 - вимкнено)
+
+# Multi-address Configuration
+# Список адрес через кому: ADDRESS[=CHANNEL], канал необов'язковий
+TRON_ADDRESSES = os.getenv("TRON_ADDRESSES", "")
+# Файл зі списком адрес (одна на рядок, формат той самий, '#' - коментар)
+WATCHLIST_FILE = os.getenv("WATCHLIST_FILE", "")
+POLL_RATE_LIMIT = float(os.getenv("POLL_RATE_LIMIT", "5"))  # максимум запитів до провайдерів за секунду
+POLL_CONCURRENCY = int(os.getenv("POLL_CONCURRENCY", "5"))  # скільки адрес перевіряти паралельно
+
+# Pagination Configuration
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))  # записів на сторінку (TronGrid до 200, Tronscan до 50)
+MAX_PAGES = int(os.getenv("MAX_PAGES", "10"))  # максимум сторінок за одну перевірку адреси
+
+# Provider Health Configuration
+PROVIDER_COOLDOWN = float(os.getenv("PROVIDER_COOLDOWN", "30"))  # перший cool-down endpoint'а після помилки, секунди
+PROVIDER_MAX_COOLDOWN = float(os.getenv("PROVIDER_MAX_COOLDOWN", "1800"))  # максимальний cool-down, секунди
+PROVIDER_HOST_RATE = float(os.getenv("PROVIDER_HOST_RATE", "5"))  # максимум запитів без ключа за секунду до одного хоста API (0 - без обмеження)
+PROVIDER_KEY_RATE = float(os.getenv("PROVIDER_KEY_RATE", "5"))  # максимум запитів за секунду з одним API ключем (0 - без обмеження)
+PROVIDER_BREAKER_THRESHOLD = int(os.getenv("PROVIDER_BREAKER_THRESHOLD", "3"))  # 429 / 5xx підряд, після яких запити до хоста призупиняються
+PROVIDER_CROSS_CHECK = int(os.getenv("PROVIDER_CROSS_CHECK", "20"))  # кожна N-та порожня відповідь перевіряється іншим провайдером (0 - ніколи)
+
+# Hedged Requests Configuration
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")  # паралельні страхувальні запити
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "3"))  # максимум очікування перед страхувальним запитом, секунди
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))  # перцентиль затримки endpoint'а як поріг
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "10"))  # мінімум замірів, щоб довіряти перцентилю
+HEDGE_MAX_PARALLEL = int(os.getenv("HEDGE_MAX_PARALLEL", "2"))  # максимум одночасних запитів на одну перевірку
+
+# Storage Configuration
+LEDGER_FILE = os.getenv("LEDGER_FILE", "processed_transactions.db")  # SQLite журнал оброблених транзакцій
+DEDUP_HORIZON = float(os.getenv("DEDUP_HORIZON", "86400"))  # скільки тримати хеші в пам'яті після курсора, секунди
+
+# Telegram Delivery Configuration
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # максимум повідомлень за секунду на бота
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "20"))  # максимум повідомлень за хвилину в один канал / групу
+TELEGRAM_DIGEST_THRESHOLD = int(os.getenv("TELEGRAM_DIGEST_THRESHOLD", "5"))  # з якої довжини черги відправляти дайджест
+TELEGRAM_DIGEST_MAX = int(os.getenv("TELEGRAM_DIGEST_MAX", "20"))  # максимум платежів в одному дайджесті
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "8"))  # з'єднань до Telegram API (паралельна відправка в різні чати)
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "5"))  # таймаут з'єднання з Telegram, секунди
+TELEGRAM_READ_TIMEOUT = float(os.getenv("TELEGRAM_READ_TIMEOUT", "10"))  # таймаут відповіді Telegram, секунди
+
+# Routing Configuration
+# JSON список правил: [{"chats": ["@ops"], "address": "T...", "min_amount": 100, "max_amount": 1000, "token": "USDT"}]
+ROUTES = os.getenv("ROUTES", "")
+ROUTES_FILE = os.getenv("ROUTES_FILE", "")  # файл з правилами в тому ж форматі
+
+# Push Configuration
+PUSH_ENABLED = os.getenv("PUSH_ENABLED", "false").lower() in ("1", "true", "yes")  # приймати push-події про трансфери
+PUSH_HOST = os.getenv("PUSH_HOST", "0.0.0.0")  # адреса HTTP сервера для push-подій
+PUSH_PORT = int(os.getenv("PUSH_PORT", os.getenv("PORT", "8080")))  # порт HTTP сервера (на Railway - PORT)
+PUSH_PATH = os.getenv("PUSH_PATH", "/events")  # шлях для POST запитів з подіями
+PUSH_SECRET = os.getenv("PUSH_SECRET", "")  # токен у заголовку X-Push-Token (порожній - сервер слухає лише 127.0.0.1)
+PUSH_VERIFY = os.getenv("PUSH_VERIFY", "true").lower() in ("1", "true", "yes")  # відправляти push-платіж лише після підтвердження провайдером
+PUSH_VERIFY_TIMEOUT = float(os.getenv("PUSH_VERIFY_TIMEOUT", "60"))  # скільки чекати, поки провайдер побачить транзакцію, секунди
+RECONCILE_INTERVAL = int(os.getenv("RECONCILE_INTERVAL", "300"))  # інтервал опитування при увімкненому push, секунди
+
+# Adaptive Polling Configuration
+POLL_ADAPTIVE = os.getenv("POLL_ADAPTIVE", "true").lower() in ("1", "true", "yes")  # змінювати інтервал залежно від активності
+POLL_MIN_INTERVAL = int(os.getenv("POLL_MIN_INTERVAL", "5"))  # інтервал після платежу / при очікуванні платежу, секунди
+POLL_MAX_INTERVAL = int(os.getenv("POLL_MAX_INTERVAL", "300"))  # максимальний інтервал у простої, секунди
+POLL_ACTIVE_WINDOW = int(os.getenv("POLL_ACTIVE_WINDOW", "600"))  # скільки тримати частий інтервал після платежу, секунди
+POLL_REQUEST_BUDGET = int(os.getenv("POLL_REQUEST_BUDGET", "60"))  # максимум запитів до API за хвилину (0 - без обмеження)
+
+# Logging Configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # DEBUG - детальна діагностика запитів і відповідей API
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text або json (один JSON об'єкт на рядок)
+
+# Metrics Configuration
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")  # HTTP endpoint з метриками Prometheus
+METRICS_PORT = int(os.getenv("METRICS_PORT", str(PUSH_PORT)))  # порт (якщо збігається з PUSH_PORT - спільний сервер з push)
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")  # шлях для GET запитів
+
+# Latency SLO Configuration
+LATENCY_SLO = int(os.getenv("LATENCY_SLO", "0"))  # p95 затримки від блоку до повідомлення, секунди (0 - без попереджень)
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "200"))  # скільки останніх платежів враховувати в перцентилях
+LATENCY_MIN_SAMPLES = int(os.getenv("LATENCY_MIN_SAMPLES", "20"))  # мінімум замірів для перевірки SLO
+LATENCY_ALERT_COOLDOWN = int(os.getenv("LATENCY_ALERT_COOLDOWN", "3600"))  # не частіше одного попередження, секунди
+LATENCY_ALERT_CHAT = os.getenv("LATENCY_ALERT_CHAT", "")  # чат для попереджень (порожній - лише в лог)
+
+# API Endpoints Configuration
+FAKE_SERVER = os.getenv("FAKE_SERVER", "")  # адреса fake_server.py замість усіх справжніх API (наприклад: http://127.0.0.1:8090)
+TRONGRID_URL = os.getenv("TRONGRID_URL", FAKE_SERVER or "https://api.trongrid.io")  # базова адреса TronGrid API
+TRONSCAN_URL = os.getenv("TRONSCAN_URL", FAKE_SERVER or "https://apilist.tronscanapi.com")  # базова адреса Tronscan API
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", FAKE_SERVER or "https://api.telegram.org")  # базова адреса Telegram Bot API
@@ -0,0 +1,93 @@
+"""
+Обмежений за часом кеш дедуплікації оброблених транзакцій
+"""
+import heapq
+import time
+
+
+class DedupCache:
+    """Хеші оброблених транзакцій за останній проміжок часу.
+
+    В пам'яті тримаються лише хеші з timestamp не старше cutoff (курсор
+    опитування мінус horizon); старіші витісняються в evict(). Для транзакцій,
+    старших за cutoff, перевірка йде в журнал (Ledger), якщо він переданий,
+    тому витіснення не призводить до повторних повідомлень.
+
+    Хеші без timestamp (перенесені зі старого JSON) не потрапляють у warm_up(),
+    тому поки вони є в журналі, кожен промах перевіряється за журналом.
+    """
+
+    def __init__(self, horizon_ms, journal=None):
+        self.horizon_ms = int(horizon_ms)
+        self.journal = journal
+        self._entries = {}
+        # (timestamp, hash) для витіснення найстаріших за O(log n)
+        self._heap = []
+        self.cutoff = 0
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+        self.journal_lookups = 0
+        # У журналі є хеші без timestamp - перевіряти за ним навіть нові трансфери
+        self.untimed = journal is not None and journal.has_untimed()
+
+    def seen(self, tx_hash, timestamp=None):
+        """Чи оброблена транзакція. timestamp (мс) допомагає не ходити в журнал"""
+        if tx_hash in self._entries:
+            self.hits += 1
+            return True
+        self.misses += 1
+        # Все, що новіше за cutoff, гарантовано є в пам'яті (крім хешів без timestamp)
+        if self.journal is not None and (self.untimed or not timestamp or timestamp < self.cutoff):
+            self.journal_lookups += 1
+            return tx_hash in self.journal
+        return False
+
+    def __contains__(self, tx_hash):
+        return self.seen(tx_hash)
+
+    def add(self, tx_hash, timestamp=0, journal=True):
+        """Позначає транзакцію як оброблену (і записує в журнал)"""
+        try:
+            timestamp = int(float(timestamp or 0))
+        except (ValueError, TypeError):
+            timestamp = 0
+        if journal and self.journal is not None:
+            self.journal.add(tx_hash, timestamp)
+            self.untimed = self.untimed or not timestamp
+        # Без timestamp вважаємо транзакцію "новою" на момент додавання
+        key_timestamp = timestamp or int(time.time() * 1000)
+        if key_timestamp < self.cutoff or tx_hash in self._entries:
+            return
+        self._entries[tx_hash] = key_timestamp
+        heapq.heappush(self._heap, (key_timestamp, tx_hash))
+
+    def warm_up(self, items):
+        """Заповнює кеш парами (hash, timestamp) з журналу без повторного запису"""
+        for tx_hash, timestamp in items:
+            self.add(tx_hash, timestamp, journal=False)
+
+    def evict(self, watermark_timestamp):
+        """Витісняє хеші, старші за watermark_timestamp - horizon"""
+        self.cutoff = max(self.cutoff, int(watermark_timestamp) - self.horizon_ms)
+        evicted = 0
+        while self._heap and self._heap[0][0] < self.cutoff:
+            _, tx_hash = heapq.heappop(self._heap)
+            if self._entries.pop(tx_hash, None) is not None:
+                evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "cutoff": self.cutoff,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "journal_lookups": self.journal_lookups,
+            "untimed": self.untimed,
+        }
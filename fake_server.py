@@ -0,0 +1,469 @@
+"""
+Локальна заміна TronGrid / Tronscan / Telegram Bot API для навантажувальних
+тестів і перевірки стійкості без витрати квоти API та повідомлень у справжні канали
+
+    python fake_server.py                                   - http://127.0.0.1:8090, 6 платежів/хв
+    python fake_server.py --rate 600 --history 5000         - інтенсивний потік платежів
+    python fake_server.py --latency 0.5 --error-rate 0.1 --throttle-rate 0.1
+    python fake_server.py --script phases.json              - сценарій: зміна параметрів з часом
+    python fake_server.py --key-quota 5                     - не більше 5 запитів/с на API ключ (429 понад)
+
+    python bot.py --fake-server http://127.0.0.1:8090       - бот працює з цим сервером
+
+Сценарій - JSON список фаз, що виконуються по черзі (і по колу):
+    [{"duration": 60}, {"duration": 30, "latency": 3, "error_rate": 0.5}, {"duration": 30, "throttle_rate": 1}]
+
+Службові шляхи: GET /_stats, GET /_messages, POST /_payments ({"to": ..., "amount": 5}).
+"""
+import argparse
+import asyncio
+import bisect
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from urllib.parse import parse_qsl
+import config
+from http_server import HttpServer
+
+# Виправлення кодування для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+USDT_CONTRACT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+USDC_CONTRACT = "TEkxiTehnzSmSe2XqrBj4w32RUN966rdz8"
+SENDERS = (
+    "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf",
+    "TJRabPrwbZy45sbavfcjinPJC18kjpRTv8",
+    "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL",
+)
+# Скільки останніх відправлених повідомлень віддавати на /_messages
+MESSAGES_KEPT = 100
+
+
+class Faults:
+    """Поточні параметри збоїв (змінюються фазами сценарію)"""
+    FIELDS = ("latency", "jitter", "error_rate", "throttle_rate", "retry_after",
+              "telegram_latency", "telegram_throttle_rate")
+
+    def __init__(self, **values):
+        self.defaults = {field: values.get(field) or 0 for field in self.FIELDS}
+        self.__dict__.update(self.defaults)
+
+    def apply(self, phase):
+        self.__dict__.update(self.defaults)
+        self.__dict__.update({key: value for key, value in phase.items() if key in self.FIELDS})
+
+
+class Ledger:
+    """Згенеровані трансфери, впорядковані за часом (для кожної адреси - свій індекс)"""
+
+    def __init__(self):
+        self.by_address = {}
+        self.count = 0
+        self.payments = 0
+
+    def add(self, to_address, amount, timestamp=None, contract=USDT_CONTRACT, from_address=None):
+        transfer = {
+            "hash": os.urandom(32).hex(),
+            "timestamp": timestamp or int(time.time() * 1000),
+            "from": from_address or random.choice(SENDERS),
+            "to": to_address,
+            "amount": int(round(amount * 1_000_000)),
+            "contract": contract,
+        }
+        for address in {transfer["to"].upper(), transfer["from"].upper()}:
+            items = self.by_address.setdefault(address, [])
+            bisect.insort(items, (transfer["timestamp"], transfer["hash"], transfer))
+        self.count += 1
+        if contract == USDT_CONTRACT and amount >= 1:
+            self.payments += 1
+        return transfer
+
+    def query(self, address, incoming_only=False, contract=None, since=0, until=0):
+        """Трансфери адреси від нових до старих"""
+        result = []
+        for timestamp, _, transfer in reversed(self.by_address.get(address.upper(), [])):
+            if until and timestamp > until:
+                continue
+            if since and timestamp < since:
+                break
+            if incoming_only and transfer["to"].upper() != address.upper():
+                continue
+            if contract and transfer["contract"] != contract:
+                continue
+            result.append(transfer)
+        return result
+
+
+def token_info(transfer):
+    if transfer["contract"] == USDT_CONTRACT:
+        return "USDT", "Tether USD"
+    return "USDC", "USD Coin"
+
+
+def as_trongrid(transfer):
+    symbol, name = token_info(transfer)
+    return {
+        "transaction_id": transfer["hash"],
+        "token_info": {"symbol": symbol, "address": transfer["contract"], "decimals": 6, "name": name},
+        "block_timestamp": transfer["timestamp"],
+        "from": transfer["from"],
+        "to": transfer["to"],
+        "type": "Transfer",
+        "value": str(transfer["amount"]),
+    }
+
+
+def as_tronscan(transfer):
+    symbol, name = token_info(transfer)
+    return {
+        "transactionHash": transfer["hash"],
+        "timestamp": transfer["timestamp"],
+        "transferFromAddress": transfer["from"],
+        "transferToAddress": transfer["to"],
+        "amount": str(transfer["amount"]),
+        "tokenName": name,
+        "confirmed": True,
+        "contractRet": "SUCCESS",
+        "tokenInfo": {"tokenId": transfer["contract"], "tokenAbbr": symbol, "tokenName": name, "tokenDecimal": 6},
+    }
+
+
+def as_token_transfer(transfer):
+    symbol, name = token_info(transfer)
+    return {
+        "transaction_id": transfer["hash"],
+        "block_ts": transfer["timestamp"],
+        "from_address": transfer["from"],
+        "to_address": transfer["to"],
+        "contract_address": transfer["contract"],
+        "quant": str(transfer["amount"]),
+        "confirmed": True,
+        "tokenInfo": {"tokenId": transfer["contract"], "tokenAbbr": symbol, "tokenName": name, "tokenDecimal": 6},
+    }
+
+
+def int_param(query, name, default=0):
+    try:
+        return int(query.get(name) or default)
+    except ValueError:
+        return default
+
+
+class FakeServer:
+    def __init__(self, addresses, rate, noise, faults, script=None, key_quota=0, key_window=1.0):
+        self.addresses = addresses
+        self.rate = rate
+        self.noise = noise
+        self.faults = faults
+        self.script = script or []
+        # Квота запитів на ключ TRON-PRO-API-KEY: key -> [початок вікна, використано]
+        self.key_quota = key_quota
+        self.key_window = key_window
+        self.quotas = {}
+        self.ledger = Ledger()
+        self.messages = []
+        self.message_id = 0
+        self.stats = {}
+        self.phase = None
+        self.server = None
+
+    def count(self, name):
+        self.stats[name] = self.stats.get(name, 0) + 1
+
+    def seed(self, count, span=3600):
+        """Історія трансферів за останні span секунд"""
+        now = int(time.time() * 1000)
+        for _ in range(count):
+            self.generate(now - random.randint(0, span * 1000))
+
+    def generate(self, timestamp=None):
+        """Один трансфер: платіж на наші адреси або (з ймовірністю noise) інший токен / дрібна сума"""
+        to_address = random.choice(self.addresses)
+        if random.random() < self.noise:
+            if random.random() < 0.5:
+                return self.ledger.add(to_address, random.uniform(1, 100), timestamp, contract=USDC_CONTRACT)
+            return self.ledger.add(to_address, round(random.uniform(0.01, 0.99), 2), timestamp)
+        return self.ledger.add(to_address, round(random.uniform(1, 500), 2), timestamp)
+
+    async def arrivals(self):
+        """Потік нових трансферів (процес Пуассона, rate на хвилину)"""
+        while True:
+            await asyncio.sleep(random.expovariate(self.rate / 60))
+            self.generate()
+
+    async def run_script(self):
+        while True:
+            for index, phase in enumerate(self.script):
+                self.faults.apply(phase)
+                self.phase = index
+                print(f"🎬 Фаза {index + 1}/{len(self.script)}: {phase}")
+                await asyncio.sleep(phase.get("duration", 60))
+
+    async def inject(self, telegram=False):
+        """Затримка та помилки згідно з поточною фазою; повертає відповідь-помилку або None"""
+        faults = self.faults
+        latency = faults.telegram_latency if telegram else faults.latency + random.uniform(0, faults.jitter)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        throttle_rate = faults.telegram_throttle_rate if telegram else faults.throttle_rate
+        retry_after = int(faults.retry_after or 1)
+        if random.random() < throttle_rate:
+            self.count("telegram_429" if telegram else "api_429")
+            if telegram:
+                return 429, {
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                }
+            return 429, {"Error": "request rate exceeded"}, None, {"Retry-After": str(retry_after)}
+        if not telegram and random.random() < faults.error_rate:
+            self.count("api_5xx")
+            return random.choice((500, 503)), {"error": "injected failure"}
+        return None
+
+    def quota(self, request):
+        """Квота ключа TRON-PRO-API-KEY (запити без ключа - одна спільна квота).
+        Повертає (відповідь 429 або None, заголовки X-RateLimit-*)"""
+        if not self.key_quota:
+            return None, {}
+        key = request.headers.get("tron-pro-api-key", "")
+        self.count(f"key_{key[-4:] or 'none'}")
+        now = time.time()
+        window = self.quotas.get(key)
+        if window is None or now - window[0] >= self.key_window:
+            window = self.quotas[key] = [now, 0]
+        reset = window[0] + self.key_window
+        if window[1] >= self.key_quota:
+            self.count("key_429")
+            return (429, {"Error": "request rate exceeded"}, None, {
+                "Retry-After": str(max(1, math.ceil(reset - now))),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": f"{reset:.3f}",
+            }), {}
+        window[1] += 1
+        return None, {
+            "X-RateLimit-Limit": str(self.key_quota),
+            "X-RateLimit-Remaining": str(self.key_quota - window[1]),
+            "X-RateLimit-Reset": f"{reset:.3f}",
+        }
+
+    # TronGrid
+
+    async def trongrid_trc20(self, request):
+        self.count("trongrid")
+        error = await self.inject()
+        if error:
+            return error
+        error, headers = self.quota(request)
+        if error:
+            return error
+        query = request.query
+        limit = min(int_param(query, "limit", 20), 200)
+        offset = int_param(query, "fingerprint")
+        transfers = self.ledger.query(
+            request.params["address"],
+            incoming_only=query.get("only_to") == "true",
+            contract=query.get("contract_address"),
+            since=int_param(query, "min_timestamp"),
+            until=int_param(query, "max_timestamp"),
+        )
+        page = transfers[offset:offset + limit]
+        meta = {"at": int(time.time() * 1000), "page_size": len(page)}
+        if offset + limit < len(transfers):
+            meta["fingerprint"] = str(offset + limit)
+        return 200, {"data": [as_trongrid(t) for t in page], "success": True, "meta": meta}, None, headers
+
+    # Tronscan
+
+    async def tronscan_transfer(self, request):
+        self.count("tronscan_transfer")
+        error = await self.inject()
+        if error:
+            return error
+        error, headers = self.quota(request)
+        if error:
+            return error
+        query = request.query
+        address = query.get("toAddress") or query.get("relatedAddress") or ""
+        transfers = self.ledger.query(
+            address,
+            incoming_only="toAddress" in query,
+            contract=query.get("contract_address"),
+            since=int_param(query, "start_timestamp"),
+            until=int_param(query, "end_timestamp"),
+        )
+        start, limit = int_param(query, "start"), min(int_param(query, "limit", 20), 50)
+        page = transfers[start:start + limit]
+        return 200, {"total": len(transfers), "rangeTotal": len(transfers), "data": [as_tronscan(t) for t in page]}, None, headers
+
+    async def tronscan_account_trc20(self, request):
+        self.count("tronscan_account")
+        error = await self.inject()
+        if error:
+            return error
+        error, headers = self.quota(request)
+        if error:
+            return error
+        query = request.query
+        transfers = self.ledger.query(
+            request.params["address"],
+            incoming_only=str(query.get("direction")) == "2",
+            contract=query.get("trc20Id"),
+            since=int_param(query, "start_timestamp"),
+            until=int_param(query, "end_timestamp"),
+        )
+        start, limit = int_param(query, "start"), min(int_param(query, "limit", 20), 50)
+        page = transfers[start:start + limit]
+        return 200, {"total": len(transfers), "token_transfers": [as_token_transfer(t) for t in page]}, None, headers
+
+    # Telegram
+
+    @staticmethod
+    def telegram_params(request):
+        """Параметри методу Bot API: JSON або form-urlencoded (так відправляє python-telegram-bot)"""
+        params = dict(request.query)
+        if request.body:
+            if request.headers.get("content-type", "").startswith("application/json"):
+                params.update(request.json() or {})
+            else:
+                params.update(parse_qsl(request.body.decode("utf-8")))
+        return params
+
+    @staticmethod
+    def chat(chat_id):
+        chat_id = str(chat_id)
+        if chat_id.lstrip("-").isdigit():
+            return {"id": int(chat_id), "type": "channel", "title": f"Fake channel {chat_id}"}
+        return {"id": -1000000000000 - abs(hash(chat_id)) % 1000000, "type": "channel",
+                "title": f"Fake {chat_id}", "username": chat_id.lstrip("@")}
+
+    async def telegram(self, request):
+        method = request.path.rsplit("/", 1)[-1]
+        self.count(f"telegram_{method}")
+        error = await self.inject(telegram=True)
+        if error:
+            return error
+        params = self.telegram_params(request)
+        if method == "getMe":
+            result = {"id": 1000001, "is_bot": True, "first_name": "Fake bot", "username": "fake_payment_bot"}
+        elif method == "getChat":
+            result = self.chat(params.get("chat_id", ""))
+        elif method == "sendMessage":
+            self.message_id += 1
+            result = {
+                "message_id": self.message_id,
+                "date": int(time.time()),
+                "chat": self.chat(params.get("chat_id", "")),
+                "text": params.get("text", ""),
+            }
+            self.messages.append({"chat_id": params.get("chat_id"), "text": params.get("text"), "at": time.time()})
+            del self.messages[:-MESSAGES_KEPT]
+        else:
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"}
+        return 200, {"ok": True, "result": result}
+
+    # Службові
+
+    async def get_stats(self, request):
+        return 200, {
+            "requests": self.stats,
+            "transfers": self.ledger.count,
+            "payments": self.ledger.payments,
+            "messages": self.message_id,
+            "phase": self.phase,
+            "faults": {field: getattr(self.faults, field) for field in Faults.FIELDS},
+        }
+
+    async def get_messages(self, request):
+        return 200, self.messages
+
+    async def post_payment(self, request):
+        """Ручний платіж: {"to": адреса, "amount": 5, "contract": ...}"""
+        data = request.json() or {}
+        transfer = self.ledger.add(
+            data.get("to") or self.addresses[0],
+            float(data.get("amount") or 1),
+            contract=data.get("contract") or USDT_CONTRACT,
+            from_address=data.get("from"),
+        )
+        return 202, transfer
+
+    async def start(self, host, port):
+        server = self.server = HttpServer(host, port)
+        server.route("GET", "/v1/accounts/{address}/transactions/trc20", self.trongrid_trc20)
+        server.route("GET", "/api/transfer", self.tronscan_transfer)
+        server.route("GET", "/api/account/{address}/transactions/trc20", self.tronscan_account_trc20)
+        for method in ("getMe", "getChat", "sendMessage"):
+            for http_method in ("GET", "POST"):
+                server.route(http_method, "/bot{token}/" + method, self.telegram)
+        server.route("GET", "/_stats", self.get_stats)
+        server.route("GET", "/_messages", self.get_messages)
+        server.route("POST", "/_payments", self.post_payment)
+        await server.start()
+        return self
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fake TronGrid / Tronscan / Telegram для тестів")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--addresses", default=config.TRON_ADDRESSES or config.TRON_ADDRESS,
+                        help="адреси отримувачів через кому (за замовчуванням - як у бота)")
+    parser.add_argument("--rate", type=float, default=6, help="нових трансферів за хвилину (0 - без нових)")
+    parser.add_argument("--history", type=int, default=100, help="трансферів в історії за останню годину")
+    parser.add_argument("--noise", type=float, default=0.2, help="частка трансферів інших токенів / < 1 USDT")
+    parser.add_argument("--latency", type=float, default=0, help="затримка відповіді TronGrid / Tronscan, с")
+    parser.add_argument("--jitter", type=float, default=0, help="випадкова добавка до затримки, с")
+    parser.add_argument("--error-rate", type=float, default=0, help="частка відповідей 500/503")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="частка відповідей 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After у відповідях 429, с")
+    parser.add_argument("--telegram-latency", type=float, default=0, help="затримка Telegram API, с")
+    parser.add_argument("--telegram-throttle-rate", type=float, default=0, help="частка відповідей 429 від Telegram")
+    parser.add_argument("--script", help="JSON файл зі сценарієм фаз")
+    parser.add_argument("--key-quota", type=int, default=0,
+                        help="запитів на один API ключ за --key-window (0 - без квоти; без ключа - спільна квота)")
+    parser.add_argument("--key-window", type=float, default=1.0, help="вікно квоти ключа, с")
+    args = parser.parse_args()
+
+    faults = Faults(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+        telegram_latency=args.telegram_latency, telegram_throttle_rate=args.telegram_throttle_rate,
+    )
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+    addresses = [address.strip() for address in args.addresses.split(",") if address.strip()]
+    fake = FakeServer(addresses, args.rate, args.noise, faults, script, args.key_quota, args.key_window)
+    fake.seed(args.history)
+    await fake.start(args.host, args.port)
+
+    url = f"http://{args.host}:{fake.server.port}"
+    print(f"🧪 Fake API: {url} ({len(addresses)} адрес, {args.rate} трансферів/хв)")
+    print(f"▶️  python bot.py --fake-server {url}")
+    print(f"📊 {url}/_stats")
+
+    tasks = []
+    if args.rate > 0:
+        tasks.append(asyncio.create_task(fake.arrivals()))
+    if script:
+        tasks.append(asyncio.create_task(fake.run_script()))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await fake.server.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
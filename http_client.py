@@ -0,0 +1,53 @@
+"""
+Асинхронний HTTP клієнт з пулом з'єднань для запитів до TronGrid / Tronscan
+"""
+import asyncio
+import httpx
+import config
+
+
+class HttpClient:
+    """Спільний httpx.AsyncClient з keep-alive пулом з'єднань для кожного хоста.
+
+    Клієнт створюється один раз і живе між циклами перевірки, тому TLS handshake
+    виконується лише при першому запиті до хоста (HTTP/1.1 keep-alive).
+    """
+
+    def __init__(self):
+        # Таймаут на кожну фазу запиту (підключення, читання, запис, пул)
+        self.timeout = httpx.Timeout(
+            config.HTTP_TIMEOUT,
+            connect=config.HTTP_CONNECT_TIMEOUT
+        )
+        # Загальний таймаут на весь запит (від відправки до отримання тіла)
+        self.total_timeout = config.HTTP_TOTAL_TIMEOUT
+        self.limits = httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+        )
+        self._client = None
+
+    @property
+    def client(self):
+        """Створює клієнт при першому використанні (вже всередині event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=False
+            )
+        return self._client
+
+    async def get(self, url, params=None, headers=None):
+        """GET запит з обмеженням загального часу виконання"""
+        return await asyncio.wait_for(
+            self.client.get(url, params=params, headers=headers),
+            timeout=self.total_timeout
+        )
+
+    async def close(self):
+        """Закриває всі з'єднання пулу"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
@@ -0,0 +1,159 @@
+"""
+Мінімальний асинхронний HTTP сервер (asyncio, без зовнішніх залежностей)
+"""
+import asyncio
+import json
+import re
+from urllib.parse import urlsplit, parse_qsl
+from log import get_logger
+
+logger = get_logger("http")
+
+# Максимальний розмір тіла запиту, байти
+MAX_BODY_SIZE = 1024 * 1024
+# Скільки чекати на заголовки / тіло запиту, секунди
+READ_TIMEOUT = 10
+
+REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 429: "Too Many Requests",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class PayloadTooLarge(ValueError):
+    """Тіло запиту більше за MAX_BODY_SIZE"""
+
+
+class Request:
+    """Розібраний HTTP запит (params - значення {параметрів} шляху маршруту)"""
+    __slots__ = ("method", "path", "query", "headers", "body", "params")
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.params = {}
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8") or "null")
+
+
+class HttpServer:
+    """Один запит на з'єднання, обробники - корутини handler(request), що
+    повертають (status, body) або (status, body, content_type, [headers]).
+    body - bytes / str / об'єкт для JSON.
+    Шлях маршруту може містити параметри: "/v1/accounts/{address}/transactions".
+    """
+
+    def __init__(self, host="0.0.0.0", port=8080):
+        self.host = host
+        self.port = port
+        self.routes = {}
+        # (regex, обробники за методом) для шляхів з {параметрами}
+        self.patterns = []
+        self.server = None
+
+    def route(self, method, path, handler):
+        if "{" not in path:
+            self.routes.setdefault(path, {})[method.upper()] = handler
+            return
+        regex = re.compile("^" + re.sub(r"\\\{(\w+)\\\}", r"(?P<\1>[^/]+)", re.escape(path)) + "$")
+        for pattern, handlers in self.patterns:
+            if pattern.pattern == regex.pattern:
+                handlers[method.upper()] = handler
+                return
+        self.patterns.append((regex, {method.upper(): handler}))
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # При port=0 система вибирає вільний порт
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_SIZE:
+            raise PayloadTooLarge(f"body too large: {length} bytes")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers, body)
+
+    def _match(self, request):
+        handlers = self.routes.get(request.path)
+        if handlers is not None:
+            return handlers
+        for pattern, handlers in self.patterns:
+            match = pattern.match(request.path)
+            if match:
+                request.params = match.groupdict()
+                return handlers
+        return None
+
+    async def _dispatch(self, request):
+        handlers = self._match(request)
+        if handlers is None:
+            return 404, {"error": "not found"}
+        handler = handlers.get(request.method)
+        if handler is None:
+            return 405, {"error": "method not allowed"}
+        return await handler(request)
+
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                request = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+            except PayloadTooLarge:
+                request, result = None, (413, {"error": "payload too large"})
+            except ValueError:
+                # Невірний рядок запиту / Content-Length
+                request, result = None, (400, {"error": "bad request"})
+            else:
+                if request is None:
+                    return
+                try:
+                    result = await self._dispatch(request)
+                except Exception as e:
+                    logger.exception("❌ Помилка обробки %s %s: %s", request.method, request.path, e)
+                    result = (500, {"error": "internal error"})
+            await self._write_response(writer, *result)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write_response(self, writer, status, body=b"", content_type=None, headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False)
+            content_type = content_type or "application/json"
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        lines = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            f"Content-Type: {content_type or 'text/plain; charset=utf-8'}",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+        ]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
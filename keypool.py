@@ -0,0 +1,167 @@
+"""
+Пул API ключів TronGrid / Tronscan з урахуванням квоти кожного ключа
+"""
+import asyncio
+import math
+import time
+from ratelimit import TokenBucket, parse_retry_after
+
+# Якщо всі ключі відкладено ненадовго, краще дочекатися ключа, ніж пропускати перевірку
+MAX_PARK_WAIT = 5.0
+
+
+def parse_keys(*values):
+    """Ключі з рядків через кому (без повторів, порядок зберігається)"""
+    keys = []
+    for value in values:
+        for key in (value or "").split(","):
+            key = key.strip()
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+def parse_reset(value, now=None):
+    """X-RateLimit-Reset: секунди до скидання або unix час (с / мс) -> секунди"""
+    try:
+        reset = float(value)
+    except (TypeError, ValueError):
+        return None
+    now = now or time.time()
+    if reset > 1e12:
+        reset = reset / 1000 - now
+    elif reset > 1e9:
+        reset -= now
+    return max(0.0, reset)
+
+
+class ApiKey:
+    """Один ключ: власний token bucket, використання і залишок квоти"""
+    __slots__ = ("value", "provider", "bucket", "requests", "throttled", "remaining", "limit",
+                 "parked_until", "park_streak")
+
+    def __init__(self, value, provider, rate):
+        self.value = value
+        self.provider = provider
+        self.bucket = TokenBucket(rate)
+        self.requests = 0
+        self.throttled = 0
+        # Залишок і розмір квоти з заголовків X-RateLimit-* (None - сервер не повідомляє)
+        self.remaining = None
+        self.limit = None
+        self.parked_until = 0.0
+        # 429 підряд без Retry-After - для подвоєння паузи
+        self.park_streak = 0
+
+    @property
+    def name(self):
+        """Ключ для логів і метрик: лише останні символи"""
+        return f"{self.provider} ...{self.value[-4:]}"
+
+    def parked(self, now=None):
+        return self.parked_until > (now or time.time())
+
+
+class KeyPool:
+    """Ключі по провайдерах (trongrid / tronscan).
+
+    acquire(provider) - ключ з найбільшим запасом (вільні токени, залишок квоти,
+                        найменше використаний); запити рівномірно розходяться
+                        по ключах, тож пропускна здатність росте з їх кількістю
+    record(key, ...)  - залишок квоти з відповіді; 429 або вичерпана квота
+                        паркують ключ до скидання вікна (Retry-After /
+                        X-RateLimit-Reset, інакше cooldown з подвоєнням)
+    """
+
+    def __init__(self, keys, rate=0, cooldown=30, max_cooldown=1800):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.keys = {
+            provider: [ApiKey(value, provider, rate) for value in values]
+            for provider, values in keys.items() if values
+        }
+
+    def providers(self):
+        """Провайдери, для яких є ключі"""
+        return list(self.keys)
+
+    def __len__(self):
+        return sum(len(keys) for keys in self.keys.values())
+
+    def size(self, provider):
+        return len(self.keys.get(provider, ()))
+
+    def capacity(self):
+        """У скільки разів більше запитів можна робити, ніж з одним ключем"""
+        return max([len(keys) for keys in self.keys.values()] + [1])
+
+    def available(self, provider, now=None):
+        now = now or time.time()
+        return [key for key in self.keys.get(provider, ()) if not key.parked(now)]
+
+    def ready(self, provider, now=None):
+        """Чи буде вільний ключ не пізніше ніж за MAX_PARK_WAIT секунд"""
+        now = now or time.time()
+        return any(key.parked_until - now <= MAX_PARK_WAIT for key in self.keys.get(provider, ()))
+
+    def all(self):
+        return [key for keys in self.keys.values() for key in keys]
+
+    async def acquire(self, provider):
+        """Ключ для запиту (після очікування його ліміту) або None, якщо всі відкладено надовго"""
+        candidates = self.available(provider)
+        if not candidates:
+            if not self.ready(provider):
+                return None
+            now = time.time()
+            await asyncio.sleep(max(0.0, min(key.parked_until for key in self.keys[provider]) - now))
+            return await self.acquire(provider)
+        candidates.sort(key=lambda key: (
+            -key.bucket.tokens if key.bucket.rate > 0 else 0,
+            -(key.remaining if key.remaining is not None else math.inf),
+            key.requests,
+        ))
+        for key in candidates:
+            if key.bucket.try_acquire():
+                break
+        else:
+            key = min(candidates, key=lambda key: key.bucket.delay())
+            await key.bucket.acquire()
+        key.requests += 1
+        return key
+
+    def record(self, key, status, headers=None, now=None):
+        """Враховує відповідь на запит з ключем, повертає паузу (с), якщо ключ припарковано"""
+        now = now or time.time()
+        headers = headers or {}
+        remaining = headers.get("X-RateLimit-Remaining")
+        limit = headers.get("X-RateLimit-Limit")
+        try:
+            key.remaining = int(remaining) if remaining is not None else key.remaining
+            key.limit = int(limit) if limit is not None else key.limit
+        except ValueError:
+            pass
+        reset = parse_reset(headers.get("X-RateLimit-Reset"), now)
+
+        if status == 429:
+            key.throttled += 1
+            pause = parse_retry_after(headers.get("Retry-After"), now)
+            if pause is None:
+                pause = reset
+            if pause is None:
+                pause = min(self.cooldown * 2 ** key.park_streak, self.max_cooldown)
+                key.park_streak += 1
+            return self.park(key, pause, now)
+        if status in (401, 403):
+            # Ключ відхилено (невірний / заблокований) - надовго
+            return self.park(key, self.max_cooldown, now)
+        key.park_streak = 0
+        if key.remaining == 0 and reset:
+            # Квота вичерпана цим запитом - наступний отримав би 429
+            return self.park(key, reset, now)
+        return None
+
+    def park(self, key, seconds, now=None):
+        seconds = min(seconds, self.max_cooldown)
+        key.parked_until = max(key.parked_until, (now or time.time()) + seconds)
+        return seconds
@@ -0,0 +1,99 @@
+"""
+Наскрізна затримка платежів: від block_timestamp трансферу до відправки в Telegram
+"""
+import time
+from collections import deque
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyWindow:
+    """Останні window замірів (с) і їх перцентилі"""
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+
+    def add(self, value):
+        self.samples.append(value)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def percentile(self, percentile):
+        if not self.samples:
+            return None
+        samples = sorted(self.samples)
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def summary(self):
+        result = {"count": len(self.samples)}
+        for percentile in PERCENTILES:
+            value = self.percentile(percentile)
+            result[f"p{percentile}"] = round(value, 3) if value is not None else None
+        return result
+
+
+class LatencyTracker:
+    """Заміри затримки по адресах і провайдерах (звідки дізнались про платіж).
+
+    track(key, ...)  - платіж переданий на відправку (key - (hash, chat_id))
+    complete(key)    - повідомлення відправлено, повертає (затримка с, провайдер)
+    discard(key)     - відправка остаточно не вдалася
+    check_slo()      - [(область, назва, p95)] для тих, у кого p95 перевищив slo
+                       (кожна область повідомляється не частіше alert_cooldown)
+    """
+
+    def __init__(self, slo=0, window=200, min_samples=20, alert_cooldown=3600):
+        self.slo = slo
+        self.window = window
+        self.min_samples = min_samples
+        self.alert_cooldown = alert_cooldown
+        self.overall = LatencyWindow(window)
+        self.by_address = {}
+        self.by_provider = {}
+        # key -> (block_timestamp мс, час виявлення, адреса, провайдер)
+        self.inflight = {}
+        self.alerted = {}
+        self.breaches = 0
+
+    def track(self, key, block_timestamp, detected_at, address, provider):
+        self.inflight[key] = (block_timestamp, detected_at, address, provider or "unknown")
+
+    def discard(self, key):
+        self.inflight.pop(key, None)
+
+    def complete(self, key, sent_at=None):
+        tracked = self.inflight.pop(key, None)
+        if tracked is None:
+            return None
+        block_timestamp, detected_at, address, provider = tracked
+        sent_at = sent_at or time.time()
+        # Без timestamp рахуємо від моменту виявлення; від'ємні значення - розбіжність годинників
+        start = block_timestamp / 1000 if block_timestamp else detected_at
+        latency = max(0.0, sent_at - start)
+        self.overall.add(latency)
+        self.by_address.setdefault(address, LatencyWindow(self.window)).add(latency)
+        self.by_provider.setdefault(provider, LatencyWindow(self.window)).add(latency)
+        return latency, provider
+
+    def check_slo(self, now=None):
+        if not self.slo:
+            return []
+        now = now or time.time()
+        scopes = [("all", "all", self.overall)]
+        scopes += [("address", name, window) for name, window in self.by_address.items()]
+        scopes += [("provider", name, window) for name, window in self.by_provider.items()]
+        breached = []
+        for scope, name, window in scopes:
+            if len(window) < self.min_samples:
+                continue
+            p95 = window.percentile(95)
+            if p95 <= self.slo:
+                continue
+            if now - self.alerted.get((scope, name), 0) < self.alert_cooldown:
+                continue
+            self.alerted[(scope, name)] = now
+            self.breaches += 1
+            breached.append((scope, name, p95))
+        return breached
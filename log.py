@@ -0,0 +1,59 @@
+"""
+Налаштування логування: рівні, текстовий або JSON формат
+"""
+import json
+import logging
+import sys
+
+LOGGER_NAME = "payment_monitor"
+
+
+def dumps(fields):
+    """Компактний JSON для полів запису"""
+    return json.dumps(fields, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Час, рівень, повідомлення; структуровані поля (extra={"fields": ...}) - JSON в кінці рядка"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + dumps(fields)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Один JSON об'єкт на рядок (зручно для Railway / збирачів логів)"""
+
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return dumps(data)
+
+
+def setup_logging(level="INFO", fmt="text"):
+    """Налаштовує логер бота (повторний виклик лише змінює рівень)"""
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+
+def get_logger(name=None):
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
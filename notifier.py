@@ -0,0 +1,159 @@
+"""
+Черга відправки повідомлень у Telegram з урахуванням лімітів API
+"""
+import asyncio
+from collections import deque
+from datetime import timedelta
+from telegram.error import BadRequest, RetryAfter, TimedOut, NetworkError, TelegramError
+from ratelimit import TokenBucket
+from log import get_logger
+
+logger = get_logger("notifier")
+
+# Скільки разів повторювати відправку при мережевих помилках / RetryAfter
+MAX_SEND_ATTEMPTS = 5
+
+
+def retry_after_seconds(error):
+    """RetryAfter.retry_after - int (PTB 20) або timedelta (новіші версії)"""
+    value = error.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class ChatQueue:
+    """Черга платежів одного чату зі своїм лімітом"""
+    __slots__ = ("chat_id", "items", "bucket", "task")
+
+    def __init__(self, chat_id, rate):
+        self.chat_id = chat_id
+        self.items = deque()
+        # Ліміт чату без запасу: повідомлення йдуть рівномірно
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.task = None
+
+
+class Notifier:
+    """Відправляє платежі у фоні: token bucket на чат і глобальний, точне
+    очікування RetryAfter, а при накопиченні черги - один дайджест замість
+    десятків окремих повідомлень.
+
+    send(text, chat_id)   - корутина відправки (помилки Telegram не перехоплює)
+    render(item)          - текст повідомлення для одного платежу (None - пропустити)
+    render_digest(items)  - текст дайджесту для кількох платежів
+    on_result(chat_id, items, state, error) - результат відправки: "sent", "failed"
+                            (повтор не допоможе) або "pending" (спроби вичерпано,
+                            можна повторити пізніше)
+    """
+
+    def __init__(self, send, render, render_digest, global_rate=30, chat_rate=20 / 60,
+                 digest_threshold=5, digest_max=20, on_result=None):
+        self.send = send
+        self.render = render
+        self.render_digest = render_digest
+        self.on_result = on_result
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.digest_threshold = digest_threshold
+        self.digest_max = digest_max
+        self.chats = {}
+
+        self.sent = 0
+        self.digests = 0
+        self.retries = 0
+        self.retry_after = 0
+        self.dropped = 0
+
+    def enqueue(self, chat_id, item):
+        """Ставить платіж у чергу чату і запускає відправку, якщо вона не йде"""
+        queue = self.chats.get(chat_id)
+        if queue is None:
+            queue = self.chats[chat_id] = ChatQueue(chat_id, self.chat_rate)
+        queue.items.append(item)
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self._worker(queue))
+
+    def pending(self):
+        return sum(len(queue.items) for queue in self.chats.values())
+
+    async def _worker(self, queue):
+        while queue.items:
+            await queue.bucket.acquire()
+            await self.global_bucket.acquire()
+            # Склад повідомлення визначаємо після очікування ліміту, щоб усе,
+            # що накопичилось за цей час, пішло одним дайджестом
+            if len(queue.items) >= self.digest_threshold:
+                batch = [queue.items.popleft() for _ in range(min(len(queue.items), self.digest_max))]
+                text = self.render_digest(batch)
+            else:
+                batch = [queue.items.popleft()]
+                text = self.render(batch[0])
+            if not text:
+                self._report(queue.chat_id, batch, "failed", "порожнє повідомлення")
+                continue
+            state, error = await self._send(queue.chat_id, text, len(batch))
+            if state == "sent" and len(batch) > 1:
+                self.digests += 1
+            self._report(queue.chat_id, batch, state, error)
+
+    def _report(self, chat_id, batch, state, error=None):
+        if self.on_result is None:
+            return
+        try:
+            self.on_result(chat_id, batch, state, error)
+        except Exception as e:
+            logger.exception("⚠️  Помилка обробки результату відправки: %s", e)
+
+    async def _send(self, chat_id, text, count):
+        """Відправляє одне повідомлення з повторами, повертає (стан, помилка)"""
+        error = None
+        for attempt in range(1, MAX_SEND_ATTEMPTS + 1):
+            try:
+                await self.send(text, chat_id)
+                self.sent += count
+                if count > 1:
+                    logger.info("✅ Дайджест з %d платежів відправлено в %s", count, chat_id)
+                else:
+                    logger.info("✅ Повідомлення відправлено в %s", chat_id)
+                return "sent", None
+            except RetryAfter as e:
+                # Telegram точно каже, скільки чекати - чекаємо саме стільки
+                error = str(e)
+                delay = retry_after_seconds(e)
+                self.retry_after += 1
+                logger.warning("⏳ Ліміт Telegram для %s: повтор через %.0f с", chat_id, delay)
+                self.retries += 1
+                await asyncio.sleep(delay)
+            except BadRequest as e:
+                # BadRequest - підклас NetworkError, але повтор тут не допоможе
+                logger.error("❌ Помилка відправки в %s: %s", chat_id, e)
+                self.dropped += count
+                return "failed", str(e)
+            except (TimedOut, NetworkError) as e:
+                error = str(e)
+                delay = 2 ** attempt
+                logger.warning("⚠️  Помилка мережі Telegram (%s), повтор через %s с", e, delay)
+                self.retries += 1
+                await asyncio.sleep(delay)
+            except TelegramError as e:
+                logger.error("❌ Помилка відправки в %s: %s", chat_id, e)
+                self.dropped += count
+                return "failed", str(e)
+        logger.warning("⚠️  Не вдалося відправити в %s за %d спроб, повтор пізніше", chat_id, MAX_SEND_ATTEMPTS)
+        return "pending", error
+
+    async def join(self, timeout=None):
+        """Чекає, поки всі черги будуть відправлені (не довше timeout)"""
+        tasks = [queue.task for queue in self.chats.values() if queue.task and not queue.task.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    async def close(self, timeout=10):
+        """Дає черзі дослатися і зупиняє відправку"""
+        await self.join(timeout)
+        for queue in self.chats.values():
+            if queue.task and not queue.task.done():
+                queue.task.cancel()
+        if self.pending():
+            logger.warning("⚠️  Не відправлено %d платежів з черги", self.pending())
@@ -0,0 +1,46 @@
+"""
+Пагінація відповідей TronGrid / Tronscan
+"""
+
+# Tronscan не віддає більше 50 записів на сторінку
+TRONSCAN_MAX_PAGE_SIZE = 50
+# TronGrid дозволяє до 200 записів на сторінку
+TRONGRID_MAX_PAGE_SIZE = 200
+
+
+class FetchResult(list):
+    """Список трансферів з інформацією про те, як його отримано.
+
+    pages     - скільки сторінок завантажено
+    truncated - зупинились на ліміті сторінок (або помилці), не дійшовши до курсора;
+                між since і oldest_timestamp можуть бути ще трансфери
+    source    - провайдер, що повернув трансфери (trongrid / tronscan / push)
+    trusted   - порожня відповідь з курсором від endpoint'а, що вже повертав
+                USDT трансфери цієї адреси (без перевірки іншим провайдером)
+    """
+
+    def __init__(self, items=(), pages=1, truncated=False, source="", trusted=False):
+        super().__init__(items)
+        self.pages = pages
+        self.truncated = truncated
+        self.source = source
+        self.trusted = trusted
+
+    @property
+    def backfilled(self):
+        """Було дозавантаження більше однієї сторінки"""
+        return self.pages > 1
+
+    @property
+    def oldest_timestamp(self):
+        """Найменший timestamp серед отриманих трансферів (0 якщо невідомо)"""
+        timestamps = [txn.timestamp for txn in self]
+        timestamps = [ts for ts in timestamps if ts > 0]
+        return min(timestamps) if timestamps else 0
+
+
+def reached_since(page, since):
+    """Сторінка (від нових до старих) дійшла до курсора - далі лише переглянуті дані"""
+    if not since or not page:
+        return False
+    return page[-1].timestamp < since
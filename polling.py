@@ -0,0 +1,92 @@
+"""
+Адаптивний інтервал опитування: частіше після платежів, рідше в простої
+"""
+import time
+from collections import deque
+
+
+class PollController:
+    """Вибирає паузу до наступної перевірки.
+
+    - очікується платіж (expect) або нещодавно були платежі - min_interval
+    - інакше base_interval, що подвоюється з кожною перевіркою без платежів
+      (не більше max_interval)
+    - пауза не менша, ніж потрібно, щоб у середньому вкладатися в budget
+      запитів до API за хвилину (саме обмеження запитів - в PollScheduler,
+      тут лише вибір інтервалу, щоб перевірки не чекали на бюджет)
+    """
+
+    def __init__(self, base_interval, min_interval, max_interval, active_window=600,
+                 budget=0, adaptive=True):
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.active_window = active_window
+        self.budget = budget
+        self.adaptive = adaptive
+
+        self.last_activity = 0.0
+        self.expect_until = 0.0
+        self.idle_polls = 0
+        # (час, кількість запитів) перевірок за останню хвилину
+        self.history = deque()
+        self.requests_per_poll = None
+        self.interval = base_interval
+        self.reason = "старт"
+        # Причина без подробиць (для метрик): start, fixed, expect, active, idle, normal, budget
+        self.mode = "start"
+
+    def expect(self, seconds):
+        """Очікується платіж (виставлено рахунок) - частіші перевірки seconds секунд"""
+        self.expect_until = max(self.expect_until, time.time() + seconds)
+
+    def record_poll(self, new_payments, requests):
+        """Результат перевірки: скільки знайдено платежів і зроблено запитів до API"""
+        now = time.time()
+        if new_payments:
+            self.last_activity = now
+            self.idle_polls = 0
+        else:
+            self.idle_polls += 1
+        self.history.append((now, requests))
+        while self.history and self.history[0][0] < now - 60:
+            self.history.popleft()
+        self.requests_per_poll = requests if self.requests_per_poll is None else (
+            0.3 * requests + 0.7 * self.requests_per_poll
+        )
+
+    def requests_last_minute(self):
+        return sum(count for _, count in self.history)
+
+    def next_interval(self):
+        """Пауза до наступної перевірки (с); причина - в self.reason"""
+        now = time.time()
+        if not self.adaptive:
+            interval, reason, mode = self.base_interval, "фіксований інтервал", "fixed"
+        elif now < self.expect_until:
+            interval, reason, mode = self.min_interval, f"очікується платіж ще {int(self.expect_until - now)} с", "expect"
+        elif now - self.last_activity < self.active_window:
+            interval, reason, mode = self.min_interval, f"платіж {int(now - self.last_activity)} с тому", "active"
+        elif self.idle_polls:
+            interval = min(self.max_interval, self.base_interval * 2 ** (self.idle_polls - 1))
+            reason, mode = f"без платежів {self.idle_polls} перевірок", "idle"
+        else:
+            interval, reason, mode = self.base_interval, "звичайний режим", "normal"
+
+        # Бюджет запитів: з поточною кількістю запитів на перевірку вкладаємось у ліміт
+        if self.budget > 0 and self.requests_per_poll:
+            budget_interval = self.requests_per_poll * 60 / self.budget
+            # Хвилина вже вичерпана (наприклад, після дозавантаження сторінок) -
+            # чекаємо, поки старі запити вийдуть за межі вікна
+            if self.requests_last_minute() + self.requests_per_poll > self.budget and self.history:
+                budget_interval = max(budget_interval, self.history[0][0] + 60 - now)
+            if budget_interval > interval:
+                interval = budget_interval
+                reason += f", ліміт {self.budget} запитів/хв"
+                mode = "budget"
+
+        self.interval = round(interval, 1)
+        self.reason = reason
+        self.mode = mode
+        return self.interval
+
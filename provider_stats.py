@@ -0,0 +1,71 @@
+"""
+Показує поточний рейтинг endpoint'ів TronGrid / Tronscan
+
+    python provider_stats.py          - рейтинг, збережений запущеним ботом (provider_stats.json)
+    python provider_stats.py --probe  - один раунд запитів до всіх endpoint'ів для TRON_ADDRESS
+"""
+import asyncio
+import json
+import os
+import sys
+import io
+import time
+
+# Виправлення кодування для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+STATS_FILE = "provider_stats.json"
+
+
+def print_ranking(endpoints, updated_at=None):
+    """Друкує таблицю рейтингу"""
+    print("="*100)
+    print("📊 РЕЙТИНГ ПРОВАЙДЕРІВ")
+    if updated_at:
+        print(f"🕐 Оновлено {int(time.time() - updated_at)} с тому")
+    print("="*100)
+    print(f"{'#':>2}  {'Оцінка':>8}  {'Затримка':>8}  {'Успіх':>6}  {'Порожні':>7}  {'Спроб':>6}  {'Стан':<10}  Endpoint")
+    now = time.time()
+    for i, item in enumerate(endpoints, 1):
+        latency = f"{item['latency']:.2f}с" if item.get("latency") is not None else "-"
+        circuit = item.get("circuit") or {}
+        if circuit.get("open_until", 0) > now:
+            state = f"⛔ {int(circuit['open_until'] - now)}с"
+        elif item.get("cooldown_until", 0) > now:
+            state = f"⏸ {int(item['cooldown_until'] - now)}с"
+        elif item.get("attempts"):
+            state = "✅"
+        else:
+            state = "не перевірено"
+        print(
+            f"{i:>2}  {item['score']:>8.3f}  {latency:>8}  {item['success_rate']:>6.0%}  "
+            f"{item['empty_rate']:>7.0%}  {item['attempts']:>6}  {state:<10}  {item['name']}"
+        )
+    print("="*100)
+
+
+async def probe():
+    """Робить по одному запиту до кожного endpoint'а і показує результат"""
+    from bot import PaymentMonitor
+
+    monitor = PaymentMonitor()
+    try:
+        for endpoint in list(monitor.providers.endpoints):
+            await monitor.fetch_endpoint(endpoint, monitor.tron_address_original)
+    finally:
+        await monitor.close()
+    print_ranking(monitor.providers.snapshot())
+
+
+if __name__ == "__main__":
+    if "--probe" in sys.argv:
+        asyncio.run(probe())
+    elif os.path.exists(STATS_FILE):
+        with open(STATS_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        print_ranking(data.get("endpoints", []), data.get("updated_at"))
+    else:
+        print(f"⚠️  Файл {STATS_FILE} не знайдено - бот ще не запускався в цій директорії")
+        print("   Запустіть: python provider_stats.py --probe")
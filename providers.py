@@ -0,0 +1,331 @@
+"""
+Реєстр endpoint'ів TronGrid / Tronscan з оцінкою їх стану
+"""
+import json
+import os
+import time
+from collections import deque
+from urllib.parse import urlsplit
+from pagination import TRONGRID_MAX_PAGE_SIZE, TRONSCAN_MAX_PAGE_SIZE
+from ratelimit import TokenBucket, CircuitBreaker
+
+TRONGRID_BASE_URL = "https://api.trongrid.io"
+TRONSCAN_BASE_URL = "https://apilist.tronscanapi.com"
+
+# Затримка для endpoint'ів без жодного заміру (с) - вони йдуть після перевірених
+DEFAULT_LATENCY = 1.0
+# Вага нового заміру в ковзних середніх
+EWMA_ALPHA = 0.3
+# Скільки останніх замірів затримки зберігати для перцентилів
+LATENCY_SAMPLES = 100
+
+
+class Endpoint:
+    """Один варіант запиту (URL + параметри + headers) та його статистика"""
+
+    def __init__(self, name, provider, url, params, headers=None, paging="offset",
+                 priority=0, max_page_size=TRONSCAN_MAX_PAGE_SIZE, keyed=False):
+        self.name = name
+        self.provider = provider
+        # URL та значення параметрів можуть містити {address} / {contract}
+        self.url = url
+        self.params = params
+        self.headers = headers or {}
+        # Ключ TRON-PRO-API-KEY підставляється з пулу ключів при кожному запиті
+        self.keyed = keyed
+        # Ліміти і запобіжники спільні для endpoint'ів одного хоста
+        self.host = urlsplit(url).netloc
+        # "fingerprint" - TronGrid meta.fingerprint, "offset" - Tronscan start
+        self.paging = paging
+        self.max_page_size = max_page_size
+        # Порядок зі старого каскаду - для endpoint'ів з однаковою оцінкою
+        self.priority = priority
+        # Визначений формат відповіді (schemas.Schema), кешується після першої сторінки
+        self.schema = None
+
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.empties = 0
+        self.latency = None
+        self.latency_samples = deque(maxlen=LATENCY_SAMPLES)
+        self.success_rate = 1.0
+        self.empty_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_status = None
+        # Адреси, для яких endpoint повертав USDT трансфери -> скільки його порожніх
+        # відповідей з курсором прийнято без перевірки. Іншим порожнім відповідям
+        # не віримо: endpoint може просто не бачити USDT TRC20 цієї адреси
+        self.vouched = {}
+
+    def build(self, address, contract, since=None, until=None, page_size=50):
+        """Формує URL та параметри запиту для адреси"""
+        url = self.url.format(address=address, contract=contract)
+        params = {
+            key: value.format(address=address, contract=contract) if isinstance(value, str) else value
+            for key, value in self.params.items()
+        }
+        params["limit"] = min(page_size, self.max_page_size)
+        if self.provider == "trongrid":
+            if since:
+                params["min_timestamp"] = since
+            if until:
+                params["max_timestamp"] = until
+        else:
+            params["start"] = 0
+            if since:
+                params["start_timestamp"] = since
+            if until:
+                params["end_timestamp"] = until
+        return url, params
+
+    def latency_percentile(self, percentile):
+        """Перцентиль затримки успішних запитів (None якщо замірів ще немає)"""
+        if not self.latency_samples:
+            return None
+        samples = sorted(self.latency_samples)
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def record_success(self, latency, empty=False):
+        self.attempts += 1
+        self.successes += 1
+        self.latency = latency if self.latency is None else (
+            EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+        )
+        self.latency_samples.append(latency)
+        self.success_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.success_rate
+        if empty:
+            self.empties += 1
+        self.empty_rate = EWMA_ALPHA * (1.0 if empty else 0.0) + (1 - EWMA_ALPHA) * self.empty_rate
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_status = 200
+
+    def record_data(self, address):
+        """Endpoint повернув USDT трансфери адреси - його порожнім відповідям можна вірити"""
+        self.vouched.setdefault(address, 0)
+
+    def distrust(self, address):
+        """Endpoint пропустив трансфер, який знайшов інший"""
+        self.vouched.pop(address, None)
+
+    def accept_empty(self, address, cross_check_every=0):
+        """Чи приймати порожню відповідь з курсором як "нових трансферів немає".
+        Кожна cross_check_every-та все одно перевіряється іншим провайдером"""
+        accepted = self.vouched.get(address)
+        if accepted is None:
+            return False
+        if cross_check_every and accepted + 1 >= cross_check_every:
+            self.vouched[address] = 0
+            return False
+        self.vouched[address] = accepted + 1
+        return True
+
+    def record_failure(self, latency=None, status=None, base_cooldown=30, max_cooldown=1800):
+        """Помилка: знижуємо рейтинг і відправляємо на експоненційний cool-down"""
+        self.attempts += 1
+        self.failures += 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else (
+                EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+            )
+        self.success_rate = (1 - EWMA_ALPHA) * self.success_rate
+        self.consecutive_failures += 1
+        cooldown = min(base_cooldown * 2 ** (self.consecutive_failures - 1), max_cooldown)
+        self.cooldown_until = time.time() + cooldown
+        self.last_status = status
+
+    def in_cooldown(self, now=None):
+        return self.cooldown_until > (now or time.time())
+
+    @property
+    def lane(self):
+        """Напрямок запитів (хост, з ключем чи без): 429 / 5xx стосуються всіх його endpoint'ів"""
+        return self.host, self.keyed
+
+    @property
+    def score(self):
+        """Очікувана "ціна" запиту: менше - краще"""
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY
+        return latency / max(self.success_rate, 0.05) * (1 + self.empty_rate)
+
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "provider": self.provider,
+            "score": round(self.score, 4),
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "latency_p95": round(self.latency_percentile(95), 4) if self.latency_samples else None,
+            "success_rate": round(self.success_rate, 4),
+            "empty_rate": round(self.empty_rate, 4),
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "empties": self.empties,
+            "vouched": len(self.vouched),
+            "cooldown_until": self.cooldown_until,
+            "last_status": self.last_status,
+            "schema": self.schema.name if self.schema else None,
+        }
+
+
+def lane_name(lane):
+    """Назва напрямку для логів і метрик (без повного ключа)"""
+    host, keyed = lane
+    return f"{host} (з ключем)" if keyed else host
+
+
+class ProviderRegistry:
+    """Список endpoint'ів, впорядкований за поточною оцінкою.
+
+    Крім оцінки кожного endpoint'а, тримає token bucket на кожен хост (для
+    запитів без ключа; ліміти ключів - в KeyPool) та запобіжник (CircuitBreaker)
+    на кожен напрямок (хост, з ключем чи без):
+    після 429 / 5xx запити до перевантаженого напрямку призупиняються,
+    а не переходять одразу на інші його варіанти.
+    """
+
+    def __init__(self, endpoints, base_cooldown=30, max_cooldown=1800, host_rate=0,
+                 breaker_threshold=3, probe_timeout=30):
+        self.endpoints = list(endpoints)
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.host_rate = host_rate
+        self.breaker_threshold = breaker_threshold
+        self.probe_timeout = probe_timeout
+        self.host_buckets = {}
+        self.breakers = {}
+
+    def breaker(self, endpoint):
+        breaker = self.breakers.get(endpoint.lane)
+        if breaker is None:
+            breaker = self.breakers[endpoint.lane] = CircuitBreaker(
+                self.breaker_threshold, self.base_cooldown, self.max_cooldown, self.probe_timeout
+            )
+        return breaker
+
+    def available(self):
+        """ranked() без endpoint'ів, чий напрямок зараз призупинено"""
+        now = time.time()
+        return [e for e in self.ranked() if not self.breaker(e).blocked(now)]
+
+    def allow(self, endpoint):
+        """Чи можна зараз робити запит (займає місце пробного запиту після паузи)"""
+        return self.breaker(endpoint).allow()
+
+    async def acquire(self, endpoint):
+        """Чекає на ліміт хоста перед запитом без ключа"""
+        bucket = self.host_buckets.get(endpoint.host)
+        if bucket is None:
+            bucket = self.host_buckets[endpoint.host] = TokenBucket(self.host_rate)
+        await bucket.acquire()
+
+    def record_response(self, endpoint, status, retry_after=None):
+        """Стан запобіжника за HTTP статусом: 429 / 5xx - перевантаження, інше - напрямок відповідає.
+        Повертає True, якщо запобіжник щойно відкрився"""
+        breaker = self.breaker(endpoint)
+        if status == 429 or status >= 500:
+            trips = breaker.trips
+            breaker.record_failure(retry_after)
+            return breaker.trips > trips
+        breaker.record_success()
+        return False
+
+    def ranked(self):
+        """Доступні endpoint'и від найкращого; ті, що на cool-down, - в кінці
+        (в порядку завершення cool-down), щоб було що спробувати, якщо впали всі"""
+        now = time.time()
+        available = [e for e in self.endpoints if not e.in_cooldown(now)]
+        cooling = [e for e in self.endpoints if e.in_cooldown(now)]
+        available.sort(key=lambda e: (e.score, e.priority))
+        cooling.sort(key=lambda e: e.cooldown_until)
+        return available + cooling
+
+    def record_success(self, endpoint, latency, empty=False):
+        endpoint.record_success(latency, empty)
+
+    def record_failure(self, endpoint, latency=None, status=None):
+        endpoint.record_failure(latency, status, self.base_cooldown, self.max_cooldown)
+
+    def snapshot(self):
+        return [
+            {**endpoint.snapshot(), "circuit": self.breaker(endpoint).snapshot()}
+            for endpoint in self.ranked()
+        ]
+
+    def circuits(self):
+        """{назва напрямку: стан запобіжника}"""
+        return {lane_name(lane): breaker for lane, breaker in self.breakers.items()}
+
+    def save(self, path):
+        """Зберігає поточний рейтинг для діагностичної команди"""
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"updated_at": time.time(), "endpoints": self.snapshot()}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️  Помилка збереження рейтингу провайдерів: {e}")
+
+
+def default_endpoints(keyed_providers=(), trongrid_url=TRONGRID_BASE_URL, tronscan_url=TRONSCAN_BASE_URL):
+    """TronGrid варіанти та 6 Tronscan endpoint'ів x 3 варіанти headers (старий каскад).
+    keyed_providers - провайдери, для яких є ключі в пулі: для них додаються
+    варіанти з TRON-PRO-API-KEY (без ключа лишаються запасними).
+    trongrid_url / tronscan_url - інші адреси API (наприклад, fake_server.py)"""
+    trongrid = [
+        ("TronGrid (з фільтром USDT)", {"only_confirmed": "true", "contract_address": "{contract}"}),
+        ("TronGrid (без фільтра, всі TRC20)", {"only_confirmed": "true"}),
+    ]
+    endpoints = []
+    for keyed in ((True, False) if "trongrid" in keyed_providers else (False,)):
+        for name, params in trongrid:
+            endpoints.append(Endpoint(
+                name + (" [API key]" if keyed else ""), "trongrid",
+                trongrid_url + "/v1/accounts/{address}/transactions/trc20", params,
+                paging="fingerprint", max_page_size=TRONGRID_MAX_PAGE_SIZE, keyed=keyed
+            ))
+
+    # Endpoints згідно з офіційною документацією Tronscan API
+    # https://docs.tronscan.org/api-endpoints/transactions-and-transfers
+    tronscan = [
+        # Get trc20&721 transfers list - з фільтром по USDT та toAddress
+        ("TRC20 transfers (toAddress + USDT contract)", "/api/transfer",
+         {"toAddress": "{address}", "contract_address": "{contract}", "confirm": "true"}),
+        # Get trc20&721 transfers list - з relatedAddress та USDT
+        ("TRC20 transfers (relatedAddress + USDT contract)", "/api/transfer",
+         {"relatedAddress": "{address}", "contract_address": "{contract}", "confirm": "true"}),
+        # Get trc20&721 transfers list - тільки toAddress (всі TRC20)
+        ("TRC20 transfers (toAddress, всі токени)", "/api/transfer",
+         {"toAddress": "{address}", "confirm": "true"}),
+        # Get account's transaction datas - з фільтром USDT (direction 2 = transfer-in)
+        ("Account TRC20 transactions (USDT, transfer-in)", "/api/account/{address}/transactions/trc20",
+         {"address": "{address}", "trc20Id": "{contract}", "direction": 2, "reverse": "true"}),
+        # Get account's transaction datas - всі TRC20
+        ("Account TRC20 transactions (всі токени, transfer-in)", "/api/account/{address}/transactions/trc20",
+         {"address": "{address}", "direction": 2, "reverse": "true"}),
+        # Get trc20&721 transfers list - relatedAddress (всі TRC20)
+        ("TRC20 transfers (relatedAddress, всі токени)", "/api/transfer",
+         {"relatedAddress": "{address}", "confirm": "true"}),
+    ]
+
+    # Варіанти headers (згідно з документацією Tronscan API)
+    # (назва, headers, чи потрібен ключ з пулу)
+    headers_variants = []
+    if "tronscan" in keyed_providers:
+        headers_variants.append(("API key", {}, True))
+        headers_variants.append(("API key + JSON", {"Content-Type": "application/json"}, True))
+    headers_variants.append(("без ключа", {}, False))
+
+    for variant_name, headers, keyed in headers_variants:
+        for name, path, params in tronscan:
+            endpoints.append(Endpoint(
+                f"{name} [{variant_name}]", "tronscan",
+                tronscan_url + path, params, headers=headers, paging="offset", keyed=keyed
+            ))
+
+    for priority, endpoint in enumerate(endpoints):
+        endpoint.priority = priority
+    return endpoints
@@ -0,0 +1,144 @@
+"""
+Прийом push-повідомлень про трансфери (TronGrid event / загальний webhook)
+"""
+import hashlib
+import hmac
+from http_server import HttpServer
+from transfer import Transfer, parse_int
+
+# Адреси, на яких сервер без PUSH_SECRET доступний лише з цієї ж машини
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def hex_to_base58(address):
+    """Адреса TRON у hex (0x... / 41...) -> base58 (T...); інші формати без змін"""
+    if not isinstance(address, str):
+        return ""
+    value = address.lower()
+    if value.startswith("0x") and len(value) == 42:
+        value = "41" + value[2:]
+    if not (value.startswith("41") and len(value) == 42):
+        return address
+    try:
+        payload = bytes.fromhex(value)
+    except ValueError:
+        return address
+    checksum = hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    number = int.from_bytes(payload + checksum, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = BASE58_ALPHABET[remainder] + encoded
+    return encoded
+
+
+def from_trongrid_event(event):
+    """Подія Transfer у форматі TronGrid event API"""
+    result = event.get("result") or {}
+    return Transfer(
+        event.get("transaction_id") or "",
+        parse_int(event.get("block_timestamp")),
+        hex_to_base58(result.get("from") or result.get("0") or ""),
+        hex_to_base58(result.get("to") or result.get("1") or ""),
+        parse_int(result.get("value") or result.get("2")),
+        event.get("contract_address") or "",
+        event.get("token_symbol") or "",
+        "",
+    )
+
+
+def parse_events(payload):
+    """Тіло push-запиту -> список Transfer.
+
+    Приймає одну подію, список подій або {"data": [...]}. Події TronGrid
+    впізнаються за event_name/result, решта розбирається загальним форматом
+    (hash, from, to, amount, timestamp, contract_address, ...).
+    """
+    if isinstance(payload, dict) and isinstance(payload.get("data"), list):
+        payload = payload["data"]
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise ValueError("очікується JSON об'єкт або список подій")
+
+    transfers = []
+    for event in payload:
+        if not isinstance(event, dict):
+            continue
+        if "result" in event and "event_name" in event:
+            if event.get("event_name") != "Transfer":
+                continue
+            transfer = from_trongrid_event(event)
+        else:
+            transfer = Transfer.from_tronscan(event)
+            transfer.from_address = hex_to_base58(transfer.from_address)
+            transfer.to_address = hex_to_base58(transfer.to_address)
+        if transfer.hash:
+            transfers.append(transfer)
+    return transfers
+
+
+class PushReceiver:
+    """HTTP endpoint, що передає отримані трансфери в handler(transfers);
+    handler повертає, скільки з них прийнято в обробку.
+
+    Якщо задано secret, запит має містити його в заголовку X-Push-Token
+    або параметрі ?token=. Без secret сервер слухає лише 127.0.0.1: інакше
+    будь-хто, кому видно порт, міг би надіслати вигаданий платіж.
+    """
+
+    def __init__(self, handler, host="0.0.0.0", port=8080, path="/events", secret="", expect=None):
+        if not secret and host not in LOOPBACK_HOSTS:
+            print(f"⚠️  PUSH_SECRET не задано - push-події приймаються лише з 127.0.0.1 (замість {host})")
+            host = "127.0.0.1"
+        self.handler = handler
+        self.secret = secret
+        self.expect = expect
+        self.server = HttpServer(host, port)
+        self.server.route("POST", path, self.receive)
+        if expect is not None:
+            self.server.route("POST", "/expect", self.receive_expect)
+        self.path = path
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self):
+        await self.server.start()
+        print(f"📥 Прийом push-подій: http://{self.server.host}:{self.server.port}{self.path}")
+        return self
+
+    async def close(self):
+        await self.server.close()
+
+    def authorized(self, request):
+        if not self.secret:
+            return True
+        token = request.headers.get("x-push-token") or request.query.get("token") or ""
+        return hmac.compare_digest(token, self.secret)
+
+    async def receive(self, request):
+        if not self.authorized(request):
+            self.rejected += 1
+            return 401, {"error": "unauthorized"}
+        try:
+            transfers = parse_events(request.json())
+        except ValueError as e:
+            self.rejected += 1
+            return 400, {"error": str(e)}
+        self.received += len(transfers)
+        queued = await self.handler(transfers)
+        return 202, {"accepted": len(transfers), "queued": queued}
+
+    async def receive_expect(self, request):
+        """Очікується платіж (виставлено рахунок): {"minutes": 15} або ?minutes=15"""
+        if not self.authorized(request):
+            self.rejected += 1
+            return 401, {"error": "unauthorized"}
+        try:
+            data = request.json() if request.body else {}
+            minutes = float((data or {}).get("minutes") or request.query.get("minutes") or 15)
+        except (ValueError, TypeError, AttributeError) as e:
+            return 400, {"error": str(e)}
+        self.expect(minutes * 60)
+        return 202, {"expect_minutes": minutes}
@@ -0,0 +1,187 @@
+"""
+Обмеження частоти запитів (token bucket) і запобіжники (circuit breaker)
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """Класичний token bucket: rate токенів за секунду, не більше capacity в запасі.
+
+    rate <= 0 означає відсутність обмеження.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Забирає токени без очікування, повертає True якщо вдалося"""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens=1):
+        """Скільки секунд чекати, поки в bucket з'явиться потрібна кількість токенів"""
+        self._refill()
+        if self.tokens >= tokens or self.rate <= 0:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens=1):
+        """Чекає поки з'являться токени і забирає їх (FIFO для конкурентних викликів)"""
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.delay(tokens))
+
+
+class WindowLimiter:
+    """Не більше limit операцій за будь-які window секунд (ковзне вікно).
+
+    На відміну від token bucket, не допускає подвійного сплеску на межі вікна:
+    жорсткий бюджет на хвилину. limit <= 0 означає відсутність обмеження.
+    """
+
+    def __init__(self, limit, window=60):
+        self.limit = int(limit)
+        self.window = float(window)
+        # Час кожної операції в межах вікна
+        self.times = deque()
+        self._lock = asyncio.Lock()
+
+    def _prune(self, now):
+        while self.times and self.times[0] <= now - self.window:
+            self.times.popleft()
+
+    def used(self):
+        """Скільки операцій за останні window секунд"""
+        self._prune(time.monotonic())
+        return len(self.times)
+
+    async def acquire(self):
+        """Чекає, поки у вікні звільниться місце, і займає його (FIFO)"""
+        if self.limit <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                if len(self.times) < self.limit:
+                    self.times.append(now)
+                    return
+                await asyncio.sleep(self.times[0] + self.window - now)
+
+
+def parse_retry_after(value, now=None):
+    """Заголовок Retry-After (секунди або HTTP-дата) -> секунди; None, якщо немає"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, when.timestamp() - (now or time.time()))
+
+
+class CircuitBreaker:
+    """Запобіжник для напрямку запитів (хост з ключами / без ключа).
+
+    closed    - запити йдуть; threshold перевантажень (429 / 5xx) підряд відкривають його
+    open      - запити не йдуть cooldown секунд (подвоюється з кожним відкриттям
+                до max_cooldown) або стільки, скільки сказав Retry-After
+    half_open - після паузи пропускається один пробний запит: успіх закриває,
+                помилка знову відкриває. Якщо пробний запит не завершився за
+                probe_timeout (скасовано), пропускається наступний
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold=3, cooldown=30, max_cooldown=1800, probe_timeout=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        # Відкриттів підряд без успішного запиту - для подвоєння паузи
+        self.streak = 0
+        self.open_until = 0.0
+        self.probe_started = None
+        self.trips = 0
+
+    def blocked(self, now=None):
+        """Чи відхиляються зараз запити (без зміни стану)"""
+        now = now or time.time()
+        if self.state == self.OPEN:
+            return now < self.open_until
+        if self.state == self.HALF_OPEN:
+            return self.probe_started is not None and now - self.probe_started < self.probe_timeout
+        return False
+
+    def allow(self, now=None):
+        """Чи можна робити запит; після паузи займає місце пробного запиту"""
+        now = now or time.time()
+        if self.blocked(now):
+            return False
+        if self.state != self.CLOSED:
+            self.state = self.HALF_OPEN
+            self.probe_started = now
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.streak = 0
+        self.probe_started = None
+
+    def record_failure(self, retry_after=None, now=None):
+        """Перевантаження (429 / 5xx); Retry-After відкриває запобіжник одразу"""
+        if self.state == self.OPEN:
+            # Відповідь на запит, відправлений до відкриття - пауза вже йде
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold or retry_after is not None:
+            self.trip(retry_after, now)
+
+    def trip(self, retry_after=None, now=None):
+        now = now or time.time()
+        if retry_after is not None:
+            cooldown = min(retry_after, self.max_cooldown)
+        else:
+            cooldown = min(self.cooldown * 2 ** self.streak, self.max_cooldown)
+        self.state = self.OPEN
+        self.open_until = now + cooldown
+        self.probe_started = None
+        self.failures = 0
+        self.streak += 1
+        self.trips += 1
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "open_until": self.open_until if self.state == self.OPEN else 0.0,
+            "trips": self.trips,
+        }
@@ -0,0 +1,163 @@
+"""
+Відтворення історії трансферів з файлу через конвеєр бота без мережі
+
+    python bot.py --replay history.jsonl                      - максимальна швидкість, результат не зберігається
+    python bot.py --replay history.jsonl --sink out.jsonl     - повідомлення, які були б відправлені, у файл
+    python bot.py --replay history.jsonl --speed 60           - у 60 разів швидше за реальний час
+
+Кожен рядок файлу - запис трансферу у форматі TronGrid / Tronscan / push-події,
+Transfer.to_dict() або ціла сторінка відповіді API ({"data": [...]}). Записи
+очікуються в хронологічному порядку. Трансфери групуються у "перевірки" за
+інтервалом batch_interval (за часом блоку) і проходять ту саму обробку, що й
+при опитуванні: process_transactions() (дедуплікація, адреси, токен, сума) і
+format_message() для кожного чату призначення.
+"""
+import asyncio
+import json
+import sys
+import time
+from push import parse_events
+from schemas import SCHEMAS, detect_schema
+from transfer import Transfer
+
+TRANSFER_FIELDS = frozenset(Transfer.__slots__)
+
+
+def normalize(record):
+    """Запис з файлу -> список Transfer"""
+    if not isinstance(record, dict) or "event_name" in record:
+        return parse_events(record)
+    if TRANSFER_FIELDS <= record.keys():
+        return [Transfer(**{field: record[field] for field in TRANSFER_FIELDS})]
+    if any(isinstance(value, list) for value in record.values()):
+        schema = detect_schema(record)
+        if schema is not None:
+            return schema.extract(record)
+    # Окремий запис відомого формату - його екстрактором, інакше загальний розбір
+    for schema in SCHEMAS:
+        if schema.signature in record:
+            return [schema.convert(record)]
+    return parse_events(record)
+
+
+def read_transfers(path):
+    """Трансфери з JSONL файлу по одному (файл не завантажується в пам'ять цілком)"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                transfers = normalize(record)
+            except ValueError as e:
+                print(f"⚠️  Рядок {line_number}: {e}")
+                continue
+            yield from transfers
+
+
+class NullSink:
+    """Лише рахує повідомлення"""
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, chat_id, txn, text):
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+class FileSink(NullSink):
+    """Повідомлення, які були б відправлені, - JSON рядок на кожне ("-" - stdout)"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, chat_id, txn, text):
+        super().write(chat_id, txn, text)
+        record = {"chat_id": chat_id, "hash": txn.hash, "timestamp": txn.timestamp,
+                  "to": txn.to_address, "amount": txn.amount, "text": text}
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+def open_sink(target):
+    return NullSink() if not target or target == "null" else FileSink(target)
+
+
+class Replayer:
+    """Проганяє трансфери з файлу через PaymentMonitor.
+
+    speed - 0: максимальна швидкість, N: у N разів швидше за реальний час
+    batch_interval - скільки секунд історії вважати однією перевіркою
+    """
+
+    def __init__(self, monitor, sink, speed=0, batch_interval=30):
+        self.monitor = monitor
+        self.sink = sink
+        self.speed = speed
+        self.batch_interval_ms = int(batch_interval * 1000)
+        self.transfers = 0
+        self.batches = 0
+        self.payments = 0
+
+    async def run(self, transfers):
+        started = time.monotonic()
+        first_timestamp = None
+        batch, batch_end = [], None
+        for txn in transfers:
+            self.transfers += 1
+            if first_timestamp is None and txn.timestamp:
+                first_timestamp = txn.timestamp
+            if batch and txn.timestamp and batch_end is not None and txn.timestamp >= batch_end:
+                await self.pace(started, first_timestamp, batch_end)
+                self.process(batch, batch_end)
+                batch = []
+            if not batch:
+                batch_end = (txn.timestamp or 0) + self.batch_interval_ms
+            batch.append(txn)
+        if batch:
+            self.process(batch, batch_end)
+        self.monitor.ledger.commit()
+        return time.monotonic() - started
+
+    async def pace(self, started, first_timestamp, timestamp):
+        """При speed > 0 чекає, поки реальний час наздожене час історії"""
+        if not self.speed or first_timestamp is None:
+            return
+        delay = (timestamp - first_timestamp) / 1000 / self.speed - (time.monotonic() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def process(self, batch, batch_end):
+        """Одна перевірка: від нових до старих, як повертає API"""
+        monitor = self.monitor
+        self.batches += 1
+        batch.sort(key=lambda txn: txn.timestamp, reverse=True)
+        new_txns = monitor.process_transactions(batch, source="replay")
+        for txn in new_txns:
+            monitor.txn_sources.pop(txn.hash, None)
+            for chat_id in monitor.get_destinations(txn):
+                text = monitor.format_message(txn)
+                if text:
+                    self.sink.write(chat_id, txn, text)
+        self.payments += len(new_txns)
+        # Як і при опитуванні: хеші за горизонтом витісняються, журнал зберігається раз на перевірку
+        monitor.processed_txns.evict(batch_end)
+        monitor.ledger.commit()
+
+    def summary(self, elapsed):
+        return {
+            "transfers": self.transfers,
+            "batches": self.batches,
+            "payments": self.payments,
+            "messages": self.sink.count,
+            "seconds": round(elapsed, 3),
+            "transfers_per_sec": round(self.transfers / elapsed) if elapsed > 0 else None,
+        }
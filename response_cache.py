@@ -0,0 +1,79 @@
+"""
+Короткочасний кеш відповідей TronGrid / Tronscan з об'єднанням однакових запитів
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Результати запитів за ключем (endpoint + параметри) на ttl секунд.
+
+    Якщо такий самий запит уже виконується, новий виклик чекає на нього
+    (single-flight) замість окремого запиту до API. Кешуються лише успішні
+    результати (не None). ttl <= 0 вимикає кеш.
+
+    hits - свіжий результат з кешу, coalesced - дочекались запиту, що вже йшов,
+    misses - виконано новий запит.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = float(ttl)
+        # Порядок вставки = порядок закінчення терміну (ttl однаковий для всіх)
+        self._entries = OrderedDict()
+        # key -> [задача запиту, кількість тих, хто на неї чекає]
+        self._inflight = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def get(self, key, fetch):
+        """Результат fetch() для key: з кешу, з запиту, що вже йде, або новий запит"""
+        if self.ttl <= 0:
+            self.misses += 1
+            return await fetch()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.misses += 1
+            flight = self._inflight[key] = [asyncio.ensure_future(self._run(key, fetch)), 0]
+        else:
+            self.coalesced += 1
+        flight[1] += 1
+        try:
+            # shield: скасування одного з тих, хто чекає (hedging), не скасовує запит для інших
+            return await asyncio.shield(flight[0])
+        except asyncio.CancelledError:
+            if flight[1] == 1:
+                flight[0].cancel()
+            raise
+        finally:
+            flight[1] -= 1
+
+    async def _run(self, key, fetch):
+        try:
+            value = await fetch()
+        finally:
+            self._inflight.pop(key, None)
+        if value is not None:
+            self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        now = time.monotonic()
+        # Прострочені записи - на початку
+        while self._entries and next(iter(self._entries.values()))[0] <= now:
+            self._entries.popitem(last=False)
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+
+    def stats(self):
+        """Запити через кеш за результатом: hit, coalesced, miss"""
+        return {"hit": self.hits, "coalesced": self.coalesced, "miss": self.misses}
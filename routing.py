@@ -0,0 +1,100 @@
+"""
+Таблиця маршрутизації: в які чати відправляти платіж
+"""
+import json
+import os
+
+
+class Route:
+    """Правило маршрутизації: умови на платіж і список чатів.
+
+    Порожня умова відповідає будь-якому платежу. address - адреса отримувача,
+    min_amount / max_amount - межі суми в USDT (max не включно), token - символ
+    або адреса контракту токена.
+    """
+    __slots__ = ("chats", "address", "min_amount", "max_amount", "token")
+
+    def __init__(self, chats, address=None, min_amount=None, max_amount=None, token=None):
+        self.chats = [str(chat) for chat in chats]
+        self.address = address.upper() if address else None
+        self.min_amount = float(min_amount) if min_amount is not None else None
+        self.max_amount = float(max_amount) if max_amount is not None else None
+        self.token = token.upper() if token else None
+
+    def matches(self, txn, amount):
+        if self.address and txn.to_address.upper() != self.address:
+            return False
+        if self.min_amount is not None and amount < self.min_amount:
+            return False
+        if self.max_amount is not None and amount >= self.max_amount:
+            return False
+        if self.token and self.token not in (txn.symbol.upper(), txn.contract.upper()):
+            return False
+        return True
+
+    def __repr__(self):
+        return f"Route({self.chats}, address={self.address}, amount=[{self.min_amount}, {self.max_amount}), token={self.token})"
+
+
+class RoutingTable:
+    """Список правил; платіж іде в усі чати всіх правил, яким він відповідає"""
+
+    def __init__(self, routes=()):
+        self.routes = list(routes)
+
+    def destinations(self, txn, amount, default=()):
+        """Чати для платежу без повторів: спершу default, потім чати правил"""
+        chats = [str(chat) for chat in default if chat]
+        for route in self.routes:
+            if route.matches(txn, amount):
+                chats.extend(chat for chat in route.chats if chat not in chats)
+        return chats
+
+    def chats(self):
+        """Всі чати з правил (для перевірки доступу при запуску)"""
+        return {chat for route in self.routes for chat in route.chats}
+
+    def __len__(self):
+        return len(self.routes)
+
+    @staticmethod
+    def parse(text):
+        """Парсить JSON список правил:
+        [{"chats": ["@ops"], "address": "T...", "min_amount": 100, "max_amount": 1000, "token": "USDT"}]
+        """
+        routes = []
+        for item in json.loads(text):
+            chats = item.get("chats") or []
+            if isinstance(chats, (str, int)):
+                chats = [chats]
+            if not chats:
+                print(f"⚠️  Правило маршрутизації без чатів: {item}")
+                continue
+            routes.append(Route(
+                chats,
+                address=item.get("address"),
+                min_amount=item.get("min_amount"),
+                max_amount=item.get("max_amount"),
+                token=item.get("token")
+            ))
+        return routes
+
+    @classmethod
+    def load(cls, routes_env="", routes_file=""):
+        """Збирає правила з ROUTES (JSON) та файлу ROUTES_FILE"""
+        table = cls()
+        sources = []
+        if routes_env:
+            sources.append(("ROUTES", routes_env))
+        if routes_file:
+            if os.path.exists(routes_file):
+                with open(routes_file, 'r', encoding='utf-8') as f:
+                    sources.append((routes_file, f.read()))
+            else:
+                print(f"⚠️  Файл маршрутизації не знайдено: {routes_file}")
+        for name, text in sources:
+            try:
+                table.routes.extend(cls.parse(text))
+            except (ValueError, TypeError, AttributeError) as e:
+                print(f"⚠️  Помилка в правилах маршрутизації ({name}): {e}")
+        return table
@@ -0,0 +1,127 @@
+"""
+Схеми відповідей TronGrid / Tronscan та готові екстрактори полів для кожної
+"""
+from transfer import Transfer, parse_int
+
+# Поля, за якими звичайний словник схожий на трансфер (для невідомих форматів)
+TX_FIELDS = ("hash", "transactionHash", "toAddress", "fromAddress", "to", "from", "transaction_id")
+
+
+def tronscan_transfer(tx):
+    """Tronscan /api/transfer"""
+    token_info = tx.get("tokenInfo") or {}
+    return Transfer(
+        tx.get("transactionHash") or "",
+        parse_int(tx.get("timestamp")),
+        tx.get("transferFromAddress") or "",
+        tx.get("transferToAddress") or "",
+        parse_int(tx.get("amount")),
+        token_info.get("tokenId") or tx.get("contractAddress") or "",
+        token_info.get("tokenAbbr") or "",
+        token_info.get("tokenName") or tx.get("tokenName") or "",
+    )
+
+
+def tronscan_token_transfer(tx):
+    """Tronscan /api/account/{address}/transactions/trc20 (формат token_transfers)"""
+    token_info = tx.get("tokenInfo") or {}
+    return Transfer(
+        tx.get("transaction_id") or "",
+        parse_int(tx.get("block_ts")),
+        tx.get("from_address") or "",
+        tx.get("to_address") or "",
+        parse_int(tx.get("quant")),
+        token_info.get("tokenId") or tx.get("contract_address") or "",
+        token_info.get("tokenAbbr") or "",
+        token_info.get("tokenName") or "",
+    )
+
+
+class Schema:
+    """Формат відповіді: де лежить список трансферів і як з нього взяти поля.
+
+    container - ключ зі списком (None - відповідь сама є списком)
+    signature - поле, яке обов'язково є в записі цього формату (None - запис,
+                з якого convert отримує хеш транзакції)
+    convert   - функція запис -> Transfer
+    """
+    __slots__ = ("name", "container", "signature", "convert")
+
+    def __init__(self, name, container, signature, convert):
+        self.name = name
+        self.container = container
+        self.signature = signature
+        self.convert = convert
+
+    def items(self, data):
+        if self.container is None:
+            return data if isinstance(data, list) else None
+        if not isinstance(data, dict):
+            return None
+        items = data.get(self.container)
+        return items if isinstance(items, list) else None
+
+    def matches(self, data):
+        """Відповідь досі в цьому форматі (перевіряється лише перший запис)"""
+        items = self.items(data)
+        if items is None:
+            return False
+        if not items:
+            return True
+        if not isinstance(items[0], dict):
+            return False
+        if self.signature is None:
+            # Загальний формат без поля-ознаки: запис має розбиратися в трансфер
+            return bool(self.convert(items[0]).hash)
+        return self.signature in items[0]
+
+    def extract(self, data):
+        """Сторінка відповіді -> список Transfer за один прохід"""
+        convert = self.convert
+        return [convert(tx) for tx in self.items(data)]
+
+    def __repr__(self):
+        return f"Schema({self.name})"
+
+
+# Відомі формати, від найспецифічніших до загальних
+SCHEMAS = [
+    Schema("trongrid", "data", "block_timestamp", Transfer.from_trongrid),
+    Schema("tronscan_transfer", "data", "transactionHash", tronscan_transfer),
+    Schema("tronscan_token_transfers", "data", "block_ts", tronscan_token_transfer),
+    Schema("tronscan_token_transfers", "token_transfers", "block_ts", tronscan_token_transfer),
+]
+
+
+def is_empty_page(data):
+    """Відповідь без жодного трансферу (порожній список у відомому місці)"""
+    if isinstance(data, list):
+        return not data
+    if isinstance(data, dict):
+        containers = {schema.container for schema in SCHEMAS}
+        return any(data.get(key) == [] for key in containers) and not any(
+            isinstance(data.get(key), list) and data.get(key) for key in containers
+        )
+    return False
+
+
+def detect_schema(data):
+    """Визначає формат непорожньої відповіді (None - трансферів не знайдено)"""
+    for schema in SCHEMAS:
+        items = schema.items(data)
+        if items and isinstance(items[0], dict) and schema.signature in items[0]:
+            return schema
+
+    # Невідомий формат: шукаємо список, схожий на трансфери, і розбираємо
+    # його загальним екстрактором з усіма варіантами назв полів
+    if isinstance(data, list):
+        return Schema("generic", None, None, Transfer.from_tronscan)
+    if not isinstance(data, dict):
+        return None
+    if isinstance(data.get("data"), list):
+        return Schema("generic", "data", None, Transfer.from_tronscan)
+    for key, value in data.items():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            if any(field in value[0] for field in TX_FIELDS):
+                return Schema(f"generic:{key}", key, None, Transfer.from_tronscan)
+    return None
@@ -0,0 +1,74 @@
+"""
+Надсилає тестову push-подію про трансфер USDT на локальний приймач бота
+
+    python send_test_event.py                    - подія у форматі TronGrid event
+    python send_test_event.py --generic          - подія у загальному форматі webhook
+    python send_test_event.py --amount 25.5      - сума в USDT (за замовчуванням 1)
+    python send_test_event.py --url http://...   - адреса приймача (за замовчуванням з PUSH_PORT / PUSH_PATH)
+
+Хеш події випадковий, тож провайдер його не підтвердить - бот має бути
+запущений з PUSH_VERIFY=false, інакше подія лише дочекається звірки.
+"""
+import argparse
+import json
+import os
+import sys
+import io
+import time
+import httpx
+import config
+
+# Виправлення кодування для Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+USDT_CONTRACT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+
+
+def build_event(generic, amount, to_address, from_address):
+    """Подія з випадковим хешем і поточним часом"""
+    txn_hash = os.urandom(32).hex()
+    timestamp = int(time.time() * 1000)
+    value = str(int(round(amount * 1_000_000)))
+    if generic:
+        return {
+            "hash": txn_hash,
+            "timestamp": timestamp,
+            "from": from_address,
+            "to": to_address,
+            "amount": value,
+            "contract_address": USDT_CONTRACT,
+            "token_symbol": "USDT",
+        }
+    return {
+        "transaction_id": txn_hash,
+        "block_timestamp": timestamp,
+        "contract_address": USDT_CONTRACT,
+        "event_name": "Transfer",
+        "result": {"from": from_address, "to": to_address, "value": value},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Тестова push-подія для бота")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{config.PUSH_PORT}{config.PUSH_PATH}")
+    parser.add_argument("--amount", type=float, default=1.0)
+    parser.add_argument("--to", default=config.TRON_ADDRESS)
+    parser.add_argument("--from", dest="from_address", default="TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf")
+    parser.add_argument("--generic", action="store_true")
+    parser.add_argument("--count", type=int, default=1, help="скільки подій надіслати одним запитом")
+    args = parser.parse_args()
+
+    events = [build_event(args.generic, args.amount, args.to, args.from_address) for _ in range(args.count)]
+    payload = events[0] if len(events) == 1 else events
+    headers = {"X-Push-Token": config.PUSH_SECRET} if config.PUSH_SECRET else {}
+
+    print(f"📤 {args.url}")
+    print(json.dumps(payload, indent=2, ensure_ascii=False))
+    response = httpx.post(args.url, json=payload, headers=headers, timeout=10)
+    print(f"📊 Статус: {response.status_code}")
+    print(f"📄 Відповідь: {response.text}")
+
+
+if __name__ == "__main__":
+    main()
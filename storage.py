@@ -0,0 +1,236 @@
+"""
+Сховище оброблених транзакцій та стану бота (SQLite, WAL)
+"""
+import json
+import os
+import sqlite3
+import time
+from watermark import Watermark
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_txns (
+    tx_hash TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL DEFAULT 0,
+    processed_at INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_processed_txns_timestamp ON processed_txns (timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    address TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    tx_hash TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (tx_hash, chat_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_outbox_state ON outbox (state);
+"""
+
+# Стани повідомлень в outbox
+OUTBOX_PENDING = "pending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+# Скільки зберігати вже відправлені повідомлення (мс)
+OUTBOX_RETENTION = 7 * 24 * 3600 * 1000
+
+
+class Ledger:
+    """Журнал оброблених транзакцій з індексом за хешем та timestamp.
+
+    Поводиться як множина хешів (in / add / len), але не тримає історію в пам'яті:
+    перевірка - це пошук за первинним ключем, а нові записи накопичуються
+    і пишуться однією транзакцією в commit() (раз на перевірку).
+    Там само зберігається outbox - повідомлення про платежі до їх відправки.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # В режимі WAL NORMAL не втрачає цілісність бази при падінні процесу
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        # Хеші, додані після останнього commit(): tx_hash -> timestamp
+        self._pending = {}
+        # Нові повідомлення outbox та зміни їх стану до наступного commit()
+        self._outbox_new = {}
+        self._outbox_updates = {}
+        count = self.get_meta("txns_count")
+        if count is None:
+            count = self.conn.execute("SELECT COUNT(*) FROM processed_txns").fetchone()[0]
+            self.set_meta("txns_count", count)
+            self.conn.commit()
+        self._count = int(count)
+
+    def __contains__(self, tx_hash):
+        if tx_hash in self._pending:
+            return True
+        row = self.conn.execute(
+            "SELECT 1 FROM processed_txns WHERE tx_hash = ?", (tx_hash,)
+        ).fetchone()
+        return row is not None
+
+    def add(self, tx_hash, timestamp=0):
+        """Позначає транзакцію як оброблену (запишеться при commit)"""
+        if tx_hash not in self._pending:
+            try:
+                timestamp = int(float(timestamp or 0))
+            except (ValueError, TypeError):
+                timestamp = 0
+            self._pending[tx_hash] = timestamp
+
+    def __len__(self):
+        return self._count + len(self._pending)
+
+    def has_untimed(self):
+        """Чи є в журналі хеші без timestamp (перенесені зі старого JSON тощо)"""
+        if any(not timestamp for timestamp in self._pending.values()):
+            return True
+        row = self.conn.execute("SELECT 1 FROM processed_txns WHERE timestamp = 0 LIMIT 1").fetchone()
+        return row is not None
+
+    def recent(self, since):
+        """Пари (hash, timestamp) з timestamp >= since (за індексом timestamp)"""
+        rows = self.conn.execute(
+            "SELECT tx_hash, timestamp FROM processed_txns WHERE timestamp >= ?", (int(since),)
+        ).fetchall()
+        rows.extend((tx_hash, timestamp) for tx_hash, timestamp in self._pending.items() if timestamp >= since)
+        return rows
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        """Записує значення (без commit - входить у поточну транзакцію)"""
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value))
+        )
+
+    def outbox_add(self, tx_hash, chat_id, payload):
+        """Ставить повідомлення про платіж в outbox (запишеться при commit)"""
+        self._outbox_new[(tx_hash, str(chat_id))] = json.dumps(payload, ensure_ascii=False)
+
+    def outbox_update(self, tx_hash, chat_id, state, error=None):
+        """Змінює стан повідомлення (запишеться при commit); кожен виклик - одна спроба"""
+        key = (tx_hash, str(chat_id))
+        attempts = self._outbox_updates.get(key, (None, None, 0))[2] + 1
+        self._outbox_updates[key] = (state, error, attempts)
+
+    def outbox_pending(self):
+        """Збережені, але ще не відправлені повідомлення: (tx_hash, chat_id, payload)"""
+        rows = self.conn.execute(
+            "SELECT tx_hash, chat_id, payload FROM outbox WHERE state = ? ORDER BY created_at",
+            (OUTBOX_PENDING,)
+        ).fetchall()
+        return [(tx_hash, chat_id, json.loads(payload)) for tx_hash, chat_id, payload in rows]
+
+    def outbox_counts(self):
+        """Кількість повідомлень outbox за станами"""
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+
+    def load_watermarks(self):
+        """Курсори адрес або None, якщо їх ще жодного разу не зберігали"""
+        rows = self.conn.execute("SELECT address, data FROM watermarks").fetchall()
+        if not rows:
+            return None
+        return {address: Watermark.from_dict(json.loads(data)) for address, data in rows}
+
+    def commit(self, watermarks=None):
+        """Записує нові хеші та змінені курсори однією транзакцією"""
+        processed_at = int(time.time() * 1000)
+        dirty = {
+            address: watermark
+            for address, watermark in (watermarks or {}).items()
+            if watermark.dirty
+        }
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO processed_txns (tx_hash, timestamp, processed_at) VALUES (?, ?, ?)",
+                [(tx_hash, timestamp, processed_at) for tx_hash, timestamp in self._pending.items()]
+            )
+            self._count += self.conn.total_changes - before
+            if dirty:
+                self.conn.executemany(
+                    "INSERT INTO watermarks (address, timestamp, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT(address) DO UPDATE SET timestamp = excluded.timestamp, data = excluded.data",
+                    [
+                        (address, watermark.timestamp, json.dumps(watermark.to_dict()))
+                        for address, watermark in dirty.items()
+                    ]
+                )
+            if self._outbox_new:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO outbox (tx_hash, chat_id, payload, state, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (tx_hash, chat_id, payload, OUTBOX_PENDING, processed_at, processed_at)
+                        for (tx_hash, chat_id), payload in self._outbox_new.items()
+                    ]
+                )
+            if self._outbox_updates:
+                self.conn.executemany(
+                    "UPDATE outbox SET state = ?, error = ?, attempts = attempts + ?, updated_at = ? "
+                    "WHERE tx_hash = ? AND chat_id = ?",
+                    [
+                        (state, error, attempts, processed_at, tx_hash, chat_id)
+                        for (tx_hash, chat_id), (state, error, attempts) in self._outbox_updates.items()
+                    ]
+                )
+                self.conn.execute(
+                    "DELETE FROM outbox WHERE state = ? AND updated_at < ?",
+                    (OUTBOX_SENT, processed_at - OUTBOX_RETENTION)
+                )
+            self.set_meta("txns_count", self._count)
+            self.set_meta("last_update", time.time())
+        self._pending.clear()
+        self._outbox_new.clear()
+        self._outbox_updates.clear()
+        for watermark in dirty.values():
+            watermark.dirty = False
+
+    def migrate_from_json(self, json_path):
+        """Одноразовий перенос з processed_transactions.json (старий формат).
+
+        Після успішного імпорту файл перейменовується в *.migrated.
+        """
+        if not os.path.exists(json_path) or self.get_meta("migrated_from_json"):
+            return False
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        txns = data.get("txns", [])
+        for tx_hash in txns:
+            self.add(tx_hash)
+        watermarks = {}
+        for address, item in (data.get("watermarks") or {}).items():
+            watermarks[address] = Watermark.from_dict(item)
+            watermarks[address].dirty = True
+        # Все пишеться однією транзакцією в commit()
+        if data.get("bot_start_time") and self.get_meta("bot_start_time") is None:
+            self.set_meta("bot_start_time", data["bot_start_time"])
+        self.set_meta("migrated_from_json", json_path)
+        self.commit(watermarks)
+        os.replace(json_path, json_path + ".migrated")
+        print(f"📦 Перенесено {len(txns)} транзакцій з {json_path} в {self.path}")
+        return True
+
+    def close(self):
+        if self._pending or self._outbox_new or self._outbox_updates:
+            self.commit()
+        self.conn.close()
@@ -77,14 +77,17 @@ async def test_bot():
     # Перевірка Tronscan API
     print("\n5. Перевірка Tronscan API...")
     monitor = PaymentMonitor()
-    transactions = monitor.get_recent_transactions()
+    try:
+        transactions = await monitor.get_transactions()
+    finally:
+        await monitor.close()
     if transactions:
         print(f"   ✅ Отримано {len(transactions)} транзакцій")
         if len(transactions) > 0:
             latest = transactions[0]
             print(f"   Остання транзакція:")
-            print(f"      Hash: {latest.get('hash', 'Невідомо')[:20]}...")
-            print(f"      Timestamp: {latest.get('timestamp', 'Невідомо')}")
+            print(f"      Hash: {(latest.hash or 'Невідомо')[:20]}...")
+            print(f"      Timestamp: {latest.timestamp or 'Невідомо'}")
     else:
         print("   ⚠️  Транзакції не отримано (може бути нормально якщо транзакцій немає)")
     
@@ -0,0 +1,50 @@
+"""
+Тест дедуплікації: транзакції зі старого processed_transactions.json
+не повинні оголошуватися повторно після переносу в SQLite журнал
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+import config
+from bot import PaymentMonitor
+from transfer import Transfer
+
+USDT_CONTRACT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+
+
+def test_migrated_hash_not_reannounced():
+    """Хеш зі старого JSON (без timestamp) - вже оброблений, навіть якщо трансфер новіший за запуск бота"""
+    cwd = os.getcwd()
+    ledger_file = config.LEDGER_FILE
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        config.LEDGER_FILE = os.path.join(tmp, "processed_transactions.db")
+        try:
+            bot_start_time = int(time.time() * 1000) - 3600 * 1000
+            tx_hash = "ab" * 32
+            with open("processed_transactions.json", "w", encoding="utf-8") as f:
+                json.dump({"txns": [tx_hash], "bot_start_time": bot_start_time}, f)
+
+            monitor = PaymentMonitor()
+            assert monitor.bot_start_time == bot_start_time
+            transfer = Transfer(
+                hash=tx_hash,
+                timestamp=bot_start_time + 60 * 1000,
+                from_address="TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf",
+                to_address=monitor.tron_address_original,
+                amount=5_000_000,
+                contract=USDT_CONTRACT,
+                symbol="USDT",
+            )
+            assert monitor.process_transactions([transfer]) == []
+            asyncio.run(monitor.close())
+        finally:
+            config.LEDGER_FILE = ledger_file
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_migrated_hash_not_reannounced()
+    print("✅ Перенесені транзакції не оголошуються повторно")
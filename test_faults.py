@@ -0,0 +1,136 @@
+"""
+Регресійні тести на fake_server.py: збій на наступній сторінці, запобіжник
+після 429 та авторизація push-подій
+"""
+import asyncio
+import os
+import tempfile
+import time
+import httpx
+import config
+from bot import PaymentMonitor
+from fake_server import FakeServer, Faults
+from push import PushReceiver
+
+
+async def with_fake_server(faults, test, **settings):
+    """Запускає FakeServer з faults і бота, налаштованого на нього (settings - інші
+    значення config); викликає test(monitor, fake)"""
+    settings = {"PAGE_SIZE": 5, "PUSH_VERIFY": False, **settings}
+    saved = {name: getattr(config, name) for name in (
+        "TRONGRID_URL", "TRONSCAN_URL", "TELEGRAM_API_URL", "LEDGER_FILE", *settings
+    )}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        fake = FakeServer([config.TRON_ADDRESS], rate=0, noise=0, faults=faults)
+        await fake.start("127.0.0.1", 0)
+        config.TRONGRID_URL = config.TRONSCAN_URL = config.TELEGRAM_API_URL = f"http://127.0.0.1:{fake.server.port}"
+        config.LEDGER_FILE = os.path.join(tmp, "processed_transactions.db")
+        for name, value in settings.items():
+            setattr(config, name, value)
+        monitor = PaymentMonitor()
+        try:
+            await test(monitor, fake)
+        finally:
+            await monitor.close()
+            await fake.server.close()
+            for name, value in saved.items():
+                setattr(config, name, value)
+            os.chdir(cwd)
+
+
+def trongrid(monitor):
+    """TronGrid без ключа: сторінки за meta.fingerprint"""
+    return next(e for e in monitor.providers.endpoints if e.provider == "trongrid" and not e.keyed)
+
+
+def check_next_page_fault(fault, **settings):
+    """Збій fault на другій сторінці: перша сторінка лишається, результат позначено truncated"""
+    async def test(monitor, fake):
+        now = int(time.time() * 1000)
+        for i in range(12):
+            fake.ledger.add(monitor.tron_address_original, 10 + i, now - i * 1000)
+        first_page = fake.trongrid_trc20
+
+        async def failing_next_pages(request):
+            if request.query.get("fingerprint"):
+                fake.faults.apply(fault)
+            return await first_page(request)
+
+        fake.server.route("GET", "/v1/accounts/{address}/transactions/trc20", failing_next_pages)
+        endpoint = trongrid(monitor)
+        since = now - 60 * 1000
+        url, params = endpoint.build(monitor.tron_address_original, monitor.usdt_contract, since, None, config.PAGE_SIZE)
+        result = await monitor.request_endpoint(endpoint, url, params, since=since, address=monitor.tron_address_original)
+        assert result is not None
+        assert len(result) == config.PAGE_SIZE
+        assert result.pages == 1
+        assert result.truncated
+        assert fake.stats["trongrid"] == 2
+        assert sum(monitor.fetch_attempts.values.values()) == 2
+        assert sum(monitor.fetch_failures.values.values()) == 1
+
+    asyncio.run(with_fake_server(Faults(), test, **settings))
+
+
+def test_next_page_error_keeps_first_page():
+    check_next_page_fault({"error_rate": 1})
+
+
+def test_next_page_timeout_keeps_first_page():
+    check_next_page_fault({"latency": 1}, HTTP_TIMEOUT=0.2)
+
+
+def test_throttling_opens_breaker():
+    """429 з Retry-After PROVIDER_BREAKER_THRESHOLD разів підряд - запити до хоста призупинено"""
+    async def test(monitor, fake):
+        endpoint = trongrid(monitor)
+        url, params = endpoint.build(monitor.tron_address_original, monitor.usdt_contract, None, None, 5)
+        for _ in range(config.PROVIDER_BREAKER_THRESHOLD):
+            assert await monitor.request_endpoint(endpoint, url, params) is None
+        breaker = monitor.providers.breaker(endpoint)
+        assert breaker.state == breaker.OPEN
+        assert breaker.open_until - time.time() > 20
+        requests = fake.stats["trongrid"]
+        assert await monitor.request_endpoint(endpoint, url, params) is None
+        assert fake.stats["trongrid"] == requests
+
+    asyncio.run(with_fake_server(Faults(throttle_rate=1, retry_after=30), test))
+
+
+def test_push_requires_secret():
+    """Push-подія без токена або з невірним токеном відхиляється (401), з вірним - приймається"""
+    async def test(monitor, fake):
+        # Сервер закриє monitor.close()
+        push = monitor.push = PushReceiver(monitor.handle_push, host="127.0.0.1", port=0, secret="s3cret")
+        await push.start()
+        event = {
+            "hash": "cd" * 32,
+            "timestamp": int(time.time() * 1000),
+            "from": "TXYZopYRdj2D9XRtbG411XZZ3kM5VkAeBf",
+            "to": monitor.tron_address_original,
+            "amount": 5_000_000,
+            "contract_address": monitor.usdt_contract,
+        }
+        url = f"http://127.0.0.1:{push.server.port}{push.path}"
+        async with httpx.AsyncClient() as client:
+            assert (await client.post(url, json=event)).status_code == 401
+            assert (await client.post(url, json=event, headers={"X-Push-Token": "wrong"})).status_code == 401
+            response = await client.post(url, json=event, headers={"X-Push-Token": "s3cret"})
+        assert response.status_code == 202
+        assert response.json() == {"accepted": 1, "queued": 1}
+        assert (push.received, push.rejected) == (1, 2)
+        assert 'push_events_total{result="rejected"} 2' in monitor.metrics.render()
+
+    asyncio.run(with_fake_server(Faults(), test))
+
+
+if __name__ == "__main__":
+    test_next_page_error_keeps_first_page()
+    test_next_page_timeout_keeps_first_page()
+    print("✅ Помилка / таймаут на наступній сторінці не скасовує першу")
+    test_throttling_opens_breaker()
+    print("✅ 429 відкривають запобіжник")
+    test_push_requires_secret()
+    print("✅ Push-події без секрету відхиляються")
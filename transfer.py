@@ -0,0 +1,104 @@
+"""
+Нормалізований запис TRC20 трансферу (один формат для всіх провайдерів)
+"""
+from decimal import Decimal, InvalidOperation
+
+# USDT TRC20 має 6 десяткових знаків (1 USDT = 1,000,000)
+USDT_DECIMALS = 6
+
+
+def parse_int(value):
+    """Ціле число з рядка / числа без втрати точності (0 якщо не число)"""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        pass
+    try:
+        return int(Decimal(str(value)))
+    except (InvalidOperation, ValueError, TypeError):
+        return 0
+
+
+class Transfer:
+    """Один TRC20 трансфер.
+
+    Створюється один раз при отриманні сторінки з API, далі весь код працює
+    з полями запису замість пошуку по різних ключах словника.
+    amount - сума в найменших одиницях токена (точне ціле), timestamp - мс.
+    """
+    __slots__ = ("hash", "timestamp", "from_address", "to_address", "amount", "contract", "symbol", "name")
+
+    def __init__(self, hash, timestamp=0, from_address="", to_address="", amount=0,
+                 contract="", symbol="", name=""):
+        self.hash = hash
+        self.timestamp = timestamp
+        self.from_address = from_address
+        self.to_address = to_address
+        self.amount = amount
+        self.contract = contract
+        self.symbol = symbol
+        self.name = name
+
+    @property
+    def amount_usdt(self):
+        return self.amount / 10 ** USDT_DECIMALS
+
+    @classmethod
+    def from_trongrid(cls, tx):
+        """Запис TronGrid /v1/accounts/{address}/transactions/trc20"""
+        token_info = tx.get("token_info") or {}
+        return cls(
+            tx.get("transaction_id") or "",
+            parse_int(tx.get("block_timestamp")),
+            tx.get("from") or "",
+            tx.get("to") or "",
+            parse_int(tx.get("value")),
+            token_info.get("address") or "",
+            token_info.get("symbol") or "",
+            token_info.get("name") or "",
+        )
+
+    @classmethod
+    def from_tronscan(cls, tx):
+        """Запис Tronscan (/api/transfer, /api/account/.../transactions/trc20 та старі формати)"""
+        token_info = tx.get("tokenInfo") or tx.get("token_info") or {}
+        if not isinstance(token_info, dict):
+            token_info = {}
+        to_address = (
+            tx.get("toAddress") or tx.get("transferToAddress") or tx.get("to") or tx.get("to_address") or ""
+        )
+        # Для Tronscan API може бути toAddressList
+        if not to_address:
+            to_address_list = tx.get("toAddressList")
+            if isinstance(to_address_list, list) and to_address_list:
+                to_address = to_address_list[0]
+        return cls(
+            tx.get("hash") or tx.get("transactionHash") or tx.get("transaction_id") or tx.get("txID") or "",
+            parse_int(tx.get("timestamp") or tx.get("block_timestamp") or tx.get("block_ts") or tx.get("time")),
+            (
+                tx.get("fromAddress") or tx.get("transferFromAddress") or tx.get("from") or
+                tx.get("from_address") or tx.get("ownerAddress") or ""
+            ),
+            to_address,
+            parse_int(tx.get("amount") or tx.get("quant") or tx.get("value") or tx.get("amount_str")),
+            (
+                tx.get("contractAddress") or tx.get("contract_address") or tx.get("tokenContractAddress") or
+                token_info.get("address") or token_info.get("contractAddress") or token_info.get("tokenId") or ""
+            ),
+            (
+                tx.get("tokenSymbol") or tx.get("token_symbol") or tx.get("symbol") or
+                token_info.get("symbol") or token_info.get("tokenAbbr") or ""
+            ),
+            (
+                tx.get("tokenName") or tx.get("token_name") or tx.get("name") or
+                token_info.get("name") or token_info.get("tokenName") or ""
+            ),
+        )
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self):
+        return f"Transfer({self.hash[:16]}..., {self.amount} {self.symbol or '?'} -> {self.to_address}, {self.timestamp})"
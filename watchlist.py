@@ -0,0 +1,148 @@
+"""
+Список TRON адрес для моніторингу та планувальник запитів по них
+"""
+import asyncio
+import os
+import re
+from ratelimit import TokenBucket, WindowLimiter
+
+# Base58 адреса TRON: 34 символи, починається з "T"
+TRON_ADDRESS_RE = re.compile(r"^T[1-9A-HJ-NP-Za-km-z]{33}$")
+
+
+class WatchedAddress:
+    """Адреса для моніторингу та канал, куди надсилати платежі по ній"""
+    __slots__ = ("address", "key", "channel_id")
+
+    def __init__(self, address, channel_id=None):
+        # Оригінальний формат потрібен для API, upper case - для порівняння
+        self.address = address
+        self.key = address.upper()
+        self.channel_id = channel_id
+
+    def __repr__(self):
+        return f"WatchedAddress({self.address!r}, channel_id={self.channel_id!r})"
+
+
+class Watchlist:
+    """Набір адрес з O(1) індексом за нормалізованою (upper case) адресою"""
+
+    def __init__(self, entries=()):
+        self._index = {}
+        for entry in entries:
+            self.add(entry.address, entry.channel_id)
+
+    def add(self, address, channel_id=None):
+        entry = WatchedAddress(address, channel_id)
+        if entry.key in self._index:
+            # Повторна адреса: залишаємо першу, але дозволяємо задати канал
+            existing = self._index[entry.key]
+            existing.channel_id = existing.channel_id or channel_id
+            return existing
+        self._index[entry.key] = entry
+        return entry
+
+    def get(self, address):
+        """Повертає WatchedAddress для адреси (будь-який регістр) або None"""
+        if not address:
+            return None
+        return self._index.get(address.upper())
+
+    def __contains__(self, address):
+        return self.get(address) is not None
+
+    def __iter__(self):
+        return iter(self._index.values())
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def primary(self):
+        """Перша адреса у списку (для діагностики та повідомлення про запуск);
+        load() гарантує, що список не порожній"""
+        return next(iter(self._index.values()), None)
+
+    def channels(self):
+        """Всі окремо задані канали адрес"""
+        return {entry.channel_id for entry in self if entry.channel_id}
+
+    @staticmethod
+    def parse(text):
+        """Парсить записи виду ADDRESS[=CHANNEL], розділені комами або новими рядками.
+
+        Рядки, що починаються з '#', ігноруються.
+        """
+        entries = []
+        for line in text.splitlines():
+            line = line.split("#", 1)[0]
+            for item in line.split(","):
+                item = item.strip()
+                if not item:
+                    continue
+                address, _, channel_id = item.partition("=")
+                address = address.strip()
+                channel_id = channel_id.strip() or None
+                if not TRON_ADDRESS_RE.match(address):
+                    print(f"⚠️  Невірна TRON адреса у списку: {address}")
+                    continue
+                entries.append(WatchedAddress(address, channel_id))
+        return entries
+
+    @classmethod
+    def load(cls, addresses_env="", watchlist_file="", default_address=""):
+        """Збирає список з TRON_ADDRESSES, файлу WATCHLIST_FILE та TRON_ADDRESS.
+        ValueError, якщо в результаті немає жодної адреси"""
+        watchlist = cls()
+        if addresses_env:
+            for entry in cls.parse(addresses_env):
+                watchlist.add(entry.address, entry.channel_id)
+        if watchlist_file:
+            if os.path.exists(watchlist_file):
+                with open(watchlist_file, 'r', encoding='utf-8') as f:
+                    for entry in cls.parse(f.read()):
+                        watchlist.add(entry.address, entry.channel_id)
+            else:
+                print(f"⚠️  Файл зі списком адрес не знайдено: {watchlist_file}")
+        # Одна адреса з TRON_ADDRESS - режим за замовчуванням
+        if len(watchlist) == 0 and default_address:
+            watchlist.add(default_address)
+        if len(watchlist) == 0:
+            # Без жодної адреси боту нічого перевіряти (і немає основної адреси)
+            raise ValueError(
+                "Список адрес для моніторингу порожній: задайте TRON_ADDRESSES, "
+                "WATCHLIST_FILE або TRON_ADDRESS (невірні адреси пропускаються)"
+            )
+        return watchlist
+
+
+class PollScheduler:
+    """Розподіляє перевірку адрес у часі: не більше concurrency паралельних
+    перевірок, не більше rate запитів до провайдерів за секунду і не більше
+    per_minute запитів за будь-яку хвилину (0 - без обмеження)."""
+
+    def __init__(self, rate, concurrency, per_minute=0):
+        self.budget = TokenBucket(rate, capacity=max(1, concurrency))
+        self.minute_budget = WindowLimiter(per_minute, 60)
+        self.concurrency = max(1, concurrency)
+        # Лічильник запитів до провайдерів (для контролю бюджету опитування)
+        self.requests = 0
+
+    async def acquire(self):
+        """Викликається перед кожним запитом до провайдера"""
+        await self.minute_budget.acquire()
+        await self.budget.acquire()
+        self.requests += 1
+
+    async def run(self, items, worker):
+        """Виконує worker(item) для кожного елемента з обмеженням паралельності.
+
+        Повертає список результатів (або винятків) у порядку items.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(item):
+            async with semaphore:
+                return await worker(item)
+
+        return await asyncio.gather(*(run_one(item) for item in items), return_exceptions=True)
@@ -0,0 +1,66 @@
+"""
+Курсор (watermark) інкрементального опитування для адреси
+"""
+
+
+class Watermark:
+    """Остання переглянута позиція в історії трансферів адреси.
+
+    Зберігає найбільший block_timestamp і хеші транзакцій саме з цим timestamp,
+    бо в одному блоці може бути кілька трансферів на ту саму адресу.
+    gap - (від, до) діапазон timestamp, який ще треба дозавантажити, якщо
+    між перевірками прийшло більше трансферів, ніж вміщує MAX_PAGES сторінок.
+    dirty - змінений після останнього збереження.
+    """
+    __slots__ = ("timestamp", "tx_ids", "gap", "dirty")
+
+    def __init__(self, timestamp=0, tx_ids=(), gap=None):
+        self.timestamp = int(timestamp or 0)
+        self.tx_ids = set(tx_ids)
+        self.gap = tuple(gap) if gap else None
+        self.dirty = True
+
+    def add_gap(self, start, end):
+        """Додає пропуск, об'єднуючи його з уже відомим"""
+        if self.gap:
+            start, end = min(start, self.gap[0]), max(end, self.gap[1])
+        self.gap = (int(start), int(end))
+        self.dirty = True
+
+    def is_older(self, timestamp):
+        """Трансфер раніше за watermark - все далі на сторінці теж вже бачили"""
+        return timestamp < self.timestamp
+
+    def is_seen(self, timestamp, tx_id):
+        """Трансфер вже переглянутий при попередньому опитуванні"""
+        return timestamp < self.timestamp or (timestamp == self.timestamp and tx_id in self.tx_ids)
+
+    def advance(self, timestamp, tx_id):
+        """Пересуває watermark вперед, повертає True якщо він змінився"""
+        timestamp = int(timestamp)
+        if timestamp > self.timestamp:
+            self.timestamp = timestamp
+            self.tx_ids = {tx_id}
+            self.dirty = True
+            return True
+        if timestamp == self.timestamp and tx_id not in self.tx_ids:
+            self.tx_ids.add(tx_id)
+            self.dirty = True
+            return True
+        return False
+
+    def to_dict(self):
+        data = {"timestamp": self.timestamp, "tx_ids": sorted(self.tx_ids)}
+        if self.gap:
+            data["gap"] = list(self.gap)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        watermark = cls(data.get("timestamp", 0), data.get("tx_ids", []), data.get("gap"))
+        watermark.dirty = False
+        return watermark
+
+    def __repr__(self):
+        gap = f", gap={self.gap}" if self.gap else ""
+        return f"Watermark({self.timestamp}, {len(self.tx_ids)} tx{gap})"